@@ -0,0 +1,159 @@
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cache import AnalysisCache, DEFAULT_MAX_BYTES, analyze
+from instrumentation import Instrumentation
+from mapped import analyze_mapped
+from parse import format_diagnostic
+from semantic import check as check_semantics
+
+
+def find_files(targets, pattern='*.txt'):
+    """Expand directories (recursively, filtered by `pattern`) and glob expressions into file paths."""
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, files in os.walk(target):
+                dirs.sort()
+                for name in sorted(files):
+                    if fnmatch.fnmatch(name, pattern):
+                        yield os.path.join(root, name)
+        else:
+            yield from sorted(glob.glob(target, recursive=True))
+
+
+def analyze_text(text, cache=None, data=None, instrumentation=None, check=False):
+    """Lex and parse one program, returns (token count, list of error messages).
+
+    `check` adds the semantic diagnostics of the parsed statements.
+    """
+    analysis = analyze(text, cache, data, instrumentation)
+    diagnostics = analysis.diagnostics
+    if check:
+        if instrumentation is None:
+            diagnostics = diagnostics + check_semantics(analysis.ast)
+        else:
+            with instrumentation.phase('check'):
+                diagnostics = diagnostics + check_semantics(analysis.ast)
+    return len(analysis.tokens), error_messages(analysis.lex_errors, diagnostics)
+
+
+def error_messages(lex_errors, diagnostics):
+    errors = [f"Error at line {error['line']}, column {error['column']}: "
+              f"{error.get('message', 'Unexpected character')} '{error['value']}'"
+              for error in lex_errors]
+    errors.extend(format_diagnostic(diagnostic) for diagnostic in diagnostics)
+    return errors
+
+
+caches = {}  # Cache directory -> AnalysisCache, one per worker process
+
+
+def analyze_file(path, cache_directory=None, cache_max_bytes=DEFAULT_MAX_BYTES, instrumentation=None,
+                 mapped=False, check=False):
+    if mapped:
+        return analyze_mapped_file(path, check)
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        text = data.decode('utf-8')
+    except (OSError, UnicodeDecodeError) as error:
+        return {'path': path, 'tokens': 0, 'errors': [str(error)], 'ok': False}
+    cache = None
+    if cache_directory is not None:
+        cache = caches.get(cache_directory)
+        if cache is None:
+            cache = caches[cache_directory] = AnalysisCache(cache_directory, cache_max_bytes)
+    token_count, errors = analyze_text(text, cache, data, instrumentation, check)
+    return {'path': path, 'tokens': token_count, 'errors': errors, 'ok': not errors}
+
+
+def analyze_mapped_file(path, check=False):
+    """analyze_file through an mmap of the file, without decoding it as a whole (and without cache)."""
+    try:
+        tokens, lex_errors, ast, diagnostics = analyze_mapped(path)
+    except (OSError, UnicodeDecodeError) as error:
+        return {'path': path, 'tokens': 0, 'errors': [str(error)], 'ok': False}
+    if check:
+        diagnostics = diagnostics + check_semantics(ast)
+    errors = error_messages(lex_errors, diagnostics)
+    return {'path': path, 'tokens': len(tokens), 'errors': errors, 'ok': not errors}
+
+
+def analyze_files(paths, workers=None, chunk_size=8, cache_directory=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                  instrumentation=None, mapped=False, check=False):
+    """Yield one result dict per path, in order, as soon as it is available.
+
+    With an Instrumentation the files are analyzed in this process, so it sees every run.
+    """
+    worker = partial(analyze_file, cache_directory=cache_directory, cache_max_bytes=cache_max_bytes,
+                     instrumentation=instrumentation, mapped=mapped, check=check)
+    if workers == 1 or instrumentation is not None:
+        yield from map(worker, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(worker, paths, chunksize=chunk_size)
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description="Lex and parse many source files in parallel.")
+    argument_parser.add_argument('targets', nargs='+', help="Directories or glob patterns")
+    argument_parser.add_argument('--pattern', default='*.txt', help="File name pattern inside directories")
+    argument_parser.add_argument('-j', '--workers', type=int, default=None,
+                                 help="Worker processes (default: one per CPU)")
+    argument_parser.add_argument('--chunk-size', type=int, default=8, help="Files sent to a worker at a time")
+    argument_parser.add_argument('--cache', metavar='DIRECTORY', help="Reuse results for unchanged files")
+    argument_parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                                 help="Cache size limit in MB")
+    argument_parser.add_argument('--json', action='store_true', help="Print one JSON object per file")
+    argument_parser.add_argument('--mmap', action='store_true',
+                                 help="Lex files through mmap instead of reading them into memory (no cache)")
+    argument_parser.add_argument('--check', action='store_true',
+                                 help="Also report undeclared and duplicate symbols and type errors")
+    argument_parser.add_argument('--profile', metavar='FILE',
+                                 help="Time phases and grammar rules (in a single process, without the cache) "
+                                      "and save them as JSON, or as a pstats dump for a .prof/.pstats FILE")
+    arguments = argument_parser.parse_args(argv)
+
+    paths = list(find_files(arguments.targets, arguments.pattern))
+    start = time.perf_counter()
+    files = failed = tokens = 0
+    instrumentation = Instrumentation() if arguments.profile else None
+    cache_directory = arguments.cache if instrumentation is None else None
+    results = analyze_files(paths, arguments.workers, arguments.chunk_size,
+                            cache_directory, arguments.cache_size * 1024 * 1024, instrumentation, arguments.mmap,
+                            arguments.check)
+    for result in results:
+        files += 1
+        tokens += result['tokens']
+        if not result['ok']:
+            failed += 1
+        if arguments.json:
+            print(json.dumps(result))
+        elif result['ok']:
+            print(f"PASS {result['path']} ({result['tokens']} tokens)")
+        else:
+            print(f"FAIL {result['path']} ({result['tokens']} tokens)")
+            for error in result['errors']:
+                print(f"    {error}")
+    elapsed = time.perf_counter() - start
+
+    summary = {'files': files, 'passed': files - failed, 'failed': failed, 'tokens': tokens,
+               'seconds': round(elapsed, 3)}
+    if arguments.json:
+        print(json.dumps({'summary': summary}))
+    else:
+        print(f"{files} files, {files - failed} passed, {failed} failed, {tokens} tokens in {elapsed:.2f} s")
+    if instrumentation is not None:
+        instrumentation.write(arguments.profile)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
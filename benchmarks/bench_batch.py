@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import analyze_files, find_files
+from benchmarks.programs import generate_program
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(file_count):
+            with open(os.path.join(directory, f"program{index}.txt"), 'w', encoding='utf-8') as file:
+                file.write(generate_program(1000, seed=index))
+        paths = list(find_files([directory]))
+
+        baseline = None
+        workers = 1
+        while workers <= (os.cpu_count() or 1):
+            start = time.perf_counter()
+            for _ in analyze_files(paths, workers):
+                pass
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:3} workers  {elapsed:7.2f} s  speedup {baseline / elapsed:5.2f}x")
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parse import Parser
+from incremental import IncrementalDocument
+from benchmarks.programs import generate_program
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generate_program(statements)
+    lines = text.count('\n')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        Parser(Lexer(text).tokenize_compact()).parse()
+        full = time.perf_counter() - start
+
+        document = IncrementalDocument(text)
+        offset = text.index('entero', len(text) // 2)
+        edits = 200
+        start = time.perf_counter()
+        for _ in range(edits):
+            document.edit(offset, len('entero'), 'entero')
+        incremental = (time.perf_counter() - start) / edits
+
+        # A broken first statement must not make the rest of the document one error segment
+        error_line = 'entero = 5;\n'
+        broken = IncrementalDocument(error_line + text)
+        start = time.perf_counter()
+        for _ in range(edits):
+            broken.edit(len(error_line) + offset, len('entero'), 'entero')
+        early_error = (time.perf_counter() - start) / edits
+
+        line = 'entero x = 1;\n'
+        start = time.perf_counter()
+        Parser(Lexer(line).tokenize_compact()).parse()
+        one_line = time.perf_counter() - start
+
+    print(f"{lines} lines, {len(text) / 1e6:.2f} MB")
+    print(f"full lex + parse       {full * 1000:10.2f} ms")
+    print(f"one-line edit          {incremental * 1000:10.3f} ms  ({document.last_analyzed} chars re-analyzed)")
+    print(f"edit after early error {early_error * 1000:10.3f} ms  ({broken.last_analyzed} chars re-analyzed)")
+    print(f"lex + parse one line   {one_line * 1000:10.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import analyze
+from interchange import dump, load
+from tokens import TOKEN_TYPES
+from benchmarks.programs import generate_program
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def count_kinds(analysis):
+    # Kinds fit the low byte of their little-endian uint32, bytes.count scans them without objects
+    kinds = analysis.column('kind').tobytes()[::4]
+    return {TOKEN_TYPES[kind]: kinds.count(kind) for kind in range(len(TOKEN_TYPES))}
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    text = generate_program(statements)
+    analysis, analyze_seconds = timed(analyze, text)
+    blob, dump_seconds = timed(dump, analysis.tokens, analysis.lex_errors, analysis.ast, analysis.diagnostics)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'program.lxa')
+        with open(path, 'wb') as file:
+            file.write(blob)
+        loaded, load_seconds = timed(load, path)
+        token, token_seconds = timed(lambda: loaded.tokens[len(loaded.tokens) // 2])
+        kinds, kinds_seconds = timed(count_kinds, loaded)
+        ast, ast_seconds = timed(loaded.ast)
+        assert ast == analysis.ast
+        assert token == analysis.tokens[len(analysis.tokens) // 2]
+        del loaded, token
+
+    print(f"{len(analysis.tokens)} tokens, {len(analysis.ast)} statements, file {len(blob) / 1e6:.1f} MB "
+          f"for {len(text) / 1e6:.1f} MB of source")
+    print(f"lex + parse              {analyze_seconds * 1000:10.2f} ms")
+    print(f"dump                     {dump_seconds * 1000:10.2f} ms")
+    print(f"load (mmap)              {load_seconds * 1000:10.3f} ms")
+    print(f"one token                {token_seconds * 1000:10.3f} ms")
+    print(f"count token kinds        {kinds_seconds * 1000:10.2f} ms  "
+          f"{kinds}")
+    print(f"rebuild AST              {ast_seconds * 1000:10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
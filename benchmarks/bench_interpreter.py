@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bytecode import Compiler
+from lexer import Lexer
+from interpreter import Interpreter
+from nodes import build_program
+from parse import Parser
+from vm import VM
+from benchmarks.programs import generate_loop_program
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def best_of(repeat, function, *args):
+    runs = [timed(function, *args) for _ in range(repeat)]
+    return runs[0][0], min(seconds for _, seconds in runs)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    text = generate_loop_program(iterations)
+    ast, parse_seconds = timed(lambda: Parser(Lexer(text).tokenize_compact()).parse())
+    program, build_seconds = timed(build_program, ast)
+    code_object, compile_seconds = timed(Compiler().compile, program)
+    variables, run_seconds = best_of(repeat, lambda: Interpreter().run(program))
+    vm_variables, vm_seconds = best_of(repeat, lambda: VM(code_object).run())
+    assert vm_variables == variables
+
+    body_runs = iterations * 10
+    print(f"loop body run {body_runs} times, total = {variables['total']}")
+    print(f"lex + parse  {parse_seconds * 1000:8.2f} ms")
+    print(f"build nodes  {build_seconds * 1000:8.2f} ms")
+    print(f"compile      {compile_seconds * 1000:8.2f} ms  ({len(code_object.code) // 4} instructions)")
+    print(f"interpret    {run_seconds * 1000:8.2f} ms  ({body_runs / run_seconds:,.0f} inner iterations/s)")
+    print(f"vm           {vm_seconds * 1000:8.2f} ms  ({body_runs / vm_seconds:,.0f} inner iterations/s)")
+    print(f"vm speedup   {run_seconds / vm_seconds:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lsp import LanguageClient
+from benchmarks.programs import generate_program
+
+URI = 'file:///bench.txt'
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def type_burst(client, line, text, version):
+    """Send one didChange per character of `text`, typed at the start of `line`."""
+    for column, character in enumerate(text):
+        version += 1
+        position = {'line': line, 'character': column}
+        client.notify('textDocument/didChange', {
+            'textDocument': {'uri': URI, 'version': version},
+            'contentChanges': [{'range': {'start': position, 'end': position}, 'text': character}],
+        })
+    return version
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    debounce = sys.argv[2] if len(sys.argv) > 2 else '200'
+    text = generate_program(statements)
+    client = LanguageClient([sys.executable, os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'lsp.py'), '--debounce', debounce])
+    client.request('initialize', {'capabilities': {}})
+    client.notify('initialized')
+
+    def open_document():
+        client.notify('textDocument/didOpen',
+                      {'textDocument': {'uri': URI, 'languageId': 'text', 'version': 0, 'text': text}})
+        return client.wait_for_notification('textDocument/publishDiagnostics', timeout=60)
+
+    _, open_seconds = timed(open_document)
+    _, tokens_seconds = timed(client.request, 'textDocument/semanticTokens/full', {'textDocument': {'uri': URI}})
+    _, symbols_seconds = timed(client.request, 'textDocument/documentSymbol', {'textDocument': {'uri': URI}})
+
+    # A typing burst in the middle of the document, then the highlighting the editor asks for
+    burst = 'entero nuevo = 1;\n'
+    start = time.perf_counter()
+    version = type_burst(client, text.count('\n') // 2, burst, 0)
+    client.request('textDocument/semanticTokens/full', {'textDocument': {'uri': URI}})
+    burst_seconds = time.perf_counter() - start
+    diagnostics = client.wait_for_notification('textDocument/publishDiagnostics',
+                                               lambda params: params['version'] == version)
+    time.sleep(float(debounce) / 1000 + 0.2)
+    published = 1 + sum(1 for message in client.notifications if message['method'] == 'textDocument/publishDiagnostics')
+    client.close()
+
+    print(f"{statements} statements, {len(text)} characters, debounce {debounce} ms")
+    print(f"open + diagnostics      {open_seconds * 1000:8.2f} ms")
+    print(f"semantic tokens         {tokens_seconds * 1000:8.2f} ms")
+    print(f"document symbols        {symbols_seconds * 1000:8.2f} ms")
+    print(f"{len(burst)} keystrokes + tokens {burst_seconds * 1000:8.2f} ms")
+    print(f"diagnostics published after the burst: {published} ({len(diagnostics['diagnostics'])} diagnostics)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from mapped import MappedLexer, open_mapped
+from benchmarks.programs import generate_program
+
+
+def measured(build):
+    """Result of `build`, seconds taken, and Python memory it keeps and peaks at (mmap pages aside).
+
+    Tracing slows allocations down a lot, the times are only comparable with each other."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, kept, peak
+
+
+def read_and_lex(path):
+    with open(path, encoding='utf-8') as file:
+        text = file.read()
+    return Lexer(text).tokenize_compact()
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'program.txt')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(generate_program(statements))
+    size = os.path.getsize(path)
+
+    tokens, text_seconds, text_kept, text_peak = measured(lambda: read_and_lex(path))
+    mapped, mapped_seconds, mapped_kept, mapped_peak = measured(
+        lambda: MappedLexer(open_mapped(path)).tokenize_compact())
+    assert len(tokens) == len(mapped)
+
+    print(f"{len(tokens)} tokens, {size / 1e6:.1f} MB source")
+    print(f"str source   {text_seconds:.3f} s  kept {text_kept / 1e6:6.1f} MB  peak {text_peak / 1e6:6.1f} MB")
+    print(f"mmap source  {mapped_seconds:.3f} s  kept {mapped_kept / 1e6:6.1f} MB  peak {mapped_peak / 1e6:6.1f} MB")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parse import Parser, IterativeParser
+from benchmarks.programs import generate_program, generate_nested_program
+
+
+def measure(parser_class, tokens):
+    start = time.perf_counter()
+    try:
+        parser_class(tokens).parse()
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+def main():
+    cases = [('flat, 50000 statements', generate_program(50000)),
+             ('nested 100 deep x 200', generate_nested_program(100, 200)),
+             ('nested 5000 deep', generate_nested_program(5000, 1))]
+    for name, text in cases:
+        tokens = Lexer(text).tokenize_compact()
+        timings = []
+        for parser_class in (Parser, IterativeParser):
+            elapsed = measure(parser_class, tokens)
+            timings.append('RecursionError' if elapsed is None else f"{elapsed:8.3f} s")
+        print(f"{name:26} recursive {timings[0]:>14}   iterative {timings[1]:>14}")
+
+
+if __name__ == '__main__':
+    main()
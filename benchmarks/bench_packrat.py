@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from packrat import PackratParser
+from parse import Parser
+from benchmarks.programs import ProgramGenerator
+
+
+def measure(make_parser, tokens, repeat):
+    best = parser = None
+    for _ in range(repeat):
+        parser = make_parser(tokens)
+        start = time.perf_counter()
+        parser.parse_with_recovery()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parser
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="PackratParser against Parser, with memo table statistics.")
+    argument_parser.add_argument('--statements', type=int, default=20000)
+    argument_parser.add_argument('--shapes', nargs='+', default=['mixed', 'declarations', 'functions'])
+    argument_parser.add_argument('--error-rate', type=float, default=0.02)
+    argument_parser.add_argument('--max-entries', type=int, default=4096, help="Memo table capacity")
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    arguments = argument_parser.parse_args()
+
+    for shape in arguments.shapes:
+        text = ProgramGenerator(shape, seed=0, error_rate=arguments.error_rate).generate(arguments.statements)
+        tokens = Lexer(text).tokenize_compact()
+        plain, reference = measure(Parser, tokens, arguments.repeat)
+        packrat, parser = measure(lambda tokens: PackratParser(tokens, arguments.max_entries), tokens,
+                                  arguments.repeat)
+        assert parser.diagnostics == reference.diagnostics
+        stats = parser.memo.stats()
+        print(f"{shape:14} Parser {plain * 1000:8.2f} ms  PackratParser {packrat * 1000:8.2f} ms "
+              f"({packrat / plain:4.2f}x)  hit rate {stats['hit_rate']:6.1%}  "
+              f"peak {stats['peak']} entries, {stats['evicted']} evicted")
+        for name, rule in stats['rules'].items():
+            print(f"    {name:28} {rule['hits']:7} hits {rule['misses']:7} misses  {rule['hit_rate']:6.1%}")
+
+
+if __name__ == '__main__':
+    main()
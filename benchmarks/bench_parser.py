@@ -0,0 +1,57 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lexer import Lexer
+from parse import Parser
+from benchmarks.programs import generate_program
+
+
+def parser_at_revision(revision):
+    """Parser class from parse.py as of a git revision, to compare against."""
+    source = subprocess.run(['git', 'show', f'{revision}:parse.py'], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    module = types.ModuleType(f'parse_{revision}')
+    exec(compile(source, f'{revision}:parse.py', 'exec'), module.__dict__)
+    return module.Parser
+
+
+def measure(parser_class, tokens, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_class(tokens).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description="Parse throughput on generated programs.")
+    argument_parser.add_argument('sizes', nargs='*', type=int, default=[10000, 100000],
+                                 help="Program sizes in statements")
+    argument_parser.add_argument('--baseline', metavar='REVISION', help="Also time parse.py from this git revision")
+    argument_parser.add_argument('--repeat', type=int, default=3)
+    arguments = argument_parser.parse_args()
+
+    parsers = [('current', Parser)]
+    if arguments.baseline:
+        parsers.append((arguments.baseline, parser_at_revision(arguments.baseline)))
+
+    for size in arguments.sizes:
+        tokens = Lexer(generate_program(size)).tokenize_in_order()
+        timings = {name: measure(parser_class, tokens, arguments.repeat) for name, parser_class in parsers}
+        reference = timings[parsers[-1][0]]
+        for name, elapsed in timings.items():
+            print(f"{size:8} statements  {name:10}  {elapsed:8.3f} s  {size / elapsed:12.0f} statements/s  "
+                  f"{reference / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
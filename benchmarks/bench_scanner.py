@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from benchmarks.programs import generate_program
+
+
+def measure(method_name, text, repeat=3):
+    best = None
+    tokens = 0
+    for _ in range(repeat):
+        lexer = Lexer(text)
+        start = time.perf_counter()
+        tokens = len(getattr(lexer, method_name)())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generate_program(statements)
+    print(f"Source: {len(text) / 1e6:.2f} MB, {statements} statements")
+    # Both backends must agree before their times mean anything, tests/test_scanners.py checks them in depth
+    assert Lexer(text).tokenize_regex().fields() == Lexer(text).tokenize_compact().fields()
+    for method_name in ['tokenize_in_order_charwise', 'tokenize_in_order', 'tokenize_compact',
+                        'tokenize_regex']:
+        tokens, elapsed = measure(method_name, text)
+        print(f"{method_name:28} {tokens:9} tokens  {elapsed:8.3f} s  "
+              f"{tokens / elapsed:12.0f} tokens/s  {len(text) / elapsed / 1e6:6.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Load test of service.py: starts it on a free local port and times concurrent pipelined clients.
+
+    python benchmarks/bench_service.py [--clients 8] [--requests 200] [--statements 20] [--window 8]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service import ServiceClient
+from benchmarks.programs import generate_program
+
+SERVICE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'service.py')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_client(port, texts, window, latencies):
+    client = await ServiceClient.connect(port=port)
+    slots = asyncio.Semaphore(window)  # Requests in flight per client
+
+    async def one(text):
+        async with slots:
+            start = time.perf_counter()
+            response = await client.analyze(text, tokens=False)
+            latencies.append(time.perf_counter() - start)
+            assert 'error' not in response, response['error']
+
+    await asyncio.gather(*(one(text) for text in texts))
+    await client.close()
+
+
+async def load(port, clients, texts, window):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(port, texts, window, latencies) for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def run(arguments, batch_size, texts):
+    process = subprocess.Popen([sys.executable, SERVICE, '--port', '0', '--batch-size', str(batch_size),
+                                *(['--workers', str(arguments.workers)] if arguments.workers else [])],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    try:
+        address = process.stdout.readline().split()[-1]  # "listening on host:port"
+        port = int(address.rsplit(':', 1)[1])
+        latencies, seconds = asyncio.run(load(port, arguments.clients, texts, arguments.window))
+    finally:
+        process.terminate()
+        _, errors = process.communicate(timeout=30)
+    requests = len(latencies)
+    print(f"batch size {batch_size:3}  {requests / seconds:9.1f} requests/s  "
+          f"latency p50 {percentile(latencies, 0.5) * 1000:7.2f} ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.2f} ms  ({errors.strip()})")
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--clients', type=int, default=8, help="Concurrent connections")
+    argument_parser.add_argument('--requests', type=int, default=200, help="Requests per client")
+    argument_parser.add_argument('--statements', type=int, default=20, help="Statements per request")
+    argument_parser.add_argument('--window', type=int, default=8, help="Requests in flight per client")
+    argument_parser.add_argument('--workers', type=int, default=None, help="Service worker processes")
+    arguments = argument_parser.parse_args()
+
+    texts = [generate_program(arguments.statements, seed=index) for index in range(arguments.requests)]
+    print(f"{arguments.clients} clients x {arguments.requests} requests of {arguments.statements} statements, "
+          f"{arguments.window} in flight per client")
+    for batch_size in (1, 16):
+        run(arguments, batch_size, texts)
+
+
+if __name__ == '__main__':
+    main()
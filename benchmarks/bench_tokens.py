@@ -0,0 +1,47 @@
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parse import Parser
+from benchmarks.programs import generate_program
+
+
+def allocated(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed_parse(tokens):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Parser(tokens).parse()
+    return time.perf_counter() - start
+
+
+def main():
+    statements = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generate_program(statements)
+
+    dict_tokens, dict_bytes = allocated(lambda: Lexer(text).tokenize_compact().to_dicts())
+    buffer, buffer_bytes = allocated(lambda: Lexer(text).tokenize_compact())
+    count = len(buffer)
+    assert count == len(dict_tokens)
+
+    print(f"{count} tokens from {statements} statements")
+    print(f"dict tokens    {dict_bytes / count:8.1f} bytes/token  parse {timed_parse(dict_tokens):.3f} s")
+    print(f"TokenBuffer    {buffer_bytes / count:8.1f} bytes/token  parse {timed_parse(buffer):.3f} s")
+    print(f"reduction      {dict_bytes / buffer_bytes:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
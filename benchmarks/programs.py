@@ -0,0 +1,160 @@
+import random
+
+TYPES = ['entero', 'decimal', 'booleano', 'cadena']
+
+
+def generate_program(statements, seed=0):
+    """Build a valid program with roughly `statements` top level statements."""
+    rng = random.Random(seed)
+    lines = []
+    for index in range(statements):
+        kind = rng.randrange(4)
+        name = f"var{index}"
+        if kind == 0:
+            lines.append(f"entero {name} = {rng.randrange(1000)};")
+        elif kind == 1:
+            lines.append(f'cadena {name} = "texto {index}";')
+        elif kind == 2:
+            lines.append(f"si ( {name} == {rng.randrange(10)} ) entonces {{\n"
+                         f"    {name} = {name} + 1;\n"
+                         f"}} sino {{\n"
+                         f"    {name} = {name} - 1;\n"
+                         f"}}")
+        else:
+            lines.append(f"mientras ( {name} < 10 ) hacer {{\n"
+                         f"    {name} = {name} * 2 + 1;\n"
+                         f"}}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_nested_program(depth, repeat=1):
+    """`repeat` copies of si/mientras blocks nested `depth` levels deep."""
+    lines = ["entero contador = 0;"]
+    for _ in range(repeat):
+        for level in range(depth):
+            if level % 2:
+                lines.append("mientras ( contador < 10 ) hacer {")
+            else:
+                lines.append("si ( contador == 0 ) entonces {")
+        lines.append("contador = contador + 1;")
+        lines.extend("}" for _ in range(depth))
+    return "\n".join(lines) + "\n"
+
+
+# Relative weight of each statement kind for the named program shapes
+SHAPES = {
+    'mixed': {'declaration': 4, 'assignment': 3, 'if': 2, 'while': 2, 'function': 1},
+    'declarations': {'declaration': 1},
+    'conditionals': {'if': 3, 'assignment': 1},
+    'loops': {'while': 3, 'assignment': 1},
+    'functions': {'function': 1},
+    'strings': {'string': 1},
+}
+
+# Small mistakes spliced into invalid programs, each breaks one statement
+MISTAKES = [
+    'entero = 5;',
+    'contador = ;',
+    'si ( contador == ) entonces { contador = 1; }',
+    'mientras ( contador < 3 ) { contador = 1; }',
+    'booleano flag = verdadero',
+    ') ;',
+]
+
+
+class ProgramGenerator:
+    """Synthetic programs of a given shape, optionally nested and with a share of broken statements.
+
+    `statements` counts every generated statement, nested ones included.
+    """
+
+    def __init__(self, shape='mixed', seed=0, max_depth=2, block_size=3, string_length=16, error_rate=0.0):
+        self.weights = SHAPES[shape]
+        self.rng = random.Random(seed)
+        self.max_depth = max_depth
+        self.block_size = block_size
+        self.string_length = string_length
+        self.error_rate = error_rate
+        self.statements = 0
+        self.errors = 0
+
+    def generate(self, statements):
+        self.statements = 0
+        self.errors = 0
+        lines = []
+        while self.statements < statements:
+            lines.append(self.statement(0, top_level=True))
+        return "\n".join(lines) + "\n"
+
+    def name(self):
+        return f"v{self.rng.randrange(1000)}"
+
+    def value(self, type_name):
+        if type_name == 'cadena':
+            return '"' + ''.join(self.rng.choice('abcdefghij ') for _ in range(self.string_length)) + '"'
+        if type_name == 'booleano':
+            return self.rng.choice(['verdadero', 'falso'])
+        return str(self.rng.randrange(1000))
+
+    def expression(self):
+        parts = [self.name()]
+        for _ in range(self.rng.randrange(4)):
+            parts.append(self.rng.choice('+-*/%'))
+            parts.append(self.rng.choice([self.name(), str(self.rng.randrange(100))]))
+        return ' '.join(parts)
+
+    def condition(self):
+        return f"{self.name()} {self.rng.choice(['==', '<=', '>=', '<', '>'])} {self.rng.randrange(100)}"
+
+    def block(self, depth):
+        return "\n".join(self.statement(depth + 1) for _ in range(self.rng.randint(1, self.block_size)))
+
+    def statement(self, depth, top_level=False):
+        self.statements += 1
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            return self.rng.choice(MISTAKES)
+
+        kinds = [kind for kind in self.weights if top_level or kind != 'function']
+        if depth >= self.max_depth:
+            kinds = [kind for kind in kinds if kind not in ('if', 'while')]
+        kind = self.rng.choices(kinds, [self.weights[kind] for kind in kinds])[0] if kinds else 'assignment'
+
+        if kind == 'declaration':
+            type_name = self.rng.choice(TYPES)
+            return f"{type_name} {self.name()} = {self.value(type_name)};"
+        if kind == 'string':
+            return f"cadena {self.name()} = {self.value('cadena')};"
+        if kind == 'assignment':
+            return f"{self.name()} = {self.expression()};"
+        if kind == 'if':
+            text = f"si ( {self.condition()} ) entonces {{\n{self.block(depth)}\n}}"
+            if self.rng.random() < 0.5:
+                text += f" sino {{\n{self.block(depth)}\n}}"
+            return text
+        if kind == 'while':
+            return f"mientras ( {self.condition()} ) hacer {{\n{self.block(depth)}\n}}"
+        parameters = ', '.join(f"{self.rng.choice(TYPES)} p{index}" for index in range(self.rng.randrange(4)))
+        return f"{self.rng.choice(TYPES)} f{self.rng.randrange(1000)}({parameters}) {{\n{self.block(depth)}\n}}"
+
+
+def generate_loop_program(iterations, inner=10):
+    """Two nested counting loops whose body runs `iterations` * `inner` times, for the interpreters."""
+    return (f"entero i = 0;\n"
+            f"entero j = 0;\n"
+            f"entero total = 0;\n"
+            f"entero limite = {iterations};\n"
+            f"entero interno = {inner};\n"
+            "mientras ( i < limite ) hacer {\n"
+            "    j = 0;\n"
+            "    mientras ( j < interno ) hacer {\n"
+            "        total = total + i * j % 7 - j / 2;\n"
+            "        si ( total > 1000 ) entonces {\n"
+            "            total = total - 1000;\n"
+            "        } sino {\n"
+            "            total = total + 1;\n"
+            "        }\n"
+            "        j = j + 1;\n"
+            "    }\n"
+            "    i = i + 1;\n"
+            "}\n")
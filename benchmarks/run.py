@@ -0,0 +1,149 @@
+"""Benchmark suite: times each pipeline phase on generated programs and writes the results as JSON.
+
+    python benchmarks/run.py --statements 20000 --output results.json
+    python benchmarks/run.py --compare results.json --threshold 10
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexer import Lexer
+from parse import Parser
+from benchmarks.programs import SHAPES, ProgramGenerator
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()  # Keep garbage from the previous run out of the timing
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def parse_all(tokens):
+    # Invalid programs go through error recovery so the whole file is still parsed
+    parser = Parser(tokens)
+    ast, _ = parser.parse_with_recovery()
+    return ast
+
+
+def run_case(shape, statements, error_rate, repeat, seed):
+    generator = ProgramGenerator(shape, seed=seed, error_rate=error_rate)
+    text = generator.generate(statements)
+    tokens = Lexer(text).tokenize_in_order()
+    token_count = len(tokens)
+
+    phases = {
+        'tokenize': lambda: Lexer(text).tokenize(),
+        'tokenize_in_order': lambda: Lexer(text).tokenize_in_order(),
+        'parse': lambda: parse_all(tokens),
+    }
+    results = {}
+    for phase, function in phases.items():
+        seconds = best_time(function, repeat)
+        results[phase] = {
+            'seconds': round(seconds, 6),
+            'peak_bytes': peak_memory(function),
+        }
+        if phase == 'parse':
+            results[phase]['statements_per_second'] = round(generator.statements / seconds)
+        else:
+            results[phase]['tokens_per_second'] = round(token_count / seconds)
+    return {
+        'shape': shape,
+        'valid': not error_rate,
+        'statements': generator.statements,
+        'errors': generator.errors,
+        'tokens': token_count,
+        'bytes': len(text.encode('utf-8')),
+        'phases': results,
+    }
+
+
+def case_key(case):
+    return f"{case['shape']}/{'valid' if case['valid'] else 'invalid'}"
+
+
+def compare(report, baseline, threshold):
+    """Print phase timings against a previous report, returns the regressions beyond `threshold` percent."""
+    previous = {case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in report['cases']:
+        old = previous.get(case_key(case))
+        if old is None:
+            continue
+        for phase, result in case['phases'].items():
+            if phase not in old['phases']:
+                continue
+            # Compare per statement so runs of different sizes stay comparable
+            before = old['phases'][phase]['seconds'] / old['statements']
+            after = result['seconds'] / case['statements']
+            change = (after - before) / before * 100
+            marker = ''
+            if change > threshold:
+                marker = '  REGRESSION'
+                regressions.append((case_key(case), phase, change))
+            print(f"{case_key(case):24} {phase:18} {change:+7.1f}%{marker}")
+    return regressions
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--statements', type=int, default=10000, help="Statements per program")
+    argument_parser.add_argument('--shapes', nargs='+', default=list(SHAPES), choices=list(SHAPES))
+    argument_parser.add_argument('--error-rate', type=float, default=0.02,
+                                 help="Share of broken statements in the invalid variant of each shape")
+    argument_parser.add_argument('--repeat', type=int, default=3, help="Timing runs per phase, the best is kept")
+    argument_parser.add_argument('--seed', type=int, default=0)
+    argument_parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    argument_parser.add_argument('--compare', metavar='BASELINE', help="JSON report of a previous run")
+    argument_parser.add_argument('--threshold', type=float, default=10.0,
+                                 help="Slowdown in percent reported as a regression")
+    arguments = argument_parser.parse_args()
+
+    cases = []
+    for shape in arguments.shapes:
+        for error_rate in (0.0, arguments.error_rate):
+            cases.append(run_case(shape, arguments.statements, error_rate, arguments.repeat, arguments.seed))
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': cases,
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    elif not arguments.compare:
+        print(json.dumps(report, indent=2))
+
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(report, baseline, arguments.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
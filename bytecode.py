@@ -0,0 +1,309 @@
+from array import array
+
+from nodes import (Assignment, BinaryOp, FunctionDeclaration, If, Name, Node, NodeVisitor, VariableDeclaration, While,
+                   build_program)
+from optimizer import Optimizer
+
+# Every instruction is four ints in the code array: opcode and three operands, unused ones are 0.
+# Operands name registers: variable slots first, then the constant pool, then temporaries.
+MOVE = 0             # dst, src: copy a value that already has the type of dst
+STORE_INT = 1        # dst, src: copy converting to the declared type of dst
+STORE_FLOAT = 2
+STORE_BOOL = 3
+STORE_STR = 4
+STORE_TYPED = 5      # dst, src: copy converting to the type dst was last declared with
+DECLARE = 6          # slot, type: set the current type of a variable declared with several types
+CHECK = 7            # slot: fail unless the variable is declared
+ADD = 8              # dst, left, right
+SUB = 9
+MUL = 10
+DIV = 11
+MOD = 12
+JUMP_IF_NOT_EQ = 13  # left, right, target: jump unless the comparison holds
+JUMP_IF_NOT_LE = 14
+JUMP_IF_NOT_GE = 15
+JUMP_IF_NOT_LT = 16
+JUMP_IF_NOT_GT = 17
+LOOP_IF_EQ = 18      # left, right, target: count a loop iteration and jump back if the comparison holds
+LOOP_IF_LE = 19
+LOOP_IF_GE = 20
+LOOP_IF_LT = 21
+LOOP_IF_GT = 22
+STEP = 23            # count the first iteration of a loop
+JUMP = 24            # -, -, target
+HALT = 25
+
+OPCODES = ['MOVE', 'STORE_INT', 'STORE_FLOAT', 'STORE_BOOL', 'STORE_STR', 'STORE_TYPED', 'DECLARE', 'CHECK',
+           'ADD', 'SUB', 'MUL', 'DIV', 'MOD',
+           'JUMP_IF_NOT_EQ', 'JUMP_IF_NOT_LE', 'JUMP_IF_NOT_GE', 'JUMP_IF_NOT_LT', 'JUMP_IF_NOT_GT',
+           'LOOP_IF_EQ', 'LOOP_IF_LE', 'LOOP_IF_GE', 'LOOP_IF_LT', 'LOOP_IF_GT',
+           'STEP', 'JUMP', 'HALT']  # Opcode -> name
+
+BINARY_OPCODES = {'+': ADD, '-': SUB, '*': MUL, '/': DIV, '%': MOD}
+JUMP_UNLESS = {'==': JUMP_IF_NOT_EQ, '<=': JUMP_IF_NOT_LE, '>=': JUMP_IF_NOT_GE, '<': JUMP_IF_NOT_LT,
+               '>': JUMP_IF_NOT_GT}
+LOOP_IF = {'==': LOOP_IF_EQ, '<=': LOOP_IF_LE, '>=': LOOP_IF_GE, '<': LOOP_IF_LT, '>': LOOP_IF_GT}
+JUMP_OPCODES = frozenset([JUMP, *JUMP_UNLESS.values(), *LOOP_IF.values()])
+
+OPERATOR_SYMBOLS = {opcode: symbol for table in (BINARY_OPCODES, JUMP_UNLESS, LOOP_IF)
+                    for symbol, opcode in table.items()}  # Opcode -> source operator, for error messages
+
+STORE_OPCODES = {'entero': STORE_INT, 'decimal': STORE_FLOAT, 'booleano': STORE_BOOL, 'cadena': STORE_STR}
+STORE_TYPES = {opcode: type_name for type_name, opcode in STORE_OPCODES.items()}
+VALUE_TYPES = {int: 'entero', float: 'decimal', bool: 'booleano', str: 'cadena'}
+NUMERIC_TYPES = ('entero', 'decimal')
+
+
+def variable_names(node):
+    """Identifiers of the variables a statement or expression uses, nested statements included."""
+    if isinstance(node, FunctionDeclaration):
+        return  # Never runs, there is no call syntax
+    if isinstance(node, Name):
+        yield node.identifier
+    elif isinstance(node, (VariableDeclaration, Assignment)):
+        yield node.identifier
+    for name in node.fields:
+        value = getattr(node, name)
+        for child in value if isinstance(value, list) else [value]:
+            if isinstance(child, Node):
+                yield from variable_names(child)
+
+
+class CodeObject:
+    """Compiled program: packed instructions, constant pool and one slot per variable."""
+
+    def __init__(self, code, constants, names, temporaries, functions):
+        self.code = code                # array('i'), four ints per instruction
+        self.constants = constants      # Registers len(names) onwards
+        self.names = names              # Slot (register) -> variable name
+        self.temporaries = temporaries  # Registers after the constants
+        self.functions = functions      # Name -> FunctionDeclaration node, there is no call instruction
+
+    def registers(self):
+        """Fresh register file: unset slots, the constants and room for the temporaries."""
+        return [None] * len(self.names) + self.constants + [None] * self.temporaries
+
+    def instructions(self):
+        """(opcode, a, b, c) tuples, the form VM runs."""
+        return list(zip(*[iter(self.code)] * 4))
+
+
+class Compiler(NodeVisitor):
+    """Compiles node classes to a CodeObject of three-address instructions over registers.
+
+    Stores convert to the declared type like Interpreter does. The conversion is left out when the
+    expression already has that type, so arithmetic writes straight into the variable, and decided
+    at run time (STORE_TYPED) for a variable declared with several types. Variables that may still
+    be undeclared are checked before use.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.code = array('i')
+        self.constants = []
+        self.constant_index = {}  # (type, value) -> constant pool index
+        self.slots = {}           # Variable name -> slot
+        self.declared_types = {}  # Variable name -> set of declared types anywhere in the program
+        self.declared = set()     # Variables declared on every path reaching the current instruction
+        self.temporaries = 0      # Temporaries in use by the expression being compiled
+        self.max_temporaries = 0
+        self.functions = {}
+
+    def compile(self, program):
+        self.collect_types(program)
+        for statement in program:
+            self.visit(statement)
+        self.emit(HALT)
+        self.place_temporaries()
+        return CodeObject(self.code, self.constants, list(self.slots), self.max_temporaries, self.functions)
+
+    def collect_types(self, statements):
+        # Slots are numbered before any code is emitted, constants come right after them
+        for statement in statements:
+            for identifier in variable_names(statement):
+                self.slots.setdefault(identifier, len(self.slots))
+            if isinstance(statement, VariableDeclaration):
+                self.declared_types.setdefault(statement.identifier, set()).add(statement.type_name)
+            elif isinstance(statement, If):
+                self.collect_types(statement.body)
+                self.collect_types(statement.orelse)
+            elif isinstance(statement, While):
+                self.collect_types(statement.body)
+
+    def place_temporaries(self):
+        # Temporaries are numbered -1, -2, ... while the constant pool grows, they move after it once
+        # it is complete. Negative indices would also miss the list fast path in the VM.
+        first = len(self.slots) + len(self.constants)
+        for opcode_position in range(0, len(self.code), 4):
+            operands = 3 if self.code[opcode_position] in BINARY_OPCODES.values() else 2
+            for position in range(opcode_position + 1, opcode_position + 1 + operands):
+                if self.code[position] < 0:
+                    self.code[position] = first - self.code[position] - 1
+
+    def emit(self, opcode, a=0, b=0, c=0):
+        self.code.extend((opcode, a, b, c))
+        return len(self.code) - 1  # Position of `c`, where jumps keep their target
+
+    def here(self):
+        return len(self.code) // 4  # Index of the next instruction
+
+    def constant(self, value):
+        key = (type(value), value)
+        index = self.constant_index.get(key)
+        if index is None:
+            index = self.constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return len(self.slots) + index
+
+    def slot(self, identifier):
+        """Slot of a variable that must be declared at this point, checked at run time unless certain."""
+        slot = self.slots[identifier]
+        if identifier not in self.declared:
+            self.emit(CHECK, slot)
+        return slot
+
+    def static_type(self, identifier):
+        """Declared type of a variable when it only ever has one, else None."""
+        types = self.declared_types.get(identifier)
+        if types and len(types) == 1:
+            return next(iter(types))
+        return None
+
+    def type_of(self, node):
+        """Type every value of the expression has, None when only known at run time."""
+        if isinstance(node, Name):
+            return self.static_type(node.identifier)
+        if isinstance(node, BinaryOp):
+            left = self.type_of(node.left)
+            right = self.type_of(node.right)
+            if left in NUMERIC_TYPES and right in NUMERIC_TYPES:
+                return 'entero' if left == right == 'entero' and node.operator != '/' else 'decimal'
+            return None
+        return VALUE_TYPES[type(node.value)]
+
+    def expression(self, node, target=None):
+        """Emit code computing `node`, returns the register holding its value.
+
+        An operation writes into `target` when given, otherwise into a temporary.
+        """
+        if isinstance(node, Name):
+            return self.slot(node.identifier)
+        if not isinstance(node, BinaryOp):
+            return self.constant(node.value)
+        depth = self.temporaries
+        left = self.expression(node.left)
+        right = self.expression(node.right)
+        # Operand temporaries are free once read, the result takes the first of them
+        self.temporaries = depth + 1
+        self.max_temporaries = max(self.max_temporaries, self.temporaries)
+        if target is None:
+            target = -self.temporaries
+        self.emit(BINARY_OPCODES[node.operator], target, left, right)
+        return target
+
+    def store(self, identifier, expression, check=False):
+        """Evaluate `expression` into a variable, with `check` failing afterwards if it is undeclared."""
+        slot = self.slots[identifier]
+        target_type = self.static_type(identifier)
+        same_type = target_type is not None and target_type == self.type_of(expression)
+        if same_type and not check and isinstance(expression, BinaryOp):
+            self.expression(expression, target=slot)
+        else:
+            source = self.expression(expression)
+            if check:
+                self.emit(CHECK, slot)
+            if same_type:
+                self.emit(MOVE, slot, source)
+            else:
+                self.emit(STORE_OPCODES[target_type] if target_type is not None else STORE_TYPED, slot, source)
+        self.temporaries = 0
+
+    def visit_VariableDeclaration(self, node):
+        if self.static_type(node.identifier) is None:
+            self.emit(DECLARE, self.slots[node.identifier], self.constant(node.type_name))
+        self.store(node.identifier, node.value)
+        self.declared.add(node.identifier)
+
+    def visit_Assignment(self, node):
+        # Like the interpreter, an undeclared variable is only reported once the expression has run
+        self.store(node.identifier, node.expression, check=node.identifier not in self.declared)
+
+    def block(self, statements):
+        # Declarations in a block may not run, they do not count as declared after it
+        declared = set(self.declared)
+        for statement in statements:
+            self.visit(statement)
+        self.declared = declared
+
+    def condition(self, comparison, opcodes=JUMP_UNLESS, target=0):
+        """Code that jumps when `comparison` is false, returns where to patch in its target.
+
+        With `opcodes=LOOP_IF` it jumps to `target` when the comparison holds instead.
+        """
+        left = self.expression(comparison.left)
+        right = self.expression(comparison.right)
+        return self.emit(opcodes[comparison.operator], left, right, target)
+
+    def visit_If(self, node):
+        jump_to_else = self.condition(node.condition)
+        self.block(node.body)
+        if node.orelse:
+            jump_to_end = self.emit(JUMP)
+            self.code[jump_to_else] = self.here()
+            self.block(node.orelse)
+            self.code[jump_to_end] = self.here()
+        else:
+            self.code[jump_to_else] = self.here()
+
+    def visit_While(self, node):
+        # The condition is tested once on entry and again at the bottom of the body, so an iteration
+        # dispatches one conditional jump back instead of a jump plus the test at the top
+        jump_to_end = self.condition(node.condition)
+        self.emit(STEP)
+        start = self.here()
+        self.block(node.body)
+        self.condition(node.condition, LOOP_IF, start)
+        self.code[jump_to_end] = self.here()
+
+    def visit_FunctionDeclaration(self, node):
+        self.functions[node.name] = node
+
+
+def compile_program(ast, optimize=False):
+    """CodeObject of the dict AST returned by Parser.parse, run through optimizer.Optimizer if `optimize`."""
+    program = build_program(ast)
+    if optimize:
+        program = Optimizer().optimize(program)
+    return Compiler().compile(program)
+
+
+def register_name(code_object, register):
+    if register < len(code_object.names):
+        return code_object.names[register]
+    register -= len(code_object.names)
+    if register < len(code_object.constants):
+        return repr(code_object.constants[register])
+    return f"t{register - len(code_object.constants) + 1}"
+
+
+def disassemble(code_object):
+    """One line per instruction: index, opcode name and operands, with jump targets marked '>>'."""
+    instructions = code_object.instructions()
+    targets = {c for opcode, a, b, c in instructions if opcode in JUMP_OPCODES}
+    lines = []
+    for index, (opcode, a, b, c) in enumerate(instructions):
+        if opcode == JUMP:
+            operands = f"to {c}"
+        elif opcode in JUMP_OPCODES:
+            operands = f"{register_name(code_object, a)}, {register_name(code_object, b)}, to {c}"
+        elif opcode == CHECK:
+            operands = register_name(code_object, a)
+        elif opcode in (STEP, HALT):
+            operands = ''
+        elif opcode in BINARY_OPCODES.values():
+            operands = ', '.join(register_name(code_object, register) for register in (a, b, c))
+        else:
+            operands = f"{register_name(code_object, a)}, {register_name(code_object, b)}"
+        marker = '>>' if index in targets else '  '
+        lines.append(f"{marker} {index:5} {OPCODES[opcode]:16} {operands}".rstrip())
+    return '\n'.join(lines)
@@ -0,0 +1,157 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+from lexer import Lexer
+from parse import Parser
+from tokens import TokenBuffer
+
+MAGIC = b'LXC1'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Any change to the scanner, token store or parser must invalidate old entries
+VERSIONED_MODULES = ['lexer.py', 'literals.py', 'scanner.py', 'positions.py', 'tokens.py', 'parse.py', 'cache.py']
+
+
+def version_tag():
+    digest = hashlib.sha256(MAGIC)
+    digest.update(sys.version.encode())  # marshal data is tied to the interpreter version
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in VERSIONED_MODULES:
+        with open(os.path.join(here, name), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+class CachedAnalysis:
+    """Tokens, lexer errors, (partial) AST and parser diagnostics of one source, as stored in the cache."""
+
+    def __init__(self, tokens, lex_errors, ast, diagnostics):
+        self.tokens = tokens
+        self.lex_errors = lex_errors
+        self.ast = ast
+        self.diagnostics = diagnostics
+
+
+class AnalysisCache:
+    """Content-addressed on-disk cache of analysis results, bounded in size with LRU eviction.
+
+    Entries are written to a temporary file and renamed into place, and reads treat vanished
+    files as misses, so several processes can share a directory. Hits refresh the entry mtime,
+    which is the LRU clock used when evicting.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version_tag()
+        self.written = 0  # Bytes written since the last eviction pass
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8', 'surrogatepass')
+        return hashlib.sha256(self.version.encode() + data).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.bin')
+
+    def get(self, text, data=None):
+        """Cached analysis of `text` (whose encoded bytes may be passed as `data`), or None."""
+        path = self.path(self.key(data if data is not None else text))
+        try:
+            with open(path, 'rb') as file:
+                blob = file.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            if blob[:4] != MAGIC:
+                raise ValueError("Not a cache entry")
+            columns, lex_errors, ast, diagnostics = marshal.loads(blob[4:])
+            tokens = TokenBuffer.load_columns(text, columns)
+        except (ValueError, EOFError, TypeError):
+            # Truncated or corrupt, e.g. by a full disk: drop it so the next put replaces it
+            self.misses += 1
+            self.discard(path)
+            return None
+        self.hits += 1
+        return CachedAnalysis(tokens, lex_errors, ast, diagnostics)
+
+    def put(self, text, analysis, data=None):
+        path = self.path(self.key(data if data is not None else text))
+        blob = MAGIC + marshal.dumps((analysis.tokens.dump_columns(), analysis.lex_errors,
+                                      analysis.ast, analysis.diagnostics))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(blob)
+            os.replace(temporary, path)
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self.written += len(blob)
+        if self.written > self.max_bytes // 10:
+            self.evict()
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Already replaced or evicted by another process
+
+    def entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.bin'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue  # Evicted by another process meanwhile
+                    yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in `max_bytes`."""
+        self.written = 0
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+
+
+def analyze(text, cache=None, data=None, instrumentation=None):
+    """Lex and parse `text`, going through `cache` when given. Returns a CachedAnalysis.
+
+    An Instrumentation collects phase timings and rule counters of the run (cache hits skip both phases).
+    """
+    if cache is not None:
+        analysis = cache.get(text, data)
+        if analysis is not None:
+            return analysis
+
+    lexer = Lexer(text)
+    if instrumentation is None:
+        tokens = lexer.tokenize_compact()
+        ast, diagnostics = Parser(tokens).parse_with_recovery()
+    else:
+        with instrumentation.phase('lex'):
+            tokens = lexer.tokenize_compact()
+        instrumentation.count_tokens(tokens)
+        parser = instrumentation.attach(Parser(tokens))
+        with instrumentation.phase('parse'):
+            ast, diagnostics = parser.parse_with_recovery()
+    analysis = CachedAnalysis(tokens, lexer.errors, ast, diagnostics)
+    if cache is not None:
+        cache.put(text, analysis, data)
+    return analysis
@@ -0,0 +1,238 @@
+from literals import UNTERMINATED_STRING
+from parse import Parser
+from scanner import Scanner
+
+
+class Segment:
+    """One top-level statement with the whitespace around it, and its tokens and AST node.
+
+    Positions inside a segment (tokens, lexer errors, parse error) are relative to the segment,
+    so segments after an edit are kept as they are and only their place in the document moves.
+    """
+
+    __slots__ = ('text', 'tokens', 'lex_errors', 'node', 'error')
+
+    def __init__(self, text, node=None, error=None):
+        self.text = text
+        self.node = node
+        self.error = error  # {'message', 'line', 'column'} when the statement does not parse
+        self.tokens, self.lex_errors = Scanner(text).scan()
+
+
+def analyze(text):
+    """Lex and parse `text` into segments.
+
+    A statement that does not parse is skipped in panic mode (Parser.synchronize) and becomes a
+    segment of its own with the error, the text after it is split as usual.
+
+    Returns (segments, ran_out), `ran_out` is True when the text ends in the middle of a statement
+    or a string literal, i.e. the following text is needed to analyze it.
+    """
+    tokens, lex_errors = Scanner(text).scan()
+    # The closing quote of an unterminated string may come in the following text
+    unterminated = any(error.get('message') == UNTERMINATED_STRING for error in lex_errors)
+
+    parser = Parser(tokens)
+    segments = []
+    segment_start = 0
+    while parser.current_token():
+        start = parser.current_token_index
+        error = None
+        try:
+            node = parser.parse_statement()
+        except SyntaxError as syntax_error:
+            node = None
+            error = segment_error(syntax_error, tokens, segment_start)
+            if not parser.synchronize(start, in_block=False):
+                # The broken statement runs into the following text
+                segments.append(Segment(text[segment_start:], error=error))
+                return segments, True
+        last = parser.current_token_index - 1
+        segment_end = tokens.starts[last] + tokens.lengths[last]
+        if node is not None:
+            # Statement positions are relative to the analyzed text
+            start_line, start_column = tokens.line_index.position(segment_start)
+            node = moved(node, lambda item: relative(item, start_line, start_column))
+        segments.append(Segment(text[segment_start:segment_end], node=node, error=error))
+        segment_start = segment_end
+
+    if segment_start < len(text) or not segments:
+        trailing = text[segment_start:]
+        if segments:
+            last = segments[-1]
+            segments[-1] = Segment(last.text + trailing, node=last.node, error=last.error)
+        else:
+            segments.append(Segment(trailing))
+    return segments, unterminated
+
+
+def segment_error(error, tokens, segment_start):
+    """Error dict of a SyntaxError, positioned relative to the segment starting at `segment_start`."""
+    index = getattr(error, 'token_index', None) if getattr(error, 'token', None) else len(tokens) - 1
+    result = {'message': getattr(error, 'reason', str(error)), 'line': 1, 'column': 1}
+    if index >= 0:
+        # Token positions are relative to the analyzed text
+        line, column = tokens.position(index)
+        start_line, start_column = tokens.line_index.position(segment_start)
+        result['line'] = line - start_line + 1
+        result['column'] = column - start_column + 1 if line == start_line else column
+    return result
+
+
+class IncrementalDocument:
+    """Keeps tokens and AST of a document up to date under edits.
+
+    `edit` re-lexes and re-parses only the top-level statements touched by the edit, growing the
+    region while the new text runs into the following statements (an opened block or string).
+    """
+
+    def __init__(self, text=''):
+        self.segments, _ = analyze(text)
+        self.offsets = [0] * len(self.segments)  # Start of each segment, valid for the first `valid`
+        self.valid = 1
+        self.last_analyzed = len(text)  # Characters re-analyzed by the last edit
+
+    @property
+    def text(self):
+        return ''.join(segment.text for segment in self.segments)
+
+    @property
+    def ast(self):
+        """Statement nodes of the document, copied with absolute positions."""
+        return [moved(segment.node, lambda item: absolute(item, line, column))
+                for segment, line, column in self.positions() if segment.node is not None]
+
+    def segment_index(self, offset):
+        """Index of the segment containing `offset`, computing segment starts only as far as needed."""
+        segments = self.segments
+        offsets = self.offsets
+        if offset < offsets[self.valid - 1]:
+            low, high = 0, self.valid - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if offsets[middle] <= offset:
+                    low = middle
+                else:
+                    high = middle - 1
+            return low
+        index = self.valid - 1
+        while index + 1 < len(segments) and offsets[index] + len(segments[index].text) <= offset:
+            offsets[index + 1] = offsets[index] + len(segments[index].text)
+            index += 1
+        self.valid = max(self.valid, index + 1)
+        return index
+
+    def edit(self, offset, removed, inserted):
+        """Replace `removed` characters at `offset` with `inserted`, returns the re-analyzed segment range."""
+        segments = self.segments
+        end = offset + removed
+        first = self.segment_index(offset)
+        if first > 0 and offset == self.offsets[first]:
+            first -= 1  # The edit touches the end of the previous statement
+        last = self.segment_index(end)
+        # Quotes may pair up differently when the edit adds, removes or lands next to a quote or a
+        # backslash, which can close a string left unterminated in an earlier statement
+        start = self.offsets[first]
+        old_text = ''.join(segment.text for segment in segments[first:last + 1])
+        touched = inserted + old_text[max(offset - start - 1, 0):end - start + 1]
+        if '"' in touched or '\\' in touched:
+            first = self.unterminated_before(first)
+        if first > 0 and segments[first - 1].error is not None:
+            first -= 1  # Panic mode may have stopped at the keyword the edit changes
+        region_start = self.offsets[first]
+
+        if region_start != start:
+            old_text = ''.join(segment.text for segment in segments[first:last + 1])
+        text = old_text[:offset - region_start] + inserted + old_text[end - region_start:]
+        while True:
+            new_segments, ran_out = analyze(text)
+            following = segments[last + 1] if last + 1 < len(segments) else None
+            if following is None or not (ran_out or following.error):
+                break
+            # Take in more of the document, doubling the region so long runs stay linear
+            grow_to = min(len(segments), last + 1 + max(1, last - first + 1))
+            text += ''.join(segment.text for segment in segments[last + 1:grow_to])
+            last = grow_to - 1
+
+        segments[first:last + 1] = new_segments
+        self.offsets[first:last + 1] = [region_start] * len(new_segments)
+        self.valid = first + 1
+        self.last_analyzed = len(text)
+        return first, first + len(new_segments)
+
+    def unterminated_before(self, index):
+        """Index of the earliest segment before `index` holding an unterminated string, or `index`.
+
+        No quote after such a string closes it, so every later quote is escaped and opens an
+        unterminated string itself: the candidates are the segments with quotes going back until
+        one has none left unterminated.
+        """
+        found = index
+        for candidate in range(index - 1, -1, -1):
+            segment = self.segments[candidate]
+            if '"' in segment.text:
+                if not any(error.get('message') == UNTERMINATED_STRING for error in segment.lex_errors):
+                    break
+                found = candidate
+        return found
+
+    def positions(self):
+        """Yield (segment, line, column) with the absolute position where each segment starts."""
+        line, column = 1, 1
+        for segment in self.segments:
+            yield segment, line, column
+            text = segment.text
+            newlines = text.count('\n')
+            if newlines:
+                line += newlines
+                column = len(text) - text.rfind('\n')
+            else:
+                column += len(text)
+
+    def tokens(self):
+        """Token dicts of the whole document, as Lexer.tokenize_in_order would return them."""
+        result = []
+        for segment, line, column in self.positions():
+            for token in segment.tokens.to_dicts():
+                result.append(absolute(token, line, column))
+        return result
+
+    def errors(self):
+        """Lexer error dicts followed by parse errors, with absolute positions."""
+        lex_errors = []
+        parse_errors = []
+        for segment, line, column in self.positions():
+            lex_errors.extend(absolute(error, line, column) for error in segment.lex_errors)
+            if segment.error is not None:
+                parse_errors.append(absolute(segment.error, line, column))
+        return lex_errors + parse_errors
+
+
+def absolute(item, line, column):
+    """Copy of a token or error dict moved from segment-relative to document position."""
+    item = dict(item)
+    if item['line'] == 1:
+        item['column'] += column - 1
+    item['line'] += line - 1
+    return item
+
+
+def relative(item, line, column):
+    """Copy of a dict positioned in the analyzed text moved to the segment starting at (line, column)."""
+    item = dict(item)
+    if item['line'] == line:
+        item['column'] -= column - 1
+    item['line'] -= line - 1
+    return item
+
+
+def moved(node, move):
+    """Copy of a statement node and the statements in its blocks, each moved by `move`."""
+    node = move(node)
+    if 'statements' in node:
+        node['statements'] = [moved(statement, move) for statement in node['statements']]
+    for key in ('if_block', 'else_block'):
+        if key in node:
+            block = node[key] = dict(node[key])
+            block['statements'] = [moved(statement, move) for statement in block['statements']]
+    return node
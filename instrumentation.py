@@ -0,0 +1,136 @@
+import json
+import marshal
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from tokens import TOKEN_TYPES, TokenBuffer
+
+# Parser methods timed as grammar rules besides the parse_* ones
+EXTRA_RULES = ['synchronize', 'open_statement', 'close_open_block']
+LOOKAHEAD = ['peek_token', 'peek_next_token']
+
+
+class Instrumentation:
+    """Phase timers and hot-path counters collected across one run.
+
+    Nothing in Lexer or Parser knows about it: `attach` shadows the rule methods of one parser
+    instance with counting wrappers, so runs without instrumentation execute the plain methods.
+    """
+
+    def __init__(self):
+        self.phases = {}            # Phase name -> [calls, seconds]
+        self.token_types = Counter()
+        self.lookahead = Counter()  # peek_token / peek_next_token calls
+        self.rules = {}             # (file, line, name) -> [primitive calls, calls, own time, total time, callers]
+        self.stack = []             # [key, start, time spent in nested rules] of the active rules
+        self.active = Counter()     # Rule key -> recursion depth, total time is counted once per outer call
+
+    @contextmanager
+    def phase(self, name):
+        # Phases sit on the rule stack too, so the pstats dump shows them as callers of the rules
+        key = ('~', 0, f'<{name}>')
+        frame = [key, time.perf_counter(), 0.0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            self.stack.pop()
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            self.record(key, None, elapsed, elapsed - frame[2], outer=True)
+
+    def count_tokens(self, tokens):
+        if isinstance(tokens, TokenBuffer):
+            for kind, count in Counter(tokens.kinds).items():
+                self.token_types[TOKEN_TYPES[kind]] += count
+        else:
+            self.token_types.update(token['type'] for token in tokens)
+
+    def attach(self, parser):
+        """Instrument `parser` (a Parser or IterativeParser) for the rest of its life."""
+        for name in dir(type(parser)):
+            if name.startswith('parse_') or name in EXTRA_RULES:
+                setattr(parser, name, self.timed(getattr(parser, name)))
+        for name in LOOKAHEAD:
+            setattr(parser, name, self.counted(name, getattr(parser, name)))
+        # The dispatch tables hold the methods bound before wrapping
+        for handlers in (parser.statement_handlers, parser.block_handlers):
+            for key, handler in handlers.items():
+                handlers[key] = getattr(parser, handler.__name__)
+        return parser
+
+    def counted(self, name, method):
+        lookahead = self.lookahead
+
+        def wrapper(*args, **kwargs):
+            lookahead[name] += 1
+            return method(*args, **kwargs)
+
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    def timed(self, method):
+        code = method.__code__
+        key = (code.co_filename, code.co_firstlineno, method.__name__)
+        stack = self.stack
+        active = self.active
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            caller = stack[-1][0] if stack else None
+            frame = [key, clock(), 0.0]
+            stack.append(frame)
+            active[key] += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = clock() - frame[1]
+                stack.pop()
+                active[key] -= 1
+                if stack:
+                    stack[-1][2] += elapsed
+                self.record(key, caller, elapsed, elapsed - frame[2], outer=not active[key])
+
+        wrapper.__name__ = method.__name__
+        return wrapper
+
+    def record(self, key, caller, elapsed, own, outer):
+        entry = self.rules.get(key)
+        if entry is None:
+            entry = self.rules[key] = [0, 0, 0.0, 0.0, {}]
+        total = elapsed if outer else 0.0
+        entry[0] += outer
+        entry[1] += 1
+        entry[2] += own
+        entry[3] += total
+        if caller is not None:
+            calls = entry[4].get(caller, (0, 0, 0.0, 0.0))
+            entry[4][caller] = (calls[0] + outer, calls[1] + 1, calls[2] + own, calls[3] + total)
+
+    def to_dict(self):
+        return {
+            'phases': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.phases.items()},
+            'tokens': dict(self.token_types.most_common()),
+            'rules': {key[2]: {'calls': entry[1], 'seconds': entry[3], 'own_seconds': entry[2]}
+                      for key, entry in sorted(self.rules.items(), key=lambda item: -item[1][3]) if key[0] != '~'},
+            'lookahead': dict(self.lookahead),
+        }
+
+    def stats(self):
+        """Rule timings in the dictionary layout of cProfile, which pstats.Stats loads."""
+        return {key: (entry[0], entry[1], entry[2], entry[3], dict(entry[4])) for key, entry in self.rules.items()}
+
+    def dump_stats(self, path):
+        with open(path, 'wb') as file:
+            marshal.dump(self.stats(), file)
+
+    def write(self, path):
+        """Save to `path`, as a pstats dump for a .prof/.pstats file and as JSON otherwise."""
+        if path.endswith(('.prof', '.pstats')):
+            self.dump_stats(path)
+        else:
+            with open(path, 'w') as file:
+                json.dump(self.to_dict(), file, indent=2)
@@ -0,0 +1,303 @@
+"""Binary interchange format for analysis results: token stream, AST and diagnostics.
+
+    python interchange.py SOURCE OUTPUT
+
+Layout, little-endian, sections 8-byte aligned:
+
+    header          magic, version, counts and section offsets (HEADER)
+    string offsets  uint32 * (strings + 1), string i is data[offsets[i]:offsets[i + 1]]
+    string data     UTF-8 of every distinct identifier, literal and dict key
+    tokens          uint32 * 6 per token: kind, value string, line, column, start, length
+    nodes           uint32 * 4 per node: kind, key string, value, end
+
+Nodes hold the tree {'ast', 'errors', 'diagnostics'} in pre-order. `value` is the string id of a
+STRING, the number of an INTEGER and the child count of a LIST or DICT; `end` is the index after the
+node's subtree, so a reader can skip it. Items of a list have the key NO_KEY.
+"""
+import argparse
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from cache import analyze
+from mapped import open_mapped
+from tokens import TOKEN_TYPES
+
+MAGIC = b'LXAF'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQQQQQ')  # magic, version, unused, tokens, strings, nodes, 5 section offsets
+TOKEN_WIDTH = 6
+TOKEN_FIELDS = ('kind', 'value', 'line', 'column', 'start', 'length')
+NODE_WIDTH = 4
+NO_KEY = 0xFFFFFFFF
+
+# Node kinds
+NONE = 0
+STRING = 1
+INTEGER = 2
+LIST = 3
+DICT = 4
+
+CLOSE = object()  # Marks the end of a container while flattening
+
+
+def aligned(offset):
+    return (offset + 7) & ~7
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+
+    def add(self, value):
+        return self.ids.setdefault(value, len(self.ids))
+
+    def sections(self):
+        """(offsets, data) of every string added, in id order."""
+        encoded = [value.encode('utf-8', 'surrogatepass') for value in self.ids]
+        offsets = array('I', [0])
+        size = 0
+        for blob in encoded:
+            size += len(blob)
+            offsets.append(size)
+        return offsets, b''.join(encoded)
+
+
+def token_records(tokens, strings):
+    """Fixed-width records of a TokenBuffer, filled a column at a time."""
+    count = len(tokens)
+    records = array('I', bytes(4 * TOKEN_WIDTH * count))
+    records[0::TOKEN_WIDTH] = array('I', tokens.kinds)
+    records[1::TOKEN_WIDTH] = array('I', map(strings.add, tokens.values()))
+    records[2::TOKEN_WIDTH] = array('I', tokens.lines)
+    records[3::TOKEN_WIDTH] = array('I', tokens.columns)
+    records[4::TOKEN_WIDTH] = array('I', tokens.starts)
+    records[5::TOKEN_WIDTH] = array('I', tokens.lengths)
+    return records
+
+
+def node_records(value, strings):
+    """Pre-order records of a tree of dicts, lists, strings, ints and None, without recursion."""
+    records = array('I')
+    extend = records.extend
+    add = strings.add
+    pending = [(value, NO_KEY)]
+    pop = pending.pop
+    push = pending.append
+    count = 0  # Records so far, the index of the next one
+    while pending:
+        value, key = pop()
+        if key is CLOSE:
+            records[value * NODE_WIDTH + 3] = count
+            continue
+        value_type = type(value)
+        if value_type is str:
+            extend((STRING, key, add(value), count + 1))
+        elif value_type is dict:
+            extend((DICT, key, len(value), 0))
+            push((count, CLOSE))
+            pending.extend([(item, add(name)) for name, item in reversed(value.items())])
+        elif value_type is list:
+            extend((LIST, key, len(value), 0))
+            push((count, CLOSE))
+            pending.extend([(item, NO_KEY) for item in reversed(value)])
+        elif value is None:
+            extend((NONE, key, 0, count + 1))
+        elif value_type is int:
+            extend((INTEGER, key, value, count + 1))
+        else:
+            raise TypeError(f"Cannot store {value_type.__name__} in an analysis file")
+        count += 1
+    return records
+
+
+def dump(tokens, lex_errors, ast, diagnostics):
+    """Bytes of an analysis file for a TokenBuffer, the lexer errors, AST and parser diagnostics."""
+    strings = StringTable()
+    tokens_section = token_records(tokens, strings)
+    nodes_section = node_records({'ast': ast, 'errors': lex_errors, 'diagnostics': diagnostics}, strings)
+    offsets, data = strings.sections()
+
+    sections = [offsets.tobytes(), data, tokens_section.tobytes(), nodes_section.tobytes()]
+    if sys.byteorder != 'little':
+        for index in (0, 2, 3):
+            swapped = array('I', sections[index])
+            swapped.byteswap()
+            sections[index] = swapped.tobytes()
+    starts = []
+    position = aligned(HEADER.size)
+    for section in sections:
+        starts.append(position)
+        position = aligned(position + len(section))
+    starts.append(position)
+
+    output = bytearray(position)
+    HEADER.pack_into(output, 0, MAGIC, VERSION, 0, len(tokens), len(offsets) - 1,
+                     len(nodes_section) // NODE_WIDTH, *starts)
+    for start, section in zip(starts, sections):
+        output[start:start + len(section)] = section
+    return bytes(output)
+
+
+def write(path, tokens, lex_errors, ast, diagnostics):
+    with open(path, 'wb') as file:
+        file.write(dump(tokens, lex_errors, ast, diagnostics))
+
+
+class AnalysisFile:
+    """Reader over the bytes of an analysis file (bytes, memoryview or mmap), without copying them.
+
+    Sections are memoryviews cast to uint32; `tokens` and the record columns index into them, so
+    opening a file costs the same for any size, and a string is only decoded when asked for.
+    """
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise ValueError("Not an analysis file: too short")
+        (magic, version, _, self.token_count, self.string_count, self.node_count,
+         *starts) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an analysis file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported analysis file version {version}, expected {VERSION}")
+        view = memoryview(data)
+        self.data = data  # Keeps an mmap open as long as the views
+        self.offsets = self.words(view[starts[0]:starts[0] + 4 * (self.string_count + 1)])
+        self.string_data = view[starts[1]:starts[2]]
+        self.records = self.words(view[starts[2]:starts[2] + 4 * TOKEN_WIDTH * self.token_count])
+        self.nodes = self.words(view[starts[3]:starts[3] + 4 * NODE_WIDTH * self.node_count])
+        self.decoded = {}  # String id -> str, for strings decoded so far
+
+    @staticmethod
+    def words(view):
+        if sys.byteorder == 'little':
+            return view.cast('I')
+        # Big-endian machines read a byteswapped copy
+        words = array('I', view)
+        words.byteswap()
+        return memoryview(words)
+
+    def string(self, index):
+        value = self.decoded.get(index)
+        if value is None:
+            value = self.decoded[index] = str(self.string_data[self.offsets[index]:self.offsets[index + 1]],
+                                              'utf-8', 'surrogatepass')
+        return value
+
+    def column(self, field):
+        """uint32 memoryview of one token field ('kind', 'value', 'line', 'column', 'start', 'length')."""
+        return self.records[TOKEN_FIELDS.index(field)::TOKEN_WIDTH]
+
+    @property
+    def tokens(self):
+        return TokenView(self)
+
+    def node(self, index):
+        """(kind, key string id, value, end) of node `index`."""
+        start = index * NODE_WIDTH
+        nodes = self.nodes
+        return nodes[start], nodes[start + 1], nodes[start + 2], nodes[start + 3]
+
+    def children(self, index):
+        """Indices of the items of the LIST or DICT node `index`."""
+        child, end = index + 1, self.nodes[index * NODE_WIDTH + 3]
+        while child < end:
+            yield child
+            child = self.nodes[child * NODE_WIDTH + 3]
+
+    def child(self, index, key):
+        """Index of the item `key` of the DICT node `index`, None when it has none."""
+        for child in self.children(index):
+            if self.string(self.nodes[child * NODE_WIDTH + 1]) == key:
+                return child
+        return None
+
+    def tree(self, index=0):
+        """Python value of node `index` and its subtree, built without recursion."""
+        nodes = self.nodes
+        string = self.string
+        end = nodes[index * NODE_WIDTH + 3]
+        fields = [nodes[field + index * NODE_WIDTH:end * NODE_WIDTH:NODE_WIDTH] for field in range(NODE_WIDTH)]
+        root = None
+        stack = []  # (container, end) of the open lists and dicts
+        container = close = None  # Top of the stack
+        for node, kind, key, value, end in zip(range(index, end), *fields):
+            if kind == STRING:
+                item = string(value)
+            elif kind == DICT:
+                item = {}
+            elif kind == LIST:
+                item = []
+            elif kind == INTEGER:
+                item = value
+            else:
+                item = None
+            while close is not None and close <= node:
+                stack.pop()
+                container, close = stack[-1] if stack else (None, None)
+            if container is None:
+                root = item
+            elif key == NO_KEY:
+                container.append(item)
+            else:
+                container[string(key)] = item
+            if kind == DICT or kind == LIST:
+                stack.append((item, end))
+                container, close = item, end
+        return root
+
+    def ast(self):
+        return self.tree(self.child(0, 'ast'))
+
+    def lex_errors(self):
+        return self.tree(self.child(0, 'errors'))
+
+    def diagnostics(self):
+        return self.tree(self.child(0, 'diagnostics'))
+
+
+class TokenView(Sequence):
+    """Tokens of an AnalysisFile as the dicts Parser reads, built on access like TokenBuffer's."""
+
+    def __init__(self, analysis):
+        self.analysis = analysis
+        self.records = analysis.records
+
+    def __len__(self):
+        return self.analysis.token_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        start = index * TOKEN_WIDTH
+        records = self.records
+        return {'type': TOKEN_TYPES[records[start]], 'value': self.analysis.string(records[start + 1]),
+                'line': records[start + 2], 'column': records[start + 3]}
+
+
+def load(path):
+    """AnalysisFile over an mmap of the file at `path`."""
+    return AnalysisFile(open_mapped(path))
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('source', help="Program to lex and parse")
+    argument_parser.add_argument('output', help="Analysis file to write")
+    arguments = argument_parser.parse_args(argv)
+
+    with open(arguments.source, encoding='utf-8') as file:
+        analysis = analyze(file.read())
+    write(arguments.output, analysis.tokens, analysis.lex_errors, analysis.ast, analysis.diagnostics)
+    print(f"{len(analysis.tokens)} tokens, {len(analysis.lex_errors) + len(analysis.diagnostics)} errors "
+          f"written to {arguments.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from lexer import Lexer
+from nodes import NodeVisitor, build_program
+from operations import CONVERSIONS, OPERATORS
+from optimizer import Optimizer
+from parse import Parser
+
+
+class EvaluationError(Exception):
+    pass
+
+
+class Interpreter(NodeVisitor):
+    """Tree-walking evaluator over the node classes of `nodes`.
+
+    All variables live in one environment, since blocks do not open scopes. Values are converted to
+    the declared type on every store, so `entero` division truncates. `step_limit` bounds the number
+    of loop iterations, for programs that may never terminate.
+    """
+
+    def __init__(self, step_limit=None):
+        super().__init__()
+        self.variables = {}
+        self.types = {}  # Variable -> declared type
+        self.functions = {}
+        self.steps = 0
+        self.step_limit = step_limit
+
+    def run(self, program):
+        self.execute(program)
+        return self.variables
+
+    def execute(self, statements):
+        visit = self.visit
+        for statement in statements:
+            visit(statement)
+
+    def store(self, identifier, value):
+        try:
+            convert = CONVERSIONS[self.types[identifier]]
+        except KeyError:
+            raise EvaluationError(f"Variable '{identifier}' is not declared.") from None
+        try:
+            self.variables[identifier] = convert(value)
+        except (ValueError, OverflowError):
+            raise EvaluationError(f"Cannot store {value!r} in {self.types[identifier]} variable '{identifier}'.") from None
+
+    def visit_VariableDeclaration(self, node):
+        self.types[node.identifier] = node.type_name
+        self.store(node.identifier, self.visit(node.value))
+
+    def visit_Assignment(self, node):
+        self.store(node.identifier, self.visit(node.expression))
+
+    def visit_If(self, node):
+        if self.visit(node.condition):
+            self.execute(node.body)
+        else:
+            self.execute(node.orelse)
+
+    def visit_While(self, node):
+        visit = self.visit
+        condition = node.condition
+        body = node.body
+        while visit(condition):
+            self.steps += 1
+            if self.step_limit is not None and self.steps > self.step_limit:
+                raise EvaluationError(f"Step limit of {self.step_limit} loop iterations exceeded.")
+            for statement in body:
+                visit(statement)
+
+    def visit_FunctionDeclaration(self, node):
+        # There is no call syntax, declaring only makes the function known
+        self.functions[node.name] = node
+
+    def visit_BinaryOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        try:
+            return OPERATORS[node.operator](left, right)
+        except ZeroDivisionError:
+            raise EvaluationError("Division by zero.") from None
+        except OverflowError:
+            raise EvaluationError(f"Result of '{node.operator}' is too large.") from None
+        except TypeError:
+            raise EvaluationError(f"Unsupported operands for '{node.operator}': {left!r}, {right!r}.") from None
+
+    visit_Comparison = visit_BinaryOp
+
+    def visit_Name(self, node):
+        try:
+            return self.variables[node.identifier]
+        except KeyError:
+            raise EvaluationError(f"Variable '{node.identifier}' is not declared.") from None
+
+    def visit_Number(self, node):
+        return node.value
+
+    visit_String = visit_Boolean = visit_Number
+
+
+def execute(text, step_limit=None, optimize=False):
+    """Lex, parse and run `text`, returns the final variables. Raises SyntaxError or EvaluationError.
+
+    `optimize` runs the program through optimizer.Optimizer first.
+    """
+    ast = Parser(Lexer(text).tokenize_compact()).parse()
+    program = build_program(ast)
+    if optimize:
+        program = Optimizer().optimize(program)
+    return Interpreter(step_limit).run(program)
@@ -1,7 +1,9 @@
-key_words = ['entero', 'decimal', 'booleano', 'cadena', 'sino', 'si', 'mientras', 
-             'hacer', 'verdadero', 'falso', 'entonces']
-operators = ['+', '-', '*', '/', '%', '==', '<=', '>=', '<', '>', '=']
-signs = ['(', ')', '{', '}', '"', ';', ',']
+from literals import UNTERMINATED_STRING, find_string_end, unescape
+from positions import LineIndex
+from regex_scanner import RegexScanner
+from scanner import Scanner
+from tokens import key_words, operators, signs
+
 numbers = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
 identifiers = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 
                'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z', '_']
@@ -10,20 +12,38 @@ class Lexer:
     def __init__(self, text):
         self.text = text
         self.position = 0
-        self.line = 1
-        self.column = 1
+        self.source_lines = None  # LineIndex of the text, built on first use
         self.tokens = []
-        self.token_counts = {}
+        self.buffer = None  # TokenBuffer of the last scan
+        self.counts = None  # Per-value statistics, computed from `buffer` when first asked for
         self.errors = []
 
+    @property
+    def token_counts(self):
+        """Value -> {'type', 'count', 'line', 'column'} with the position of the first occurrence."""
+        if self.counts is None:
+            self.counts = self.buffer.counts() if self.buffer is not None else {}
+        return self.counts
+
+    @property
+    def line_index(self):
+        if self.source_lines is None:
+            self.source_lines = LineIndex(self.text)
+        return self.source_lines
+
+    @property
+    def line(self):
+        return self.line_index.line(self.position)
+
+    @property
+    def column(self):
+        # Column of the next character, looked up from the offset instead of counted along
+        return self.line_index.position(self.position)[1]
+
     def next_char(self):
         if self.position < len(self.text):
             result = self.text[self.position]
             self.position += 1
-            self.column += 1
-            if result == '\n':
-                self.line += 1
-                self.column = 1
             return result
         return None
 
@@ -32,92 +52,74 @@ class Lexer:
             return self.text[self.position]
         return None
 
-    def add_token(self, type, value):
-        if type == 'ERROR':
-            self.errors.append({
-                'type': type,
-                'value': value,
-                'line': self.line,
-                'column': self.column - 1  # Error at the current column
-            })
-        else:
-            if value in self.token_counts:
-                self.token_counts[value]['count'] += 1
-                # Keep the line and column of the first occurrence
-            else:
-                self.tokens.append({'type': type, 'value': value, 'line': self.line, 'column': self.column - len(value)})
-                self.token_counts[value] = {
-                    'type': type,
-                    'count': 1,
-                    'line': self.line,
-                    'column': self.column - len(value)  # Token starts at current column minus its length
-                }
-
     def tokenize(self):
-        current_char = self.next_char()
-
-        while current_char is not None:
-            if current_char.isspace():
-                current_char = self.next_char()
-                continue
-
-            if current_char.isalpha() or current_char == '_':
-                start_pos = self.position - 1
-                while self.peek() and (self.peek().isalnum() or self.peek() == '_'):
-                    self.next_char()
-                value = self.text[start_pos:self.position].lower()
-                token_type = 'KEYWORD' if value in key_words else 'IDENTIFIER'
-                self.add_token(token_type, value)
-
-            elif current_char.isdigit():
-                start_pos = self.position - 1
-                while self.peek() and self.peek().isdigit():
-                    self.next_char()
-                value = self.text[start_pos:self.position]
-                self.add_token('NUMBER', value)
-
-            elif current_char in operators:
-                start_pos = self.position - 1
-                while self.peek() and (self.text[start_pos:self.position + 1] in operators):
-                    self.next_char()
-                value = self.text[start_pos:self.position]
-                self.add_token('OPERATOR', value)
-
-            elif current_char in signs:
-                self.add_token('SIGN', current_char)
-
-            else:
-                self.add_token('ERROR', current_char)
-
-            current_char = self.next_char()
-
+        # One scan gives the ordered stream, the per-value table is derived from it.
+        # `tokens` keeps the first occurrence of every value followed by the errors.
+        self.tokenize_compact()
+        self.tokens = [{'type': details['type'], 'value': value, 'line': details['line'], 'column': details['column']}
+                       for value, details in self.token_counts.items()]
         self.tokens.extend(self.errors)
         return self.tokens, self.token_counts
-    
-    def add_token_in_order(self, type, value):
+
+    def add_token_in_order(self, type, value, line=None, column=None):
+        # `line`/`column` default to a token ending at the current position
+        if line is None:
+            line, column = self.line_index.position(self.position)
+            column -= len(value)
         if type == 'ERROR':
             self.errors.append({
                 'type': type,
                 'value': value,
-                'line': self.line,
-                'column': self.column - 1  # Error at the current column
+                'line': line,
+                'column': column  # The character just read
             })
         else:
-            self.tokens.append({'type': type, 'value': value, 'line': self.line, 'column': self.column - len(value)})
+            self.tokens.append({'type': type, 'value': value, 'line': line, 'column': column})
+            if value in self.token_counts:
+                self.token_counts[value]['count'] += 1
+                return
             self.token_counts[value] = {
                 'type': type,
                 'count': 1,
-                'line': self.line,
-                'column': self.column - len(value)  # Token starts at current column minus its length
+                'line': line,
+                'column': column
             }
 
     def tokenize_in_order(self):
+        # Every scan covers the whole text, so its results replace those of an earlier call
+        self.tokens = self.tokenize_compact().to_dicts()
+        return self.tokens
+
+    def tokenize_compact(self):
+        # Same tokens as tokenize_in_order in a columnar TokenBuffer, which Parser accepts directly
+        return self.run_scanner(Scanner(self.text))
+
+    def tokenize_regex(self):
+        # Same tokens as tokenize_compact from the master pattern of regex_scanner
+        return self.run_scanner(RegexScanner(self.text))
+
+    def run_scanner(self, scanner):
+        tokens, errors = scanner.scan()
+        self.position = scanner.position
+        self.source_lines = scanner.line_index
+        self.errors = errors
+        self.buffer = tokens
+        self.counts = None
+        return tokens
+
+    def tokenize_in_order_charwise(self):
+        # Character by character reference scanner, kept for benchmarks and comparisons
         current_char = self.next_char()
 
         while current_char is not None:
             if current_char == '"':  # Start of string literal
+                line, column = self.line_index.position(self.position - 1)
                 string_literal = self.get_string_literal()
-                self.add_token_in_order('STRING', string_literal)
+                if string_literal is None:
+                    self.errors.append({'type': 'ERROR', 'value': '"', 'line': line, 'column': column,
+                                        'message': UNTERMINATED_STRING})
+                else:
+                    self.add_token_in_order('STRING', string_literal, line, column)
                 current_char = self.next_char()  # Update current_char to continue after the string
                 continue
 
@@ -158,11 +160,11 @@ class Lexer:
         return self.tokens
 
     def get_string_literal(self):
-        string_value = ''
-        while self.peek() != '"':
-            if self.peek() is None:
-                raise Exception("String literal not closed")
-            string_value += self.peek()
-            self.next_char()
-        self.next_char()  # Skip the closing double quote
-        return string_value
+        # The whole literal at once: find the closing quote, slice, then move past it.
+        # Returns None when it is never closed, leaving the position after the opening quote.
+        end = find_string_end(self.text, self.position)
+        if end == -1:
+            return None
+        value = unescape(self.text[self.position:end])
+        self.position = end + 1
+        return value
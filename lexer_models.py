@@ -0,0 +1,68 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+
+class RowsModel(QAbstractTableModel):
+    """Read-only table over a list of rows, cells are only formatted when a view asks for them.
+
+    Rows are sequences of cell values; subclasses over other kinds of rows override `cell`.
+    """
+
+    headers = []
+
+    def __init__(self, rows=None, parent=None):
+        super().__init__(parent)
+        self.rows = rows if rows is not None else []
+
+    def setRows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        return str(self.cell(self.rows[index.row()], index.column()))
+
+    def cell(self, row, column):
+        return row[column]
+
+
+class TokenCountsModel(RowsModel):
+    """Token, type and count of every distinct value, straight from Lexer.token_counts."""
+
+    headers = ['Token', 'Type', 'Count']
+
+    def setCounts(self, token_counts):
+        self.token_counts = token_counts
+        # Only the keys are copied, details are looked up when a row is shown
+        self.setRows([value for value, details in token_counts.items() if details['type'] != 'ERROR'])
+
+    def cell(self, value, column):
+        if column == 0:
+            return value
+        details = self.token_counts[value]
+        return details['type'] if column == 1 else details['count']
+
+
+class ErrorsModel(RowsModel):
+    """Lexer error dicts, one per row."""
+
+    headers = ['Error', 'Type', 'Line', 'Column']
+
+    def cell(self, error, column):
+        if column == 0:
+            return error['value']
+        if column == 1:
+            return error.get('message', error['type'])
+        return error['line'] if column == 2 else error['column']
@@ -1,13 +1,18 @@
-from PyQt6.QtWidgets import QMainWindow, QFileDialog, QTextEdit, QPushButton, QVBoxLayout, QWidget, QMessageBox, \
-    QTableWidget, QTableWidgetItem, QLabel
-from lexer import Lexer
-from PyQt6.QtGui import QFont, QPixmap, QPalette, QBrush
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QMainWindow, QFileDialog, QTextEdit, QPushButton, QVBoxLayout, QHBoxLayout, QWidget, \
+    QMessageBox, QTableView, QTableWidgetItem, QLabel, QProgressBar
+from lexer_models import TokenCountsModel, ErrorsModel
+from lexer_worker import AnalysisWorker
+from PyQt6.QtGui import QFont, QPixmap, QPalette, QBrush, QTextCursor
+from PyQt6.QtCore import Qt, QThread
 
 
 class LexerUI(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.analysisThread = None
+        self.analysisWorker = None
+        self.analyzedText = None  # Text of the shown results
+        self.lineIndex = None     # Its LineIndex, to find the errors in it
         self.initUI()
 
     def initUI(self):
@@ -39,22 +44,35 @@ class LexerUI(QMainWindow):
         self.textArea = QTextEdit()
         main_layout.addWidget(self.textArea)
 
-        # Process button
+        # Process and cancel buttons
+        buttons_layout = QHBoxLayout()
         self.btnProcess = QPushButton('Verify Text')
         self.styleButton(self.btnProcess)
         self.btnProcess.clicked.connect(self.processText)
-        main_layout.addWidget(self.btnProcess)
-
-        # Layout for tokens table
-        self.tokensTable = QTableWidget()
-        self.tokensTable.setColumnCount(3)
-        self.tokensTable.setHorizontalHeaderLabels(['Token', 'Type', 'Count'])
+        buttons_layout.addWidget(self.btnProcess)
+        self.btnCancel = QPushButton('Cancel')
+        self.styleButton(self.btnCancel)
+        self.btnCancel.clicked.connect(self.cancelProcessing)
+        self.btnCancel.setEnabled(False)
+        buttons_layout.addWidget(self.btnCancel)
+        main_layout.addLayout(buttons_layout)
+
+        # Progress of the running analysis
+        self.progressBar = QProgressBar()
+        self.progressBar.setRange(0, 100)
+        main_layout.addWidget(self.progressBar)
+
+        # Tokens table, a view over the lexer results that only renders visible rows
+        self.tokensModel = TokenCountsModel()
+        self.tokensTable = QTableView()
+        self.tokensTable.setModel(self.tokensModel)
         main_layout.addWidget(self.tokensTable)
 
-        # Layout for errors table
-        self.errorsTable = QTableWidget()
-        self.errorsTable.setColumnCount(4)
-        self.errorsTable.setHorizontalHeaderLabels(['Error', 'Type', 'Line', 'Column'])
+        # Errors table
+        self.errorsModel = ErrorsModel()
+        self.errorsTable = QTableView()
+        self.errorsTable.setModel(self.errorsModel)
+        self.errorsTable.clicked.connect(self.showError)
         main_layout.addWidget(self.errorsTable)
 
         # Set the layout for the central widget
@@ -94,43 +112,79 @@ class LexerUI(QMainWindow):
 
     def processText(self):
         text_content = self.textArea.toPlainText()
-        if text_content:
-            lexer = Lexer(text_content)
-            tokens, token_counts = lexer.tokenize()
-            self.displayTokenResults(tokens, token_counts)
-            self.displayErrorResults(lexer.errors)
-        else:
+        if not text_content:
             QMessageBox.warning(self, 'Warning', 'Please select a text file and preview the content first.')
-
-    def displayTokenResults(self, tokens, token_counts):
-        # Clear the tokens table
-        self.tokensTable.setRowCount(0)
-
-        # Insert token data into the tokens table
-        for token, details in token_counts.items():
-            if details['type'] != 'ERROR':  # Skip errors
-                row_position = self.tokensTable.rowCount()
-                self.tokensTable.insertRow(row_position)
-                self.tokensTable.setItem(row_position, 0, QTableWidgetItem(token))
-                self.tokensTable.setItem(row_position, 1, QTableWidgetItem(details['type']))
-                self.tokensTable.setItem(row_position, 2, QTableWidgetItem(str(details['count'])))
-
+            return
+        if self.analysisThread is not None:
+            return
+
+        # Lex on a worker thread so the window keeps responding on large files
+        self.analysisThread = QThread(self)
+        self.analysisWorker = AnalysisWorker(text_content)
+        self.analysisWorker.moveToThread(self.analysisThread)
+        self.analysisThread.started.connect(self.analysisWorker.run)
+        self.analysisWorker.progress.connect(self.progressBar.setValue)
+        self.analysisWorker.finished.connect(self.showResults)
+        self.analysisWorker.finished.connect(self.analysisThread.quit)
+        self.analysisWorker.cancelled.connect(self.analysisThread.quit)
+        self.analysisThread.finished.connect(self.processingStopped)
+
+        self.progressBar.setValue(0)
+        self.btnProcess.setEnabled(False)
+        self.btnCancel.setEnabled(True)
+        self.analysisThread.start()
+
+    def cancelProcessing(self):
+        if self.analysisWorker is not None:
+            self.analysisWorker.cancel()
+
+    def processingStopped(self):
+        self.analysisWorker.deleteLater()
+        self.analysisThread.deleteLater()
+        self.analysisWorker = None
+        self.analysisThread = None
+        self.btnProcess.setEnabled(True)
+        self.btnCancel.setEnabled(False)
+
+    def closeEvent(self, event):
+        # Let a running analysis stop before its thread object goes away with the window.
+        # The worker's queued quit would only reach the thread through this blocked GUI thread,
+        # so the thread is told to quit directly before waiting for it
+        if self.analysisThread is not None:
+            self.analysisWorker.cancel()
+            self.analysisThread.quit()
+            self.analysisThread.wait()
+        super().closeEvent(event)
+
+    def showResults(self, token_counts, errors, line_index):
+        self.analyzedText = self.analysisWorker.text
+        self.displayTokenResults(token_counts)
+        self.displayErrorResults(errors, line_index)
+
+    def displayTokenResults(self, token_counts):
+        self.tokensModel.setCounts(token_counts)
         self.tokensTable.resizeColumnsToContents()
 
-    def displayErrorResults(self, errors):
-        # Clear the errors table
-        self.errorsTable.setRowCount(0)
-
-        # Insert error data into the errors table
-        for error in errors:
-            row_position = self.errorsTable.rowCount()
-            self.errorsTable.insertRow(row_position)
-            self.errorsTable.setItem(row_position, 0, QTableWidgetItem(error['value']))
-            self.errorsTable.setItem(row_position, 1, QTableWidgetItem(error['type']))
-            self.errorsTable.setItem(row_position, 2, QTableWidgetItem(str(error['line'])))
-            self.errorsTable.setItem(row_position, 3, QTableWidgetItem(str(error['column'])))
-
+    def displayErrorResults(self, errors, line_index=None):
+        self.errorsModel.setRows(errors)
         self.errorsTable.resizeColumnsToContents()
+        self.lineIndex = line_index
+
+    def showError(self, index):
+        # Select the clicked error in the text, its offset comes back from the line index
+        if self.lineIndex is None:
+            return
+        error = self.errorsModel.rows[index.row()]
+        offset = self.lineIndex.offset(error['line'], error['column'])
+        # QTextCursor counts UTF-16 units, characters outside the BMP take two
+        start = len(self.analyzedText[:offset].encode('utf-16-le')) // 2
+        end = start + len(error['value'].encode('utf-16-le')) // 2
+        last = self.textArea.document().characterCount() - 1  # The text may have been edited since
+        cursor = self.textArea.textCursor()
+        cursor.setPosition(min(start, last))
+        cursor.setPosition(min(end, last), QTextCursor.MoveMode.KeepAnchor)
+        self.textArea.setTextCursor(cursor)
+        self.textArea.setFocus()
 
     def addRowToTable(self, value, details):
         row_position = self.tableWidget.rowCount()
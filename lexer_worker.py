@@ -0,0 +1,49 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from scanner import Scanner
+
+STEP_SIZE = 256 * 1024  # Characters scanned between progress reports and cancellation checks
+
+
+class AnalysisWorker(QObject):
+    """Lexes a text away from the GUI thread: move it to a QThread and connect `run` to its start.
+
+    The text is scanned in steps so progress can be reported and `cancel` is noticed between them.
+    """
+
+    progress = pyqtSignal(int)  # Percentage done
+    finished = pyqtSignal(object, object, object)  # token_counts, lexer errors, LineIndex of the text
+    cancelled = pyqtSignal()
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+        self.stopped = False
+
+    def cancel(self):
+        # Called directly from the GUI thread, a queued slot would only run once `run` returned
+        self.stopped = True
+
+    def check_cancelled(self):
+        """Emit `cancelled` and return True once `cancel` was called."""
+        stopped = self.stopped  # Read once, `cancel` may set it meanwhile
+        if stopped:
+            self.cancelled.emit()
+        return stopped
+
+    def run(self):
+        scanner = Scanner(self.text)
+        length = len(self.text)
+        end = 0
+        while end < length:
+            if self.check_cancelled():
+                return
+            end += STEP_SIZE
+            scanner.scan(final=end >= length, end=end)
+            self.progress.emit(min(end, length) * 90 // length)
+        if self.check_cancelled():  # Counting takes a while on large texts too
+            return
+        # Same table as Lexer.token_counts, built here so the GUI thread only shows it
+        token_counts = scanner.tokens.counts()
+        self.progress.emit(100)
+        self.finished.emit(token_counts, scanner.errors, scanner.line_index)
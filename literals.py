@@ -0,0 +1,31 @@
+import re
+
+UNTERMINATED_STRING = "String literal not closed"
+
+ESCAPES = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+
+def find_string_end(text, start, end=None):
+    """Index of the quote closing a string literal whose content begins at `start`, or -1.
+
+    Quotes preceded by an odd number of backslashes are escaped and do not close the literal.
+    """
+    if end is None:
+        end = len(text)
+    quote = text.find('"', start, end)
+    while quote != -1 and text[quote - 1] == '\\':
+        backslash = quote - 1
+        while backslash > start and text[backslash - 1] == '\\':
+            backslash -= 1
+        if (quote - backslash) % 2 == 0:
+            break
+        quote = text.find('"', quote + 1, end)
+    return quote
+
+
+def unescape(raw):
+    """Value of a string literal from its source text between the quotes."""
+    if '\\' not in raw:
+        return raw
+    return ESCAPE_PATTERN.sub(lambda match: ESCAPES.get(match.group(1), match.group(0)), raw)
@@ -0,0 +1,629 @@
+"""Language server over stdio: diagnostics, semantic tokens and document symbols.
+
+    python lsp.py [--debounce MS]
+"""
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from bisect import bisect_right
+
+from incremental import IncrementalDocument
+from parse import TYPE_KEYWORDS
+from tokens import IDENTIFIER_ID, KEYWORD_ID, STRING_ID, TOKEN_TYPES
+
+DEBOUNCE_SECONDS = 0.2  # Quiet time after an edit before the document is analyzed and diagnostics sent
+
+# Semantic token legend, the index of a name is the type sent to the client
+SEMANTIC_TOKEN_TYPES = ['keyword', 'variable', 'number', 'string', 'operator', 'function']
+FUNCTION_TYPE = SEMANTIC_TOKEN_TYPES.index('function')
+# Lexer type id -> legend index, signs and lexer errors are not highlighted
+SEMANTIC_KINDS = [{'KEYWORD': 0, 'IDENTIFIER': 1, 'NUMBER': 2, 'STRING': 3, 'OPERATOR': 4}.get(token_type)
+                  for token_type in TOKEN_TYPES]
+
+SYMBOL_FUNCTION = 12
+SYMBOL_VARIABLE = 13
+SEVERITY_ERROR = 1
+MESSAGE_ERROR = 1  # window/logMessage type
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+REQUEST_CANCELLED = -32800
+
+
+def read_message(stream):
+    """Next JSON-RPC message from a binary stream framed with LSP headers, None at the end of input.
+
+    Raises ValueError for malformed headers or JSON, the stream is left at the next line to read.
+    """
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if length is not None:
+                break
+            continue
+        name, _, value = line.decode('ascii').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+            if length < 0:
+                raise ValueError(f"Invalid Content-Length {length}")
+    body = stream.read(length)
+    if len(body) < length:
+        return None
+    return json.loads(body)
+
+
+def invalid_message(message):
+    """Why a decoded message is not a JSON-RPC request or notification the server can read, or None."""
+    if not isinstance(message, dict):
+        return "A message must be a JSON object."
+    if 'method' in message and not isinstance(message['method'], str):
+        return "The method must be a string."
+    if 'id' in message and not valid_id(message['id']):
+        return "The id must be a number, a string or null."
+    if 'params' in message and not isinstance(message['params'], (dict, list)):
+        return "The params must be an object or an array."
+    return None
+
+
+def valid_id(request_id):
+    return request_id is None or isinstance(request_id, (int, str))
+
+
+def cancelled_ids(batch):
+    """Ids named by the valid $/cancelRequest notifications of a batch."""
+    cancelled = set()
+    for message in batch:
+        if invalid_message(message) is None and message.get('method') == '$/cancelRequest':
+            params = message.get('params')
+            if isinstance(params, dict) and valid_id(params.get('id')):
+                cancelled.add(params['id'])
+    return cancelled
+
+
+def write_message(stream, message):
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    stream.write(b'Content-Length: %d\r\n\r\n' % len(body) + body)
+    stream.flush()
+
+
+def utf16_units(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def code_points(text, units):
+    """Number of characters of `text` spanning `units` UTF-16 code units."""
+    count = 0
+    for count, character in enumerate(text):
+        units -= 2 if ord(character) > 0xFFFF else 1
+        if units < 0:
+            return count
+    return len(text)
+
+
+def declaration_sites(tokens):
+    """Indexes of the identifiers a type keyword declares (variables, functions and parameters), in order."""
+    sites = []
+    kinds = tokens.kinds
+    for index in range(1, len(kinds)):
+        if kinds[index] == IDENTIFIER_ID and kinds[index - 1] == KEYWORD_ID \
+                and tokens.value(index - 1) in TYPE_KEYWORDS:
+            sites.append(index)
+    return sites
+
+
+def declarations(node):
+    """Yield (kind, name, type, children) for the declarations of a parser AST node, in source order.
+
+    `children` are the declarations inside a function: its parameters and variables.
+    """
+    node_type = node['type']
+    if node_type == 'variable_declaration':
+        yield SYMBOL_VARIABLE, node['data']['identifier'], node['data']['type'], None
+    elif node_type == 'function_declaration':
+        data = node['data']
+        children = [(SYMBOL_VARIABLE, parameter['name'], parameter['type'], None) for parameter in data['parameters']]
+        for statement in node['statements']:
+            children.extend(declarations(statement))
+        yield SYMBOL_FUNCTION, data['function_name'], data['return_type'], children
+    elif node_type == 'if_statement':
+        for block in (node['if_block'], node['else_block']):
+            for statement in block['statements']:
+                yield from declarations(statement)
+    elif node_type == 'while_loop':
+        for statement in node['statements']:
+            yield from declarations(statement)
+
+
+class OpenDocument:
+    """Text, version and incrementally maintained analysis of one document open in the editor.
+
+    Edits are queued by `change` and only applied by `flush`, so a burst of keystrokes is analyzed
+    once. Results of requests are kept until the next change.
+    """
+
+    def __init__(self, uri, text, version, utf16=True):
+        self.uri = uri
+        self.version = version
+        self.text = text
+        self.document = IncrementalDocument(text)
+        self.utf16 = utf16  # Client columns count UTF-16 code units instead of characters
+        self.pending = []   # contentChanges not applied yet
+        self.line_starts = None
+        self.results = {}   # Request method -> result for the current text
+
+    def change(self, changes, version):
+        self.pending.extend(changes)
+        self.version = version
+        self.results.clear()
+
+    def flush(self):
+        """Apply the queued changes to the text and the analysis, returns whether there were any."""
+        if not self.pending:
+            return False
+        # Taken first so a change that fails is not applied again with the next ones
+        changes, self.pending = self.pending, []
+        for change in changes:
+            if 'range' not in change:
+                self.text = change['text']
+                self.document = IncrementalDocument(self.text)
+            else:
+                start = self.offset(change['range']['start'])
+                end = self.offset(change['range']['end'])
+                self.text = self.text[:start] + change['text'] + self.text[end:]
+                self.document.edit(start, end - start, change['text'])
+                self.move_lines(start, end, change['text'])
+                continue
+            self.line_starts = None
+        return True
+
+    def cached(self, method, compute):
+        result = self.results.get(method)
+        if result is None:
+            self.flush()
+            result = self.results[method] = compute()
+        return result
+
+    def lines(self):
+        """Offset where each line starts."""
+        if self.line_starts is None:
+            starts = [0]
+            find = self.text.find
+            index = find('\n')
+            while index != -1:
+                starts.append(index + 1)
+                index = find('\n', index + 1)
+            self.line_starts = starts
+        return self.line_starts
+
+    def move_lines(self, start, end, inserted):
+        # Lines before the edit keep their start, the ones after it move by the change in length
+        starts = self.lines()
+        first = bisect_right(starts, start)
+        last = bisect_right(starts, end)
+        delta = len(inserted) - (end - start)
+        added = []
+        index = inserted.find('\n')
+        while index != -1:
+            added.append(start + index + 1)
+            index = inserted.find('\n', index + 1)
+        starts[first:] = added + [line_start + delta for line_start in starts[last:]]
+
+    def line_end(self, line):
+        starts = self.lines()
+        return starts[line + 1] - 1 if line + 1 < len(starts) else len(self.text)
+
+    def offset(self, position):
+        """Text offset of an LSP position."""
+        starts = self.lines()
+        line = position['line']
+        if line >= len(starts):
+            return len(self.text)
+        start = starts[line]
+        end = self.line_end(line)
+        character = position['character']
+        if self.utf16:
+            text = self.text[start:end]
+            if not text.isascii():
+                character = code_points(text, character)
+        return min(start + character, end)
+
+    def position(self, line, column):
+        """LSP position of a 1-based line and column, as tokens and errors carry them."""
+        starts = self.lines()
+        line = min(line - 1, len(starts) - 1)
+        column = min(column - 1, self.line_end(line) - starts[line])
+        if self.utf16:
+            prefix = self.text[starts[line]:starts[line] + column]
+            if not prefix.isascii():
+                column = utf16_units(prefix)
+        return {'line': line, 'character': column}
+
+    def span(self, line, column, length):
+        """LSP range of `length` characters from a 1-based line and column, cut at the end of the line."""
+        return {'start': self.position(line, column), 'end': self.position(line, column + length)}
+
+    def diagnostics(self):
+        """Lexer errors and the error of every statement that does not parse, as LSP Diagnostics."""
+        result = []
+        for error in self.document.errors():
+            if 'value' in error:
+                message = f"{error.get('message', 'Unexpected character')} '{error['value']}'"
+                source, length = 'lexer', len(error['value'])
+            else:
+                message, source, length = error['message'], 'parser', 1
+            result.append({'range': self.span(error['line'], error['column'], max(length, 1)),
+                           'severity': SEVERITY_ERROR, 'source': source, 'message': message})
+        return result
+
+    def semantic_tokens(self):
+        """Tokens in the relative encoding of textDocument/semanticTokens, from the segments' tokens."""
+        functions = {name for segment in self.document.segments if segment.node is not None
+                     for kind, name, _, _ in declarations(segment.node) if kind == SYMBOL_FUNCTION}
+        starts = self.lines()
+        document_text = self.text
+        data = []
+        previous_line = previous_character = 0
+        ascii_line = -1  # Last line found to be plain ASCII, where characters and UTF-16 units agree
+        for segment, line, column in self.document.positions():
+            tokens = segment.tokens
+            text = segment.text
+            for kind, start, length, token_line, token_column in zip(tokens.kinds, tokens.starts, tokens.lengths,
+                                                                     tokens.lines, tokens.columns):
+                token_type = SEMANTIC_KINDS[kind]
+                if token_type is None:
+                    continue
+                if kind == IDENTIFIER_ID and text[start:start + length].lower() in functions:
+                    token_type = FUNCTION_TYPE
+                if token_line == 1:
+                    token_column += column - 1
+                token_line += line - 2  # 0-based from here on
+                token_column -= 1
+                if kind == STRING_ID:
+                    # Tokens may not run past the end of their line, a string with a newline is cut there
+                    length = min(length, self.line_end(token_line) - starts[token_line] - token_column)
+                if self.utf16 and token_line != ascii_line:
+                    line_start = starts[token_line]
+                    if document_text[line_start:self.line_end(token_line)].isascii():
+                        ascii_line = token_line
+                    else:
+                        offset = line_start + token_column
+                        length = utf16_units(document_text[offset:offset + length])
+                        token_column = utf16_units(document_text[line_start:offset])
+                if token_line != previous_line:
+                    previous_character = 0
+                data.extend((token_line - previous_line, token_column - previous_character, length, token_type, 0))
+                previous_line, previous_character = token_line, token_column
+        return {'data': data}
+
+    def symbols(self):
+        """DocumentSymbols of the functions and variables each parsed statement declares."""
+        result = []
+        for segment, line, column in self.document.positions():
+            if segment.node is None:
+                continue
+            tokens = segment.tokens
+            sites = iter(declaration_sites(tokens))
+
+            def place(token_index):
+                token_line = tokens.lines[token_index]
+                token_column = tokens.columns[token_index]
+                if token_line == 1:
+                    token_column += column - 1
+                return self.span(token_line + line - 1, token_column, tokens.lengths[token_index])
+
+            def build(declared):
+                symbols = []
+                for kind, name, type_name, children in declared:
+                    site = next(sites, None)
+                    if site is None or tokens.value(site) != name:
+                        return symbols  # Should not happen for a statement that parsed
+                    selection = place(site)
+                    symbol = {'name': name, 'detail': type_name, 'kind': kind,
+                              'range': {'start': place(site - 1)['start'], 'end': selection['end']},
+                              'selectionRange': selection}
+                    if children is not None:
+                        symbol['children'] = build(children)
+                        symbol['range']['end'] = place(len(tokens) - 1)['end']
+                    symbols.append(symbol)
+                return symbols
+
+            result.extend(build(declarations(segment.node)))
+        return result
+
+
+class LanguageServer:
+    """LSP server over a pair of binary streams, stdin and stdout by default.
+
+    Messages are read on a thread into a queue. Everything that arrived together is handled as one
+    batch. didChange only queues the edits, a document is re-analyzed when it has been quiet for
+    `delay` seconds (then diagnostics are published) or when a request needs it.
+    """
+
+    def __init__(self, input=None, output=None, delay=DEBOUNCE_SECONDS):
+        self.input = input if input is not None else sys.stdin.buffer
+        self.output = output if output is not None else sys.stdout.buffer
+        self.delay = delay
+        self.documents = {}  # URI -> OpenDocument
+        self.due = {}        # URI -> time its diagnostics are to be published
+        self.messages = queue.Queue()
+        self.utf16 = True
+        self.shut_down = False
+        self.requests = {
+            'initialize': self.initialize,
+            'shutdown': self.shutdown,
+            'textDocument/semanticTokens/full': self.semantic_tokens,
+            'textDocument/documentSymbol': self.document_symbols,
+        }
+        self.notifications = {
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didClose': self.did_close,
+        }
+
+    def run(self):
+        """Serve until 'exit' or the end of input, returns the process exit code."""
+        reader = threading.Thread(target=self.read_messages, daemon=True)
+        reader.start()
+        while True:
+            timeout = None
+            if self.due:
+                timeout = max(0.0, min(self.due.values()) - time.monotonic())
+            try:
+                batch = [self.messages.get(timeout=timeout)]
+            except queue.Empty:
+                self.publish_due()
+                continue
+            while True:
+                try:
+                    batch.append(self.messages.get_nowait())
+                except queue.Empty:
+                    break
+            exit_code = self.handle_batch(batch)
+            if exit_code is not None:
+                reader.join()  # Stopped reading at 'exit', joined so it is not killed inside a read
+                return exit_code
+            self.publish_due()
+
+    def read_messages(self):
+        while True:
+            try:
+                message = read_message(self.input)
+            except ValueError as error:  # Answered with a parse error, reading goes on
+                message = error
+            self.messages.put(message)
+            if message is None or isinstance(message, dict) and message.get('method') == 'exit':
+                return
+
+    def handle_batch(self, batch):
+        cancelled = cancelled_ids(batch)
+        for message in batch:
+            if message is None:
+                return 0 if self.shut_down else 1
+            if isinstance(message, ValueError):
+                self.send_error(None, PARSE_ERROR, f"Parse error: {message}")
+                continue
+            problem = invalid_message(message)
+            if problem is not None:
+                # Answered under the id when it is usable, so a waiting client gets its response
+                request_id = message.get('id') if isinstance(message, dict) else None
+                self.send_error(request_id if valid_id(request_id) else None, INVALID_REQUEST, problem)
+                continue
+            method = message.get('method')
+            if method == 'exit':
+                return 0 if self.shut_down else 1
+            if 'id' not in message:
+                handler = self.notifications.get(method)
+                if handler is not None:
+                    try:
+                        handler(message.get('params', {}))
+                    except Exception as error:  # Notifications have no response, the error is logged
+                        self.log_error(method, error)
+            elif 'method' in message:
+                self.respond(message, cancelled)
+        return None
+
+    def respond(self, message, cancelled):
+        request_id = message['id']
+        handler = self.requests.get(message['method'])
+        if request_id in cancelled:
+            self.send_error(request_id, REQUEST_CANCELLED, "Request cancelled.")
+        elif handler is None:
+            self.send_error(request_id, METHOD_NOT_FOUND, f"Unknown method {message['method']}.")
+        elif self.shut_down:
+            self.send_error(request_id, INVALID_REQUEST, "The server is shut down.")
+        else:
+            try:
+                result = handler(message.get('params', {}))
+            except Exception as error:  # The editor session outlives a failed request
+                self.send_error(request_id, INTERNAL_ERROR, f"{type(error).__name__}: {error}")
+            else:
+                self.send({'jsonrpc': '2.0', 'id': request_id, 'result': result})
+
+    def send(self, message):
+        write_message(self.output, message)
+
+    def send_error(self, request_id, code, message):
+        self.send({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+    def notify(self, method, params):
+        self.send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def log_error(self, method, error):
+        self.notify('window/logMessage', {'type': MESSAGE_ERROR,
+                                          'message': f"{method} failed: {type(error).__name__}: {error}"})
+
+    def publish_due(self):
+        now = time.monotonic()
+        for uri, due in list(self.due.items()):
+            if due <= now:
+                del self.due[uri]
+                document = self.documents[uri]
+                try:
+                    diagnostics = document.cached('diagnostics', document.diagnostics)
+                except Exception as error:  # Like a failed request, the session goes on
+                    self.log_error('textDocument/publishDiagnostics', error)
+                    continue
+                self.notify('textDocument/publishDiagnostics',
+                            {'uri': uri, 'version': document.version, 'diagnostics': diagnostics})
+
+    # Requests
+
+    def initialize(self, params):
+        encodings = params.get('capabilities', {}).get('general', {}).get('positionEncodings', [])
+        self.utf16 = 'utf-32' not in encodings
+        return {
+            'capabilities': {
+                'positionEncoding': 'utf-16' if self.utf16 else 'utf-32',
+                'textDocumentSync': {'openClose': True, 'change': 2},  # Incremental changes
+                'semanticTokensProvider': {'legend': {'tokenTypes': SEMANTIC_TOKEN_TYPES, 'tokenModifiers': []},
+                                           'full': True},
+                'documentSymbolProvider': True,
+            },
+            'serverInfo': {'name': 'lexer-lsp'},
+        }
+
+    def shutdown(self, params):
+        self.shut_down = True
+        return None
+
+    def semantic_tokens(self, params):
+        document = self.documents.get(params['textDocument']['uri'])
+        if document is None:
+            return {'data': []}
+        return document.cached('semanticTokens', document.semantic_tokens)
+
+    def document_symbols(self, params):
+        document = self.documents.get(params['textDocument']['uri'])
+        if document is None:
+            return []
+        return document.cached('documentSymbol', document.symbols)
+
+    # Notifications
+
+    def did_open(self, params):
+        item = params['textDocument']
+        self.documents[item['uri']] = OpenDocument(item['uri'], item['text'], item.get('version'), self.utf16)
+        self.due[item['uri']] = time.monotonic()
+
+    def did_change(self, params):
+        uri = params['textDocument']['uri']
+        document = self.documents.get(uri)
+        if document is None:
+            return
+        document.change(params['contentChanges'], params['textDocument'].get('version'))
+        self.due[uri] = time.monotonic() + self.delay
+
+    def did_close(self, params):
+        uri = params['textDocument']['uri']
+        self.documents.pop(uri, None)
+        self.due.pop(uri, None)
+        self.notify('textDocument/publishDiagnostics', {'uri': uri, 'diagnostics': []})
+
+
+class LanguageClient:
+    """Minimal LSP client driving a server in a subprocess, to exercise it from scripts and benchmarks.
+
+    Notifications from the server are kept in `notifications` as they arrive, error responses
+    without an id (to messages the server could not read) in `unmatched`.
+    """
+
+    def __init__(self, command=None):
+        if command is None:
+            command = [sys.executable, os.path.abspath(__file__)]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.next_id = 0
+        self.responses = {}
+        self.notifications = []
+        self.unmatched = []
+        self.exited = False
+        self.condition = threading.Condition()
+        threading.Thread(target=self.read_messages, daemon=True).start()
+
+    def read_messages(self):
+        while True:
+            message = read_message(self.process.stdout)
+            with self.condition:
+                if message is None:
+                    self.exited = True  # Wakes up waiters, the server is gone
+                elif 'id' in message and 'method' not in message:
+                    if message['id'] is None:
+                        self.unmatched.append(message)
+                    else:
+                        self.responses[message['id']] = message
+                else:
+                    self.notifications.append(message)
+                self.condition.notify_all()
+            if message is None:
+                return
+
+    def send(self, message):
+        write_message(self.process.stdin, message)
+
+    def request_async(self, method, params=None):
+        """Send a request without waiting, returns its id for `response`."""
+        self.next_id += 1
+        self.send({'jsonrpc': '2.0', 'id': self.next_id, 'method': method, 'params': params or {}})
+        return self.next_id
+
+    def response(self, request_id, timeout=10):
+        """Response message of a request, raises TimeoutError."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: request_id in self.responses or self.exited, timeout):
+                raise TimeoutError(f"No response to request {request_id}")
+            if request_id not in self.responses:
+                raise ConnectionError("The server exited")
+            return self.responses.pop(request_id)
+
+    def request(self, method, params=None, timeout=10):
+        """Result of a request, raises RuntimeError for an error response."""
+        response = self.response(self.request_async(method, params), timeout)
+        if 'error' in response:
+            raise RuntimeError(response['error']['message'])
+        return response['result']
+
+    def notify(self, method, params=None):
+        self.send({'jsonrpc': '2.0', 'method': method, 'params': params or {}})
+
+    def wait_for_notification(self, method, predicate=None, timeout=10):
+        """First notification of `method` (matching `predicate`) not yet taken, removed from the list."""
+        def find():
+            for index, message in enumerate(self.notifications):
+                if message['method'] == method and (predicate is None or predicate(message['params'])):
+                    return index
+            return None
+
+        with self.condition:
+            if not self.condition.wait_for(lambda: find() is not None, timeout):
+                raise TimeoutError(f"No {method} notification")
+            return self.notifications.pop(find())['params']
+
+    def close(self):
+        """Shut the server down, returns its exit code."""
+        self.request('shutdown')
+        self.notify('exit')
+        self.process.stdin.close()
+        return self.process.wait(timeout=10)
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS * 1000,
+                                 help="Milliseconds without edits before a document is re-analyzed")
+    arguments = argument_parser.parse_args(argv)
+    return LanguageServer(delay=arguments.debounce / 1000).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+import codecs
+import mmap
+from array import array
+
+from literals import UNTERMINATED_STRING, find_string_end, unescape
+from parse import Parser
+from positions import LineIndex
+from scanner import Scanner
+from tokens import TokenBuffer, IDENTIFIER_ID, KEYWORD_ID, STRING_ID
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+
+class MappedTokenBuffer(TokenBuffer):
+    """TokenBuffer over UTF-8 bytes (an mmap, bytes or memoryview) instead of a str.
+
+    `starts` and `lengths` count bytes, lines and columns still count characters. A value is only
+    decoded when it is asked for, so the source never exists as one Python string. Lines come from
+    a LineIndex of the bytes, and unless they are all ASCII, columns from decoding the line up to
+    the token.
+    """
+
+    def __init__(self, data):
+        super().__init__(data, LineIndex(data))
+
+    def position(self, index):
+        positions = self.positions
+        if positions is not None and index < len(positions[0]):
+            return positions[0][index], positions[1][index]
+        line_index = self.line_index
+        start = self.starts[index]
+        line, column = line_index.position(start)
+        if not line_index.ascii:
+            column = len(str(self.text[line_index.line_start(line):start], 'utf-8')) + 1
+            column += self.identifier_shift(index)
+        return line, column
+
+    def identifier_shift(self, index):
+        kind = self.kinds[index]
+        if kind != IDENTIFIER_ID and kind != KEYWORD_ID:
+            return 0
+        start = self.starts[index]
+        name = str(self.text[start:start + self.lengths[index]], 'utf-8')
+        return len(name) - len(name.lower())
+
+    def line_columns(self):
+        if self.line_index.ascii:
+            return super().line_columns()
+        if self.positions is None:
+            self.positions = (array('i'), array('i'))
+        lines, columns = self.positions
+        line_index = self.line_index
+        data = self.text
+        # Tokens come in order, so each column is decoded on from the previous token of its line
+        line = offset = column = None
+        for index in range(len(lines), len(self.kinds)):
+            start = self.starts[index]
+            token_line = line_index.line(start)
+            if token_line != line:
+                line, offset, column = token_line, line_index.line_start(token_line), 1
+            column += len(str(data[offset:start], 'utf-8'))
+            offset = start
+            lines.append(line)
+            columns.append(column + self.identifier_shift(index))
+        return self.positions
+
+    def value(self, index):
+        start = self.starts[index]
+        value = str(self.text[start:start + self.lengths[index]], 'utf-8')
+        kind = self.kinds[index]
+        if kind == STRING_ID:
+            return unescape(value[1:-1])
+        if kind == IDENTIFIER_ID or kind == KEYWORD_ID:
+            return value.lower()
+        return value
+
+    def values(self):
+        return [self.value(index) for index in range(len(self.kinds))]
+
+
+def byte_offsets(text, offsets):
+    """UTF-8 byte offsets in `text` of the ascending character `offsets`."""
+    result = []
+    previous = size = 0
+    for offset in offsets:
+        size += len(text[previous:offset].encode('utf-8'))
+        previous = offset
+        result.append(size)
+    return result
+
+
+def advance(text, line, line_start):
+    """(line, line_start) after `text` for a text starting at that line and line start."""
+    newlines = text.count('\n')
+    if newlines:
+        return line + newlines, text.rfind('\n') + 1 - len(text)
+    return line, line_start - len(text)
+
+
+def utf8_length(text):
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+class MappedLexer:
+    """Lexes UTF-8 bytes block by block into a MappedTokenBuffer.
+
+    Only one decoded block (plus an unfinished token carried over from the previous one) is held as
+    text at a time; tokens point into `data`, which must stay open while they are used. A string
+    literal running past a block is not carried along: the following blocks are searched for its
+    closing quote, and when there is none, lexing starts over once right after the opening quote.
+    """
+
+    def __init__(self, data, block_size=DEFAULT_BLOCK_SIZE):
+        self.data = data
+        self.block_size = block_size
+        self.errors = []
+        self.buffer = None
+
+    def tokenize_compact(self):
+        buffer = MappedTokenBuffer(self.data)
+        restart = (0, 1, 0)
+        while restart is not None:
+            restart = self.scan_from(buffer, *restart)
+        self.buffer = buffer
+        return buffer
+
+    def scan_from(self, buffer, base, line, line_start):
+        """Lex `data` from byte `base`, where that line and line start are, into `buffer`.
+
+        Returns where to start over after an unterminated string literal, as the arguments, or None.
+        """
+        data = self.data
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending = ''
+        literal = None  # (byte offset, line, column) of the quote opening a literal not closed yet
+        escaped = False  # Whether the literal text so far ends in an odd run of backslashes
+        for offset in range(base, len(data), self.block_size):
+            final = offset + self.block_size >= len(data)
+            text = pending + decoder.decode(data[offset:offset + self.block_size], final)
+            position = 0
+            if literal is not None:
+                end = find_string_end(('\\' if escaped else ' ') + text, 0) - 1
+                if end < 0:
+                    escaped = odd_backslashes(text, escaped)
+                    base += utf8_length(text)
+                    line, line_start = advance(text, line, line_start)
+                    continue
+                position = end + 1
+                start = literal[0]
+                buffer.kinds.append(STRING_ID)
+                buffer.starts.append(start)
+                buffer.lengths.append(base + utf8_length(text[:position]) - start)
+                literal = None
+
+            scanner = Scanner(text)
+            scanner.line, scanner.line_start, scanner.position = line, line_start, position
+            tokens, errors = scanner.scan(final)
+            self.errors.extend(errors)
+
+            buffer.kinds.extend(tokens.kinds)
+            if text.isascii():
+                # One byte per character, offsets only move by the block start
+                buffer.starts.extend(map(base.__add__, tokens.starts))
+                buffer.lengths.extend(tokens.lengths)
+                base += scanner.position
+            else:
+                # Character offsets in `text` become byte offsets in `data`
+                bounds = []
+                for start, length in zip(tokens.starts, tokens.lengths):
+                    bounds.append(start)
+                    bounds.append(start + length)
+                bounds.append(scanner.position)
+                bounds = byte_offsets(text, bounds)
+                for index in range(0, len(bounds) - 1, 2):
+                    buffer.starts.append(base + bounds[index])
+                    buffer.lengths.append(bounds[index + 1] - bounds[index])
+                base += bounds[-1]
+            pending = text[scanner.position:]
+            line, line_start = scanner.line, scanner.line_start - scanner.position
+            if pending.startswith('"'):
+                # Only where the literal opened is kept, the next blocks look for its end
+                line_index = scanner.line_index
+                literal = (base, line, line_index.position(scanner.position)[1])
+                escaped = odd_backslashes(pending[1:], False)
+            elif not pending.isspace():
+                continue
+            # Neither a literal nor whitespace needs its text carried over
+            base += utf8_length(pending)
+            line, line_start = advance(pending, line, line_start)
+            pending = ''
+
+        if literal is not None:
+            start, quote_line, quote_column = literal
+            self.errors.append({'type': 'ERROR', 'value': '"', 'line': quote_line, 'column': quote_column,
+                                'message': UNTERMINATED_STRING})
+            # Lexed again from after the quote, as Scanner goes on after an unterminated literal
+            return start + 1, quote_line, -quote_column
+        return None
+
+
+def odd_backslashes(text, escaped):
+    """Whether `text`, following text that ended in an odd run of backslashes when `escaped`, does."""
+    run = len(text) - len(text.rstrip('\\'))
+    if run == len(text):
+        return escaped != (run % 2 == 1)
+    return run % 2 == 1
+
+
+def open_mapped(path):
+    """Read-only mmap of the file at `path` (bytes for an empty file, which cannot be mapped)."""
+    with open(path, 'rb') as file:
+        try:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b''
+
+
+def analyze_mapped(path):
+    """Lex and parse the file at `path` through an mmap. Returns (tokens, lex errors, ast, diagnostics)."""
+    data = open_mapped(path)
+    lexer = MappedLexer(data)
+    tokens = lexer.tokenize_compact()
+    ast, diagnostics = Parser(tokens).parse_with_recovery()
+    return tokens, lexer.errors, ast, diagnostics
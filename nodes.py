@@ -0,0 +1,250 @@
+import unicodedata
+
+from parse import BOOLEAN_LITERALS
+
+# Binding strength of the arithmetic operators, all of them are left associative
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2}
+
+
+class Node:
+    """Base of the AST node classes. `fields` names the attributes, in order, for generic traversal."""
+
+    __slots__ = ()
+    fields = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.fields)
+
+    def __repr__(self):
+        values = ', '.join(repr(getattr(self, name)) for name in self.fields)
+        return f"{type(self).__name__}({values})"
+
+
+class Number(Node):
+    __slots__ = fields = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class String(Node):
+    __slots__ = fields = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Boolean(Node):
+    __slots__ = fields = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Name(Node):
+    __slots__ = fields = ('identifier',)
+
+    def __init__(self, identifier):
+        self.identifier = identifier
+
+
+class BinaryOp(Node):
+    __slots__ = fields = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+class Comparison(Node):
+    __slots__ = fields = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+class Statement(Node):
+    """Base of the statement node classes. `line` and `column` of the statement's first token, None
+    when unknown, are not fields: they take no part in traversal or comparison."""
+
+    __slots__ = ('line', 'column')
+
+
+class VariableDeclaration(Statement):
+    __slots__ = fields = ('type_name', 'identifier', 'value')
+
+    def __init__(self, type_name, identifier, value, line=None, column=None):
+        self.type_name = type_name
+        self.identifier = identifier
+        self.value = value
+        self.line = line
+        self.column = column
+
+
+class Assignment(Statement):
+    __slots__ = fields = ('identifier', 'expression')
+
+    def __init__(self, identifier, expression, line=None, column=None):
+        self.identifier = identifier
+        self.expression = expression
+        self.line = line
+        self.column = column
+
+
+class If(Statement):
+    __slots__ = fields = ('condition', 'body', 'orelse')
+
+    def __init__(self, condition, body, orelse, line=None, column=None):
+        self.condition = condition
+        self.body = body
+        self.orelse = orelse
+        self.line = line
+        self.column = column
+
+
+class While(Statement):
+    __slots__ = fields = ('condition', 'body')
+
+    def __init__(self, condition, body, line=None, column=None):
+        self.condition = condition
+        self.body = body
+        self.line = line
+        self.column = column
+
+
+class Parameter(Node):
+    __slots__ = fields = ('type_name', 'name')
+
+    def __init__(self, type_name, name):
+        self.type_name = type_name
+        self.name = name
+
+
+class FunctionDeclaration(Statement):
+    __slots__ = fields = ('return_type', 'name', 'parameters', 'body')
+
+    def __init__(self, return_type, name, parameters, body, line=None, column=None):
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+        self.line = line
+        self.column = column
+
+
+def number_value(text):
+    """Integer of a NUMBER token. The lexer takes every str.isdigit character, such as '²', which
+    int() rejects, so those are read one digit at a time."""
+    if text.isdecimal():
+        return int(text)
+    return int(''.join(str(unicodedata.digit(char)) for char in text))
+
+
+def build_operand(value):
+    """Node of an operand value from the parser: a number, a boolean literal or a variable."""
+    if value.isdigit():
+        return Number(number_value(value))
+    if value in BOOLEAN_LITERALS:
+        return Boolean(value == 'verdadero')
+    return Name(value)
+
+
+def build_expression(elements):
+    """Expression tree of a flat [operand, operator, operand, ...] list, by precedence climbing."""
+    position = 1
+
+    def climb(left, minimum):
+        nonlocal position
+        while position < len(elements) and PRECEDENCE[elements[position]] >= minimum:
+            operator = elements[position]
+            right = build_operand(elements[position + 1])
+            position += 2
+            # Operators binding tighter than this one take the right operand first
+            while position < len(elements) and PRECEDENCE[elements[position]] > PRECEDENCE[operator]:
+                right = climb(right, PRECEDENCE[operator] + 1)
+            left = BinaryOp(operator, left, right)
+        return left
+
+    return climb(build_operand(elements[0]), 0)
+
+
+def build_condition(condition):
+    data = condition['data']
+    return Comparison(data['operation'], Name(data['identifier']), build_operand(data['comparison']))
+
+
+def build_block(block):
+    return [build_statement(statement) for statement in block['statements']]
+
+
+def build_declaration(node):
+    data = node['data']
+    if data.get('value_type') == 'STRING':
+        value = String(data['value'])
+    else:
+        value = build_operand(data['value'])
+    return VariableDeclaration(data['type'], data['identifier'], value, node.get('line'), node.get('column'))
+
+
+def build_assignment(node):
+    return Assignment(node['identifier'], build_expression(node['expression']), node.get('line'), node.get('column'))
+
+
+def build_if(node):
+    return If(build_condition(node['if_block']['condition']), build_block(node['if_block']),
+              build_block(node['else_block']), node.get('line'), node.get('column'))
+
+
+def build_while(node):
+    return While(build_condition(node['data']['condition']), build_block(node), node.get('line'), node.get('column'))
+
+
+def build_function(node):
+    data = node['data']
+    parameters = [Parameter(parameter['type'], parameter['name']) for parameter in data['parameters']]
+    return FunctionDeclaration(data['return_type'], data['function_name'], parameters, build_block(node),
+                               node.get('line'), node.get('column'))
+
+
+# Parser dict 'type' -> builder of the node class
+BUILDERS = {'variable_declaration': build_declaration,
+            'assignment': build_assignment,
+            'if_statement': build_if,
+            'while_loop': build_while,
+            'function_declaration': build_function}
+
+
+def build_statement(node):
+    return BUILDERS[node['type']](node)
+
+
+def build_program(ast):
+    """Node classes of the dict AST returned by Parser.parse / parse_with_recovery."""
+    return [build_statement(node) for node in ast]
+
+
+class NodeVisitor:
+    """Calls `visit_<ClassName>` for each visited node, or `generic_visit`, which visits its children."""
+
+    def __init__(self):
+        self.dispatch = {}  # Node class -> bound visit method, looked up once per class
+
+    def visit(self, node):
+        try:
+            method = self.dispatch[type(node)]
+        except KeyError:
+            method = self.dispatch[type(node)] = getattr(self, 'visit_' + type(node).__name__, self.generic_visit)
+        return method(node)
+
+    def generic_visit(self, node):
+        for name in node.fields:
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                self.visit(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Node):
+                        self.visit(item)
@@ -0,0 +1,8 @@
+"""Semantics of the language's operators and types, shared by Interpreter, the VM and Optimizer."""
+import operator
+
+OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv, '%': operator.mod,
+             '==': operator.eq, '<=': operator.le, '>=': operator.ge, '<': operator.lt, '>': operator.gt}
+
+# Declared type -> conversion applied to every value stored in a variable of that type
+CONVERSIONS = {'entero': int, 'decimal': float, 'booleano': bool, 'cadena': str}
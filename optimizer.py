@@ -0,0 +1,191 @@
+from nodes import (Assignment, BinaryOp, Boolean, Comparison, FunctionDeclaration, If, Name, Node, NodeVisitor, Number,
+                   String, VariableDeclaration, While)
+from operations import CONVERSIONS, OPERATORS
+
+
+def count_nodes(value):
+    """Number of nodes in a node or a list of them, children included."""
+    if isinstance(value, list):
+        return sum(count_nodes(item) for item in value)
+    if not isinstance(value, Node):
+        return 0
+    return 1 + sum(count_nodes(getattr(value, name)) for name in value.fields)
+
+
+def constant_node(value):
+    if isinstance(value, bool):
+        return Boolean(value)
+    if isinstance(value, str):
+        return String(value)
+    return Number(value)
+
+
+def is_constant(node):
+    return isinstance(node, (Number, String, Boolean))
+
+
+def assignments(statements, declared=None):
+    """Variables declared or assigned anywhere in `statements`, nested blocks included.
+
+    Returns a dict of variable -> set of the types it is declared with there, empty if only assigned.
+    """
+    declared = {} if declared is None else declared
+    for statement in statements:
+        if isinstance(statement, VariableDeclaration):
+            declared.setdefault(statement.identifier, set()).add(statement.type_name)
+        elif isinstance(statement, Assignment):
+            declared.setdefault(statement.identifier, set())
+        elif isinstance(statement, If):
+            assignments(statement.body, declared)
+            assignments(statement.orelse, declared)
+        elif isinstance(statement, While):
+            assignments(statement.body, declared)
+    return declared
+
+
+class Optimizer(NodeVisitor):
+    """Folds constant expressions, propagates constant variables and drops statically decided branches.
+
+    Works on the node classes of `nodes` and returns new nodes, the program passed in is not changed.
+    The result runs like the original under Interpreter: operations that would fail are left for run
+    time, and a variable is only replaced by its value while it is declared on every path.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.values = {}  # Variable -> value it holds on every path reaching the current statement
+        self.types = {}   # Variable -> type it is declared with on every path reaching the current statement
+        self.folded = 0      # Operations replaced by their result
+        self.propagated = 0  # Variable reads replaced by a constant
+        self.eliminated = 0  # si / mientras statements decided statically
+        self.removed = 0     # Nodes in the input minus nodes in the output
+
+    def optimize(self, program):
+        optimized = self.block(program)
+        self.removed += count_nodes(program) - count_nodes(optimized)
+        return optimized
+
+    def block(self, statements):
+        optimized = []
+        for statement in statements:
+            optimized.extend(self.visit(statement))
+        return optimized
+
+    def known(self, node):
+        """Value of an optimized expression when it is a constant, else None."""
+        return node.value if is_constant(node) else None
+
+    def forget(self, names):
+        for name in names:
+            self.values.pop(name, None)
+
+    def store(self, identifier, type_name, node):
+        # Mirrors Interpreter.store: the variable holds the value converted to its declared type
+        self.values.pop(identifier, None)
+        if type_name is None or not is_constant(node):
+            return
+        try:
+            self.values[identifier] = CONVERSIONS[type_name](node.value)
+        except (ValueError, OverflowError):
+            pass  # Fails at run time, nothing after it runs
+
+    # Statements return the list of statements replacing them
+
+    def visit_VariableDeclaration(self, node):
+        value = self.visit(node.value)
+        self.types[node.identifier] = node.type_name
+        self.store(node.identifier, node.type_name, value)
+        return [VariableDeclaration(node.type_name, node.identifier, value, node.line, node.column)]
+
+    def visit_Assignment(self, node):
+        expression = self.visit(node.expression)
+        self.store(node.identifier, self.types.get(node.identifier), expression)
+        return [Assignment(node.identifier, expression, node.line, node.column)]
+
+    def visit_If(self, node):
+        condition = self.visit(node.condition)
+        if is_constant(condition):
+            # Blocks do not open scopes, the branch that runs takes the place of the statement
+            self.eliminated += 1
+            return self.block(node.body if condition.value else node.orelse)
+
+        values, types = self.values, self.types
+        self.values, self.types = dict(values), dict(types)
+        body = self.block(node.body)
+        body_values, body_types = self.values, self.types
+        self.values, self.types = dict(values), dict(types)
+        orelse = self.block(node.orelse)
+        # Only what both branches agree on holds after the statement
+        self.values = {name: value for name, value in self.values.items()
+                       if name in body_values and body_values[name] == value
+                       and type(body_values[name]) is type(value)}
+        self.types = {name: type_name for name, type_name in self.types.items() if body_types.get(name) == type_name}
+        return [If(condition, body, orelse, node.line, node.column)]
+
+    def visit_While(self, node):
+        counts = self.folded, self.propagated
+        if self.known(self.visit(node.condition)) is False:
+            self.eliminated += 1
+            return []
+        self.folded, self.propagated = counts
+
+        # The body may run many times, nothing it assigns is known in it or after it, and neither is
+        # the type of a variable it may declare differently
+        assigned = assignments(node.body)
+        self.forget(assigned)
+        for name, type_names in assigned.items():
+            if type_names and type_names != {self.types.get(name)}:
+                self.types.pop(name, None)
+        condition = self.visit(node.condition)
+        if is_constant(condition):
+            condition = node.condition  # Always true: a loop needs a comparison to run, keep the original
+        types = dict(self.types)
+        body = self.block(node.body)
+        self.forget(assigned)
+        self.types = types  # Declarations that only run in the body are not certain after it
+        return [While(condition, body, node.line, node.column)]
+
+    def visit_FunctionDeclaration(self, node):
+        # The body never runs here, it is only folded, with nothing known about the variables
+        values, types = self.values, self.types
+        self.values, self.types = {}, {}
+        body = self.block(node.body)
+        self.values, self.types = values, types
+        return [FunctionDeclaration(node.return_type, node.name, node.parameters, body, node.line, node.column)]
+
+    # Expressions return the node replacing them
+
+    def visit_BinaryOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        # Repeating a string is left for run time, the result could be huge
+        repeats = node.operator == '*' and (isinstance(left, String) or isinstance(right, String))
+        if is_constant(left) and is_constant(right) and not repeats:
+            try:
+                value = OPERATORS[node.operator](left.value, right.value)
+            except (ZeroDivisionError, OverflowError, TypeError):
+                pass  # Left in place so it fails at run time like before
+            else:
+                self.folded += 1
+                return constant_node(value)
+        return type(node)(node.operator, left, right)
+
+    visit_Comparison = visit_BinaryOp
+
+    def visit_Name(self, node):
+        if node.identifier in self.values and node.identifier in self.types:
+            self.propagated += 1
+            return constant_node(self.values[node.identifier])
+        return node
+
+    def visit_Number(self, node):
+        return node
+
+    visit_String = visit_Boolean = visit_Number
+
+
+def optimize(program):
+    """Optimized copy of a list of node classes and the number of nodes the pass removed."""
+    optimizer = Optimizer()
+    optimized = optimizer.optimize(program)
+    return optimized, optimizer.removed
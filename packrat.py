@@ -0,0 +1,155 @@
+from collections import deque
+
+from parse import Parser, TYPE_KEYWORDS
+
+MAX_ENTRIES = 4096  # Memo entries kept at most, whatever the parser commits to
+
+
+class MemoTable:
+    """Rule results keyed by (rule name, token index), with bounded memory.
+
+    Once the parser commits to a token index it never backtracks before it, and `commit` drops the
+    entries below it. `max_entries` caps the table on top of that, dropping the oldest entries, for
+    a backtrack that spans more than a statement. Evicting only costs time: a dropped entry is
+    parsed again when asked for.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = {}
+        self.order = deque()  # Keys in insertion order, the eviction queue
+        self.hits = {}        # Rule name -> lookups answered from the table
+        self.misses = {}      # Rule name -> lookups that ran the rule
+        self.evicted = 0
+        self.peak = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        counts = self.misses if entry is None else self.hits
+        counts[key[0]] = counts.get(key[0], 0) + 1
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.order.append(key)
+        if len(self.entries) > self.max_entries:
+            self.drop(self.order.popleft())
+        self.peak = max(self.peak, len(self.entries))
+
+    def commit(self, index):
+        """Forget the results of rules that started before token `index`."""
+        order = self.order
+        while order and order[0][1] < index:
+            self.drop(order.popleft())
+
+    def drop(self, key):
+        if self.entries.pop(key, None) is not None:
+            self.evicted += 1
+
+    def stats(self):
+        rules = {}
+        for name in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(name, 0), self.misses.get(name, 0)
+            rules[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses)}
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {'rules': rules, 'hits': hits, 'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'size': len(self.entries), 'peak': self.peak, 'evicted': self.evicted}
+
+
+class PackratParser(Parser):
+    """Parser choosing between declarations by backtracking over memoized rules instead of peeking.
+
+    `choose` tries alternatives in order and `apply` runs a rule through the memo table, so a rule
+    is parsed at most once per token index while its entry is kept. Only rules called through
+    `apply` are memoized, the ones alternatives share: a failed alternative is not asked for again
+    at the same place, keeping its result would only cost. Both declarations start with a type and
+    a name, parsed once by `parse_typed_name` whichever alternative asks first. Produces the same
+    AST and diagnostics as Parser.
+
+    Results are shared by every hit, rules must not change them afterwards. Lazily produced tokens
+    need a TokenWindow that keeps the longest backtrack.
+    """
+
+    def __init__(self, tokens, max_entries=MAX_ENTRIES):
+        super().__init__(tokens)
+        self.memo = MemoTable(max_entries)
+
+    def seek(self, index):
+        self.current_token_index = index
+        self.current = self.get_token(index) or self.end
+
+    def apply(self, rule):
+        """Result of the parse_* method `rule` at the current token, parsed once per index."""
+        key = (rule.__name__, self.current_token_index)
+        entry = self.memo.get(key)
+        if entry is not None:
+            result, error, end, diagnostics = entry
+            self.seek(end)
+            self.diagnostics.extend(diagnostics)
+            if error is not None:
+                raise error
+            return result
+
+        mark = len(self.diagnostics)
+        try:
+            result = rule()
+        except SyntaxError as error:
+            self.memo.put(key, (None, error, self.current_token_index, self.diagnostics[mark:]))
+            raise
+        self.memo.put(key, (result, None, self.current_token_index, self.diagnostics[mark:]))
+        return result
+
+    def choose(self, *rules):
+        """Result of the first rule that parses, backtracking to the start after each failure.
+
+        When they all fail, the error raised farthest into the input is raised, the later rule
+        winning a tie, with the position and diagnostics its rule left, as if it had been the only one.
+        """
+        start = self.current_token_index
+        mark = len(self.diagnostics)
+        farthest = None
+        for rule in rules:
+            try:
+                return rule()
+            except SyntaxError as error:
+                if farthest is None or self.current_token_index >= farthest[0]:
+                    farthest = (self.current_token_index, error, self.diagnostics[mark:])
+                del self.diagnostics[mark:]
+                self.seek(start)
+        index, error, diagnostics = farthest
+        self.seek(index)
+        self.diagnostics.extend(diagnostics)
+        raise error
+
+    def parse_statement(self):
+        # Nothing before a top level statement is parsed again
+        self.memo.commit(self.current_token_index)
+        return super().parse_statement()
+
+    def parse_declaration(self):
+        return self.choose(self.parse_function_declaration, self.parse_variable_declaration)
+
+    def parse_typed_name(self):
+        """Type keyword and identifier starting a declaration, returns (type, name)."""
+        token = self.current
+        if token['type'] != 'KEYWORD' or token['value'] not in TYPE_KEYWORDS:
+            self.raise_error("Unexpected keyword; expected 'entero', 'decimal', 'booleano', or 'cadena'")
+        name = self.next_token()
+        if name['type'] != 'IDENTIFIER':
+            # Reported for functions too: the variable declaration fails at the same token and wins the tie
+            self.raise_error("Invalid or missing identifier in variable declaration.")
+        self.next_token()
+        return token['value'], name['value']
+
+    def parse_variable_declaration(self):
+        node = {'type': 'variable_declaration', 'data': {}}
+        data = node['data']
+        data['type'], data['identifier'] = self.apply(self.parse_typed_name)
+        self.parse_initializer(data)
+        return node
+
+    def parse_function_header(self, node):
+        data = node['data']
+        data['return_type'], data['function_name'] = self.apply(self.parse_typed_name)
+        self.parse_signature(node)
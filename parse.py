@@ -1,295 +1,594 @@
+from collections.abc import Sequence
+
+from streaming import TokenWindow
+from tokens import TokenBuffer
+
+# First sets and operator classes, built once instead of list literals on every token
+TYPE_KEYWORDS = frozenset(['entero', 'decimal', 'booleano', 'cadena'])
+BOOLEAN_LITERALS = frozenset(['verdadero', 'falso'])
+OPERAND_TYPES = frozenset(['NUMBER', 'IDENTIFIER'])
+VALUE_TYPES = frozenset(['STRING', 'NUMBER', 'IDENTIFIER'])
+ARITHMETIC_OPERATORS = frozenset(['+', '-', '*', '/', '%'])
+COMPARISON_OPERATORS = frozenset(['==', '<=', '>=', '<', '>'])
+
+# Tokens that start a statement, where panic-mode recovery resumes parsing
+SYNC_KEYWORDS = TYPE_KEYWORDS | {'si', 'mientras'}
+
+
+class EndOfInput:
+    """Stands for the token after the last one: false like a missing token, and reading a field of
+    it raises the parser's SyntaxError for a statement cut short."""
+
+    __slots__ = ('parser',)
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __bool__(self):
+        return False
+
+    def __getitem__(self, key):
+        self.parser.raise_error("Unexpected end of input.")
+
+
+def format_diagnostic(diagnostic):
+    if diagnostic['line'] is None:
+        return "Error: " + diagnostic['message']
+    return f"Error at line {diagnostic['line']}, column {diagnostic['column']}: {diagnostic['message']}"
+
+
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
+        self.buffer = None  # The TokenBuffer, whose tokens carry no position
+        if isinstance(tokens, TokenBuffer):
+            self.tokens = self.buffer = tokens
+            self.get_token = tokens.get
+        elif isinstance(tokens, Sequence):
+            self.tokens = tokens
+            self.get_token = self.sequence_token
+        else:
+            # Lazily produced tokens (e.g. StreamingLexer), parsed as they arrive
+            self.tokens = None
+            self.get_token = TokenWindow(tokens).get
+        self.end = EndOfInput(self)
         self.current_token_index = 0
+        self.current = self.get_token(0) or self.end  # Token at current_token_index, `end` past the last
+        self.recover = False  # Set by parse_with_recovery
+        self.diagnostics = []
 
-    def current_token(self):
-        if self.current_token_index < len(self.tokens):
-            return self.tokens[self.current_token_index]
+        # Dispatch tables keyed by token kind: the keyword itself, or the token type for other tokens
+        self.statement_handlers = {'si': self.parse_if_statement,
+                                   'mientras': self.parse_while_loop,
+                                   'IDENTIFIER': self.parse_expression}
+        self.block_handlers = dict(self.statement_handlers)
+        for keyword in TYPE_KEYWORDS:
+            self.statement_handlers[keyword] = self.parse_declaration
+            self.block_handlers[keyword] = self.parse_variable_declaration
+
+    def sequence_token(self, index):
+        if index < len(self.tokens):
+            return self.tokens[index]
         return None
-    
+
+    def token_at(self, index):
+        return self.get_token(index)
+
+    def token_position(self, token, index):
+        """(line, column) of `token`, the token at `index`, from the buffer's line index if it has one."""
+        if self.buffer is not None:
+            return self.buffer.position(index)
+        return token['line'], token['column']
+
+    def current_token(self):
+        return self.current
+
     def next_token(self):
         self.current_token_index += 1
-        return self.current_token()
-    
+        self.current = self.get_token(self.current_token_index) or self.end
+        return self.current
+
     def peek_token(self):
-        if self.current_token_index + 1 < len(self.tokens):
-            return self.tokens[self.current_token_index + 1]
-        return None
+        return self.get_token(self.current_token_index + 1) or self.end
 
     def peek_next_token(self):
-        if self.current_token_index + 2 < len(self.tokens):
-            return self.tokens[self.current_token_index + 2]
-        return None
+        return self.get_token(self.current_token_index + 2) or self.end
 
     def raise_error(self, message):
-        token = self.current_token()
+        token = self.current
         if token:
-            error_msg = f"Error at line {token['line']}, column {token['column']}: {message}"
+            line, column = self.token_position(token, self.current_token_index)
+            error_msg = f"Error at line {line}, column {column}: {message}"
         else:
             error_msg = "Error: " + message
-        raise SyntaxError(error_msg)
+        error = SyntaxError(error_msg)
+        # Unformatted parts for callers that report positions themselves
+        error.reason = message
+        error.token = token or None
+        error.token_index = self.current_token_index
+        raise error
 
     def parse(self):
         results = []
-        while self.current_token() is not None:
-            if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['entero', 'decimal', 'booleano', 'cadena']:
-                # Peek to see if next token is an identifier followed by `(`, indicates a function declaration
-                if self.peek_token() and self.peek_token()['type'] == 'IDENTIFIER' and self.peek_next_token() and self.peek_next_token()['value'] == '(':
-                    results.append(self.parse_function_declaration())
-                else:
-                    results.append(self.parse_variable_declaration())
-
-            elif self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'si':
-                results.append(self.parse_if_statement())
-            elif self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'mientras':
-                results.append(self.parse_while_loop())
-            elif self.current_token()['type'] == 'IDENTIFIER':
-                results.append(self.parse_expression())
-            else:
-                self.raise_error(f"Unexpected token {self.current_token()['value']}")
+        parse_statement = self.parse_statement
+        while self.current:
+            results.append(parse_statement())
         return results
 
+    def parse_with_recovery(self):
+        """Parse all tokens, recovering from syntax errors instead of stopping at the first one.
+
+        Returns the AST of everything that parsed and the list of diagnostics, each a dict with
+        'type', 'message', 'value', 'line' and 'column' of the offending token.
+        """
+        self.recover = True
+        results = []
+        while self.current_token():
+            node = self.recover_statement(self.parse_statement, in_block=False)
+            if node is not None:
+                results.append(node)
+        return results, self.diagnostics
+
+    def recover_statement(self, parse, in_block):
+        start = self.current_token_index
+        try:
+            return parse()
+        except SyntaxError as error:
+            self.report(error)
+            self.synchronize(start, in_block)
+            return None
+
+    def report(self, error):
+        token = getattr(error, 'token', None)
+        index = getattr(error, 'token_index', None)
+        message = getattr(error, 'reason', str(error))
+        if token is None and self.current_token_index:
+            index = self.current_token_index - 1
+            token = self.token_at(index)  # Report end of input at the last token
+        line, column = self.token_position(token, index) if token else (None, None)
+        self.diagnostics.append({
+            'type': 'SYNTAX_ERROR',
+            'message': message,
+            'value': token['value'] if token else None,
+            'line': line,
+            'column': column
+        })
+
+    def synchronize(self, start, in_block):
+        """Panic mode: skip the rest of the broken statement, blocks included.
+
+        Stops after a ';' or after the '}' closing a skipped block (and its 'sino' block), or before
+        a statement keyword or the '}' closing the enclosing block. Returns True when it stopped
+        there, False when the tokens ran out first.
+        """
+        depth = 0
+        token = self.current_token()
+        while token:
+            if token['type'] == 'SIGN':
+                if token['value'] == '{':
+                    depth += 1
+                elif token['value'] == '}':
+                    if depth == 0 and in_block:
+                        return True
+                    depth = max(depth - 1, 0)
+                    if depth == 0:
+                        token = self.next_token()
+                        if token and token['type'] == 'KEYWORD' and token['value'] == 'sino':
+                            continue
+                        return True
+                elif token['value'] == ';' and depth == 0:
+                    self.next_token()
+                    return True
+            elif (depth == 0 and self.current_token_index > start and token['type'] == 'KEYWORD'
+                  and token['value'] in SYNC_KEYWORDS):
+                return True
+            token = self.next_token()
+        return False
+
+    def parse_statement(self):
+        """Parse one top-level statement starting at the current token."""
+        token = self.current
+        index = self.current_token_index
+        handler = self.statement_handlers.get(token['value'] if token['type'] == 'KEYWORD' else token['type'])
+        if handler is None:
+            self.raise_error(f"Unexpected token {token['value']}")
+        return self.locate(handler(), token, index)
+
+    def locate(self, node, token, index):
+        """Set 'line' and 'column' of a statement node to those of `token`, its first token at `index`."""
+        node['line'], node['column'] = self.token_position(token, index)
+        return node
+
+    def parse_declaration(self):
+        # A type keyword followed by an identifier and `(` starts a function declaration
+        following = self.peek_token()
+        if following and following['type'] == 'IDENTIFIER':
+            following = self.peek_next_token()
+            if following and following['value'] == '(':
+                return self.parse_function_declaration()
+        return self.parse_variable_declaration()
+
     def parse_expression(self):
-        if self.current_token()['type'] != 'IDENTIFIER':
+        token = self.current
+        if token['type'] != 'IDENTIFIER':
             self.raise_error("Expected identifier at start of expression.")
+        left = token['value']
 
-        left = self.current_token()['value']
-        self.next_token()
-
-        if self.current_token()['type'] == 'OPERATOR' and self.current_token()['value'] == '=':
-            self.next_token()
-            expression = self.parse_complex_expression()
-        else:
+        token = self.next_token()
+        if token['value'] != '=' or token['type'] != 'OPERATOR':
             self.raise_error("Expected '=' after identifier.")
+        self.next_token()
+        expression = self.parse_complex_expression()
 
-        if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == ';':
-            self.next_token()
-        else:
+        token = self.current
+        if token['value'] != ';' or token['type'] != 'SIGN':
             self.raise_error("Expected ';' at end of expression.")
+        self.next_token()
 
         return {'type': 'assignment', 'identifier': left, 'expression': expression}
 
     def parse_complex_expression(self):
         elements = []
-        if self.current_token()['type'] in ['NUMBER', 'IDENTIFIER']:
-            elements.append(self.current_token()['value'])
-            self.next_token()
-        else:
+        token = self.current
+        if token['type'] not in OPERAND_TYPES:
             self.raise_error("Expected a number or identifier after '='.")
+        elements.append(token['value'])
+        token = self.next_token()
 
-        while self.current_token()['value'] in ['+', '-', '*', '/', '%']:
-            operator = self.current_token()['value']
-            self.next_token()
-            if self.current_token()['type'] in ['NUMBER', 'IDENTIFIER']:
-                elements.append(operator)
-                elements.append(self.current_token()['value'])
-                self.next_token()
-            else:
+        while token['value'] in ARITHMETIC_OPERATORS:
+            operator = token['value']
+            token = self.next_token()
+            if token['type'] not in OPERAND_TYPES:
                 self.raise_error(f"Expected a number or identifier after operator '{operator}'.")
+            elements.append(operator)
+            elements.append(token['value'])
+            token = self.next_token()
 
         return elements
 
     def parse_variable_declaration(self):
         node = {'type': 'variable_declaration', 'data': {}}
-        if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['entero', 'decimal', 'booleano', 'cadena']:
-            node['data']['type'] = self.current_token()['value']
-            self.next_token()  # Move to IDENTIFIER
-            if self.current_token()['type'] == 'IDENTIFIER':
-                node['data']['identifier'] = self.current_token()['value']
-                self.next_token()  # Move to OPERATOR(=)
-                if self.current_token()['type'] == 'OPERATOR' and self.current_token()['value'] == '=':
-                    self.next_token()  # Move to VALUE
-                    if (self.current_token()['type'] in ['STRING', 'NUMBER', 'IDENTIFIER']) or (self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['verdadero', 'falso']):
-                        node['data']['value'] = self.current_token()['value']
-                        self.next_token()  # Move to expected semicolon
-                        print(self.current_token())
-                        if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == ';':
-                            self.next_token()  # Prepare for the next statement
-                            return node
-                        else:
-                            self.raise_error("Missing semicolon in variable declaration.")
-                    else:
-                        self.raise_error("Invalid or missing value in variable declaration.")
-                else:
-                    self.raise_error("Missing '=' in variable declaration.")
-            else:
-                self.raise_error("Invalid or missing identifier in variable declaration.")
-        else:
+        data = node['data']
+        token = self.current
+        if token['type'] != 'KEYWORD' or token['value'] not in TYPE_KEYWORDS:
             self.raise_error("Unexpected keyword; expected 'entero', 'decimal', 'booleano', or 'cadena'")
+        data['type'] = token['value']
+
+        token = self.next_token()  # Move to IDENTIFIER
+        if token['type'] != 'IDENTIFIER':
+            self.raise_error("Invalid or missing identifier in variable declaration.")
+        data['identifier'] = token['value']
+        self.next_token()  # Move to OPERATOR(=)
+        self.parse_initializer(data)
         return node
-    
+
+    def parse_initializer(self, data):
+        """From the '=' of a variable declaration up to and including its ';'.
+
+        Sets 'value' and 'value_type', the token type of the value, which the AST has carried since
+        node classes needed it to tell a STRING "5" from the NUMBER 5.
+        """
+        token = self.current
+        if token['value'] != '=' or token['type'] != 'OPERATOR':
+            self.raise_error("Missing '=' in variable declaration.")
+
+        token = self.next_token()  # Move to VALUE
+        if token['type'] not in VALUE_TYPES and (token['type'] != 'KEYWORD' or token['value'] not in BOOLEAN_LITERALS):
+            self.raise_error("Invalid or missing value in variable declaration.")
+        data['value'] = token['value']
+        data['value_type'] = token['type']
+
+        token = self.next_token()  # Move to expected semicolon
+        if token['value'] != ';' or token['type'] != 'SIGN':
+            self.raise_error("Missing semicolon in variable declaration.")
+        self.next_token()  # Prepare for the next statement
+
     def parse_condition(self):
+        """`identifier operation comparison`, where 'comparison' is the right operand.
+
+        The AST changed here with the dispatch tables: the parser before them stored the token after
+        the operand, usually ')', as 'comparison'.
+        """
         node = {'type': 'condition', 'data': {}}
-        
-        if self.current_token()['type'] == 'IDENTIFIER':
-            node['data']['identifier'] = self.current_token()['value']
-            self.next_token()
-            if self.current_token()['type'] == 'OPERATOR' and self.current_token()['value'] in ['==', '<=', '>=', '<', '>']:
-                node['data']['operation'] = self.current_token()['value']
-                self.next_token()
-                if (self.current_token()['type'] in ['NUMBER', 'IDENTIFIER']) or (self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['verdadero', 'falso']):
-                    self.next_token()
-                    node['data']['comparison'] = self.current_token()['value']
-                    return node
-                else:
-                    self.raise_error("Missing comparison on the condition.")
-            else:
-                self.raise_error("Missing operator on the condition.")
-        else:
+        data = node['data']
+        token = self.current
+        if token['type'] != 'IDENTIFIER':
             self.raise_error("Missing identifier on the condition.")
+        data['identifier'] = token['value']
+
+        token = self.next_token()
+        if token['type'] != 'OPERATOR' or token['value'] not in COMPARISON_OPERATORS:
+            self.raise_error("Missing operator on the condition.")
+        data['operation'] = token['value']
 
+        token = self.next_token()
+        if token['type'] not in OPERAND_TYPES and (token['type'] != 'KEYWORD' or token['value'] not in BOOLEAN_LITERALS):
+            self.raise_error("Missing comparison on the condition.")
+        data['comparison'] = token['value']
+        self.next_token()
         return node
-    
+
     def parse_statements(self, block_node):
         """Parse statements until a closing brace '}' or end of tokens."""
-        while self.current_token() and (self.current_token()['type'] != 'SIGN' or self.current_token()['value'] != '}'):
-            if self.current_token()['type'] == 'IDENTIFIER':
-                block_node['statements'].append(self.parse_expression())
-            elif self.current_token()['type'] == 'KEYWORD':
-                if self.current_token()['value'] in ['si', 'mientras']:
-                    if self.current_token()['value'] == 'si':
-                        block_node['statements'].append(self.parse_if_statement())
-                    else:
-                        block_node['statements'].append(self.parse_while_loop())
-                elif self.current_token()['value'] in ['entero', 'decimal', 'booleano', 'cadena']:
-                    block_node['statements'].append(self.parse_variable_declaration())
-                else:
-                    self.raise_error(f"Unexpected keyword {self.current_token()['value']} in statement block.")
+        statements = block_node['statements']
+        parse_block_statement = self.parse_block_statement
+        token = self.current
+        while token and (token['value'] != '}' or token['type'] != 'SIGN'):
+            if self.recover:
+                node = self.recover_statement(parse_block_statement, in_block=True)
             else:
-                self.next_token()  # Skip unknown tokens or handle errors
+                node = parse_block_statement()
+            if node is not None:
+                statements.append(node)
+            token = self.current
 
         # After processing all statements, ensure the loop exited because of '}' and not because of a missing brace.
-        if not self.current_token() or self.current_token()['type'] != 'SIGN' or self.current_token()['value'] != '}':
+        if not token:
             self.raise_error("Expected '}' at the end of the block.")
-    
+
+    def parse_block_statement(self):
+        """Parse one statement inside a block, returns None for a skipped token."""
+        token = self.current
+        index = self.current_token_index
+        token_type = token['type']
+        if token_type == 'KEYWORD':
+            handler = self.block_handlers.get(token['value'])
+            if handler is None:
+                self.raise_error(f"Unexpected keyword {token['value']} in statement block.")
+            return self.locate(handler(), token, index)
+        if token_type == 'IDENTIFIER':
+            return self.locate(self.parse_expression(), token, index)
+        self.next_token()  # Skip unknown tokens or handle errors
+        return None
+
+    def open_block(self, error):
+        token = self.current
+        if token['value'] != '{' or token['type'] != 'SIGN':
+            self.raise_error(error)
+        self.next_token()
+
+    def close_block(self, error):
+        token = self.current
+        if not token or token['value'] != '}' or token['type'] != 'SIGN':
+            self.raise_error(error)
+        self.next_token()
+
+    def at_else(self):
+        token = self.current
+        return token and token['value'] == 'sino' and token['type'] == 'KEYWORD'
+
     def parse_if_statement(self):
         node = {'type': 'if_statement', 'if_block': {'statements': []}, 'else_block': {'statements': []}}
+        token = self.current
+        if token['value'] != 'si' or token['type'] != 'KEYWORD':
+            return node
+        self.parse_if_header(node)
+        self.parse_statements(node['if_block'])
+        self.close_block("Expected '}' at the end of if block.")
 
-        if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'si':
-            self.next_token()  # Move past 'si'
-            if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '(':
-                self.next_token()
-                condition = self.parse_condition()
-                node['if_block']['condition'] = condition
-                if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == ')':
-                    self.next_token()
-                    if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'entonces':
-                        self.next_token()
-                        if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '{':
-                            self.next_token()
-                            self.parse_statements(node['if_block'])
-                            if self.current_token() and self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '}':
-                                self.next_token()
-                                # Check for 'sino'
-                                if self.current_token() and self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'sino':
-                                    self.next_token()
-                                    if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '{':
-                                        self.next_token()
-                                        self.parse_statements(node['else_block'])
-                                        if self.current_token() and self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '}':
-                                            self.next_token()
-                                        else:
-                                            self.raise_error("Expected '}' at the end of else block.")
-                                    else:
-                                        self.raise_error("Expected '{' after 'sino'.")
-                                return node
-                            else:
-                                self.raise_error("Expected '}' at the end of if block.")
-                        else:
-                            self.raise_error("Expected '{' after 'entonces'.")
-                    else:
-                        self.raise_error("Expected 'entonces' after condition.")
-                else:
-                    self.raise_error("Expected ')' after condition.")
-            else:
-                self.raise_error("Expected '(' after 'si'.")
+        if self.at_else():
+            self.next_token()
+            self.open_block("Expected '{' after 'sino'.")
+            self.parse_statements(node['else_block'])
+            self.close_block("Expected '}' at the end of else block.")
         return node
 
+    def parse_if_header(self, node):
+        """From 'si' up to and including the '{' opening the if block."""
+        token = self.next_token()  # Move past 'si'
+        if token['value'] != '(' or token['type'] != 'SIGN':
+            self.raise_error("Expected '(' after 'si'.")
+        self.next_token()
+        node['if_block']['condition'] = self.parse_condition()
+
+        token = self.current
+        if token['value'] != ')' or token['type'] != 'SIGN':
+            self.raise_error("Expected ')' after condition.")
+        token = self.next_token()
+        if token['value'] != 'entonces' or token['type'] != 'KEYWORD':
+            self.raise_error("Expected 'entonces' after condition.")
+        self.next_token()
+        self.open_block("Expected '{' after 'entonces'.")
 
     def parse_while_loop(self):
         node = {'type': 'while_loop', 'statements': [], 'data': {}}
-        if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'mientras':
-            self.next_token()
-            if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '(':
-                self.next_token()
-                node['data']['condition'] = self.parse_condition()
-                if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == ')':
-                    self.next_token()
-                    if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] == 'hacer':
-                        self.next_token()
-                        if self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '{':
-                            self.next_token()
-                            self.parse_statements(node)
-                            if self.current_token() and self.current_token()['type'] == 'SIGN' and self.current_token()['value'] == '}':
-                                self.next_token()
-                                return node
-                            else:
-                                self.raise_error("Expected '}' at the end of statements block.")
-                        else:
-                            self.raise_error("Expected '{' after 'hacer'.")
-                    else:
-                        self.raise_error("Expected 'hacer' after condition.")
-                else:
-                    self.raise_error("Expected ')' after condition.")
-            else:
-                self.raise_error("Expected '(' after 'mientras'.")
+        token = self.current
+        if token['value'] != 'mientras' or token['type'] != 'KEYWORD':
+            return node
+        self.parse_while_header(node)
+        self.parse_statements(node)
+        self.close_block("Expected '}' at the end of statements block.")
         return node
-    
+
+    def parse_while_header(self, node):
+        """From 'mientras' up to and including the '{' opening the loop body."""
+        token = self.next_token()
+        if token['value'] != '(' or token['type'] != 'SIGN':
+            self.raise_error("Expected '(' after 'mientras'.")
+        self.next_token()
+        node['data']['condition'] = self.parse_condition()
+
+        token = self.current
+        if token['value'] != ')' or token['type'] != 'SIGN':
+            self.raise_error("Expected ')' after condition.")
+        token = self.next_token()
+        if token['value'] != 'hacer' or token['type'] != 'KEYWORD':
+            self.raise_error("Expected 'hacer' after condition.")
+        self.next_token()
+        self.open_block("Expected '{' after 'hacer'.")
+
     def parse_function_declaration(self):
         node = {'type': 'function_declaration', 'data': {}}
-        if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['entero', 'decimal', 'booleano', 'cadena']:
-            node['data']['return_type'] = self.current_token()['value']
-            self.next_token()  # Move to function name
-            if self.current_token()['type'] == 'IDENTIFIER':
-                node['data']['function_name'] = self.current_token()['value']
-                self.next_token()  # Move to `(`
-
-                if self.current_token()['value'] == '(':
-                    self.next_token()  # Skip `(` and check for parameters or `)`
-                    node['data']['parameters'] = self.parse_parameters()
-                    
-                    if self.current_token()['value'] == ')':
-                        self.next_token()  # Skip `)` and move to `{`
-                        if self.current_token()['value'] == '{':
-                            self.next_token()  # Enter function body
-                            node['statements'] = []
-                            while self.current_token() and self.current_token()['value'] != '}':
-                                self.parse_statements(node)
-                            if self.current_token() and self.current_token()['value'] == '}':
-                                self.next_token()  # Close function body
-                                return node
-                            else:
-                                self.raise_error("Expected '}' at the end of function declaration.")
-                        else:
-                            self.raise_error("Expected '{' after function parameters.")
-                    else:
-                        self.raise_error("Expected ')' after function parameters.")
-                else:
-                    self.raise_error("Expected '(' after function name.")
-            else:
-                self.raise_error("Expected function name identifier after return type.")
+        token = self.current
+        if token['type'] != 'KEYWORD' or token['value'] not in TYPE_KEYWORDS:
+            return node
+        self.parse_function_header(node)
+        token = self.current
+        while token and (token['value'] != '}' or token['type'] != 'SIGN'):
+            self.parse_statements(node)
+            token = self.current
+        if not token:
+            self.raise_error("Expected '}' at the end of function declaration.")
+        self.next_token()  # Close function body
         return node
 
+    def parse_function_header(self, node):
+        """From the return type up to and including the '{' opening the function body."""
+        data = node['data']
+        data['return_type'] = self.current['value']
+
+        token = self.next_token()  # Move to function name
+        if token['type'] != 'IDENTIFIER':
+            self.raise_error("Expected function name identifier after return type.")
+        data['function_name'] = token['value']
+        self.next_token()  # Move to `(`
+        self.parse_signature(node)
+
+    def parse_signature(self, node):
+        """From the '(' after a function name up to and including the '{' opening its body."""
+        data = node['data']
+        if self.current['value'] != '(':
+            self.raise_error("Expected '(' after function name.")
+        self.next_token()  # Skip `(` and check for parameters or `)`
+        data['parameters'] = self.parse_parameters()
+
+        if self.current['value'] != ')':
+            self.raise_error("Expected ')' after function parameters.")
+        token = self.next_token()  # Skip `)` and move to `{`
+        if token['value'] != '{':
+            self.raise_error("Expected '{' after function parameters.")
+        self.next_token()  # Enter function body
+        node['statements'] = []
+
     def parse_parameters(self):
         parameters = []
-        if self.current_token()['value'] != ')':  # Check if there are any parameters
-            while True:
-                if self.current_token()['type'] == 'KEYWORD' and self.current_token()['value'] in ['entero', 'decimal', 'booleano', 'cadena']:
-                    param_type = self.current_token()['value']
-                    self.next_token()
-                    if self.current_token()['type'] == 'IDENTIFIER':
-                        param_name = self.current_token()['value']
-                        parameters.append({'type': param_type, 'name': param_name})
-                        self.next_token()
-                        if self.current_token()['value'] == ',':
-                            self.next_token()  # Move past the comma for the next parameter
-                        elif self.current_token()['value'] == ')':
-                            break  # End of parameters list
-                        else:
-                            self.raise_error("Expected ',' or ')' in parameter list.")
-                    else:
-                        self.raise_error("Expected an identifier for parameter name.")
+        token = self.current
+        if token['value'] == ')':  # No parameters
+            return parameters
+        while True:
+            if token['type'] != 'KEYWORD' or token['value'] not in TYPE_KEYWORDS:
+                self.raise_error("Expected a type keyword in parameters.")
+            param_type = token['value']
+
+            token = self.next_token()
+            if token['type'] != 'IDENTIFIER':
+                self.raise_error("Expected an identifier for parameter name.")
+            parameters.append({'type': param_type, 'name': token['value']})
+
+            token = self.next_token()
+            if token['value'] == ',':
+                token = self.next_token()  # Move past the comma for the next parameter
+            elif token['value'] == ')':
+                return parameters  # End of parameters list
+            else:
+                self.raise_error("Expected ',' or ')' in parameter list.")
+
+
+class OpenBlock:
+    """A compound statement whose block IterativeParser is still filling."""
+
+    __slots__ = ('kind', 'node', 'block', 'start', 'body_start')
+
+    def __init__(self, kind, node, block, start, body_start):
+        self.kind = kind  # 'if', 'else', 'while' or 'function'
+        self.node = node
+        self.block = block  # Dict whose 'statements' receive the parsed statements
+        self.start = start  # Token index where the statement begins
+        self.body_start = body_start  # Token index right after the '{'
+
+
+class IterativeParser(Parser):
+    """Parser that keeps open blocks on an explicit stack instead of recursing into them.
+
+    Produces the same AST and diagnostics as Parser, but nesting depth is only bounded by memory.
+    """
+
+    def parse(self):
+        return self.parse_blocks()
+
+    def parse_with_recovery(self):
+        self.recover = True
+        return self.parse_blocks(), self.diagnostics
+
+    def parse_blocks(self):
+        results = []
+        stack = []
+        while True:
+            token = self.current
+            if not token and not stack:
+                return results
+            start = self.current_token_index
+            failing = None  # Open block an error belongs to, None for the statement starting at `start`
+            try:
+                if not stack:
+                    node = self.open_statement(stack, top_level=True)
+                elif not token:
+                    failing = stack.pop()
+                    if failing.kind == 'function' and start == failing.body_start:
+                        self.raise_error("Expected '}' at the end of function declaration.")
+                    self.raise_error("Expected '}' at the end of the block.")
+                elif token['value'] == '}' and token['type'] == 'SIGN':
+                    failing = stack.pop()
+                    node = self.close_open_block(failing, stack)
                 else:
-                    self.raise_error("Expected a type keyword in parameters.")
-        return parameters
\ No newline at end of file
+                    node = self.open_statement(stack, top_level=False)
+                if node is not None:
+                    (stack[-1].block['statements'] if stack else results).append(node)
+            except SyntaxError as error:
+                if not self.recover:
+                    raise
+                self.report(error)
+                self.synchronize(failing.start if failing else start, in_block=bool(stack))
+
+    def open_statement(self, stack, top_level):
+        """Parse a simple statement, or the header of a compound one which is then pushed on `stack`.
+
+        Returns the finished node, or None when a block was opened or a token skipped.
+        """
+        token = self.current
+        start = self.current_token_index
+        if token['type'] == 'KEYWORD':
+            keyword = token['value']
+            if keyword == 'si':
+                node = {'type': 'if_statement', 'if_block': {'statements': []}, 'else_block': {'statements': []}}
+                self.parse_if_header(node)
+                self.locate(node, token, start)
+                stack.append(OpenBlock('if', node, node['if_block'], start, self.current_token_index))
+                return None
+            if keyword == 'mientras':
+                node = {'type': 'while_loop', 'statements': [], 'data': {}}
+                self.parse_while_header(node)
+                self.locate(node, token, start)
+                stack.append(OpenBlock('while', node, node, start, self.current_token_index))
+                return None
+            if keyword in TYPE_KEYWORDS:
+                following = self.peek_token()
+                if top_level and following and following['type'] == 'IDENTIFIER':
+                    following = self.peek_next_token()
+                    if following and following['value'] == '(':
+                        node = {'type': 'function_declaration', 'data': {}}
+                        self.parse_function_header(node)
+                        self.locate(node, token, start)
+                        stack.append(OpenBlock('function', node, node, start, self.current_token_index))
+                        return None
+                return self.locate(self.parse_variable_declaration(), token, start)
+        elif token['type'] == 'IDENTIFIER':
+            return self.locate(self.parse_expression(), token, start)
+
+        if top_level:
+            self.raise_error(f"Unexpected token {token['value']}")
+        if token['type'] == 'KEYWORD':
+            self.raise_error(f"Unexpected keyword {token['value']} in statement block.")
+        self.next_token()  # Skip unknown tokens or handle errors
+        return None
+
+    def close_open_block(self, block, stack):
+        """Consume the '}' of `block`, returns its node unless a 'sino' block follows."""
+        self.next_token()
+        if block.kind == 'if' and self.at_else():
+            self.next_token()
+            self.open_block("Expected '{' after 'sino'.")
+            block.kind = 'else'
+            block.block = block.node['else_block']
+            stack.append(block)
+            return None
+        return block.node
@@ -0,0 +1,78 @@
+import re
+import sys
+from array import array
+from bisect import bisect_right
+from operator import methodcaller
+
+NEWLINE = re.compile('\n')
+BYTE_NEWLINE = re.compile(b'\n')
+NON_ASCII_BYTE = re.compile(b'[\x80-\xff]')
+
+
+class LineIndex:
+    """Offset of the first character of every line of a text, found in one pass that copies nothing.
+
+    Scanners only record offsets; lines and columns (both from 1) are looked up here by binary
+    search when someone asks for them. Lookups mostly come in text order, so the line of the last
+    one is tried before searching.
+
+    `line` and `line_start` place a chunk of a longer text: its first line has that number and
+    starts at that offset, which is negative when the line began in an earlier chunk.
+
+    UTF-8 bytes (bytes, an mmap or a memoryview) can be indexed as well, offsets and columns then
+    count bytes.
+    """
+
+    def __init__(self, text, line=1, line_start=0):
+        self.first_line = line
+        # Every newline starts a line after it; splitting the text would copy all of it
+        self.starts = array('q', [line_start])
+        if isinstance(text, str):
+            self.starts.extend(map(methodcaller('end'), NEWLINE.finditer(text)))
+            self.ascii = text.isascii()
+        else:
+            self.starts.extend(map(methodcaller('end'), BYTE_NEWLINE.finditer(text)))
+            self.ascii = NON_ASCII_BYTE.search(text) is None
+        self.last = (line_start, self.end_of(0), line)  # (start, end, number) of the last line found
+
+    def __len__(self):
+        return len(self.starts)
+
+    def end_of(self, index):
+        # Start of the following line, past any offset for the last one
+        return self.starts[index + 1] if index + 1 < len(self.starts) else sys.maxsize
+
+    def position(self, offset):
+        """(line, column) of the character at `offset`."""
+        start, end, line = self.last
+        if not start <= offset < end:
+            index = max(bisect_right(self.starts, offset) - 1, 0)
+            start, end, line = self.last = (self.starts[index], self.end_of(index), self.first_line + index)
+        return line, offset - start + 1
+
+    def line(self, offset):
+        return self.position(offset)[0]
+
+    def line_start(self, line):
+        """Offset of the first character of `line`."""
+        return self.starts[line - self.first_line]
+
+    def offset(self, line, column):
+        """Offset of the character at (line, column), the inverse of `position`."""
+        return self.line_start(line) + column - 1
+
+    def positions(self, offsets):
+        """(lines, columns) arrays of ascending `offsets`, in one walk along the lines."""
+        lines = array('i')
+        columns = array('i')
+        add_line = lines.append
+        add_column = columns.append
+        starts = self.starts
+        start, end, line = self.last
+        for offset in offsets:
+            if not start <= offset < end:
+                index = max(bisect_right(starts, offset) - 1, 0)
+                start, end, line = starts[index], self.end_of(index), self.first_line + index
+            add_line(line)
+            add_column(offset - start + 1)
+        return lines, columns
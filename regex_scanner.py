@@ -0,0 +1,160 @@
+import re
+
+from literals import UNTERMINATED_STRING
+from positions import LineIndex
+from tokens import key_words, operators, signs, TokenBuffer, TYPE_IDS, IDENTIFIER_ID, KEYWORD_ID
+
+CLASS_NAMES = re.compile(r'\{(letter|digit|word)\}')
+
+
+class TokenSpec:
+    """One token class of the master pattern, earlier specs win when two match at the same place.
+
+    `pattern` is a regular expression without capturing groups, where '{letter}', '{digit}' and
+    '{word}' stand for the scanner's character classes (str.isalpha or '_', str.isdigit, str.isalnum
+    or '_'). `token_type` is one of tokens.TOKEN_TYPES, None for text that is skipped; an 'ERROR'
+    match is reported with `message` when given.
+    """
+    __slots__ = ('name', 'pattern', 'token_type', 'message')
+
+    def __init__(self, name, pattern, token_type=None, message=None):
+        self.name = name
+        self.pattern = pattern
+        self.token_type = token_type
+        self.message = message
+
+    def __repr__(self):
+        return f"TokenSpec({self.name!r}, {self.pattern!r}, {self.token_type!r})"
+
+
+def alternation(symbols):
+    # Longest first, so '<=' is tried before '<'; single characters share one class, which re
+    # matches faster than one branch each
+    symbols = sorted(dict.fromkeys(symbols), key=len, reverse=True)
+    branches = [re.escape(symbol) for symbol in symbols if len(symbol) > 1]
+    singles = ''.join(re.escape(symbol) for symbol in symbols if len(symbol) == 1)
+    if singles:
+        branches.append(f'[{singles}]')
+    return '|'.join(branches)
+
+
+# The tokens of Lexer. Comments or decimals are one more spec, e.g. TokenSpec('COMMENT', r'//[^\n]*')
+# or TokenSpec('DECIMAL', r'{digit}+\.{digit}+', 'NUMBER') before NUMBER
+TOKEN_SPECS = [
+    TokenSpec('WHITESPACE', r'\s+'),
+    TokenSpec('IDENTIFIER', r'{letter}{word}*', 'IDENTIFIER'),
+    TokenSpec('NUMBER', r'{digit}+', 'NUMBER'),
+    TokenSpec('STRING', r'"[^"\\]*(?:\\.[^"\\]*)*"', 'STRING'),
+    TokenSpec('UNTERMINATED', r'"', 'ERROR', message=UNTERMINATED_STRING),
+    TokenSpec('OPERATOR', alternation(operators), 'OPERATOR'),
+    TokenSpec('SIGN', alternation(sign for sign in signs if sign != '"'), 'SIGN'),
+    TokenSpec('ERROR', r'.', 'ERROR'),
+]
+
+
+def unicode_classes():
+    """Character classes matching the scanner's on any text.
+
+    re's \\d only has decimal digits and \\w has every numeric character, so the digits that are not
+    decimal ('²') and the numeric characters that are neither digits nor letters ('½') are listed.
+    """
+    numeric = ''.join(filter(str.isnumeric, map(chr, range(128, 0x110000))))
+    digits = ''.join(char for char in numeric if char.isdigit() and not char.isdecimal() and not char.isalpha())
+    others = ''.join(char for char in numeric if not char.isdigit() and not char.isalpha())
+    return {'letter': f'[^\\W\\d{digits}{others}]', 'digit': f'[\\d{digits}]', 'word': r'\w'}
+
+
+# On ASCII text re's classes and the str predicates agree
+ASCII_CLASSES = {'letter': r'[^\W\d]', 'digit': r'\d', 'word': r'\w'}
+
+
+class PatternTables:
+    """Master pattern of a list of TokenSpec, one named group per spec."""
+
+    def __init__(self, specs, keywords):
+        self.specs = specs
+        self.keywords = frozenset(keywords)
+        # Indexed by group number, group 0 is the whole match: (type id or None, message)
+        self.actions = [None] + [(TYPE_IDS[spec.token_type] if spec.token_type is not None else None,
+                                  spec.message) for spec in specs]
+        # Type id of the groups stored as they are, -1 for skipped text and errors
+        self.plain = [-1] + [TYPE_IDS[spec.token_type] if spec.token_type not in (None, 'ERROR') else -1
+                             for spec in specs]
+        self.ascii_pattern = self.compile(ASCII_CLASSES)
+        self.unicode_pattern = None  # Listing the non-ASCII classes takes a while, done on first use
+
+    def compile(self, classes):
+        # Whitespace before a token is part of its match, which saves a match per token
+        groups = '|'.join(f'(?P<{spec.name}>{CLASS_NAMES.sub(lambda match: classes[match.group(1)], spec.pattern)})'
+                          for spec in self.specs)
+        pattern = re.compile(r'\s*(?:' + groups + ')', re.DOTALL)
+        if pattern.groups != len(self.specs):
+            raise ValueError("Token spec patterns may not have capturing groups")
+        return pattern
+
+    def pattern(self, text):
+        if text.isascii():
+            return self.ascii_pattern
+        if self.unicode_pattern is None:
+            self.unicode_pattern = self.compile(unicode_classes())
+        return self.unicode_pattern
+
+
+TABLES = PatternTables(TOKEN_SPECS, key_words)
+
+
+class RegexScanner:
+    """Scanner producing the same tokens as scanner.Scanner from one regex master pattern.
+
+    re does the matching in C; the loop only files the offsets of each match by the number of its
+    group and looks identifiers up in the keyword set. Lines and columns come from `line_index`.
+    """
+
+    def __init__(self, text, tables=TABLES):
+        self.text = text
+        self.tables = tables
+        self.tokens = TokenBuffer(text)
+        self.errors = []
+        self.position = 0
+        self.line = 1
+        self.line_start = 0
+        self.line_index = None  # LineIndex of the text from `line` and `line_start`, built by scan
+
+    def scan(self):
+        text = self.text
+        actions = self.tables.actions
+        plain = self.tables.plain
+        keywords = self.tables.keywords
+        kinds = self.tokens.kinds.append
+        starts = self.tokens.starts.append
+        lengths = self.tokens.lengths.append
+        errors = self.errors
+        error_id = TYPE_IDS['ERROR']
+        self.line_index = self.tokens.source_lines = LineIndex(text, self.line, self.line_start)
+        locate = self.line_index.position
+
+        for match in self.tables.pattern(text).finditer(text, self.position):
+            group = match.lastindex
+            start, position = match.span(group)
+            type_id = plain[group]
+            if type_id >= 0:
+                if type_id == IDENTIFIER_ID and text[start:position].lower() in keywords:
+                    type_id = KEYWORD_ID
+                kinds(type_id)
+                starts(start)
+                lengths(position - start)
+                continue
+
+            # Skipped text and errors
+            type_id, message = actions[group]
+            if type_id == error_id:
+                line, column = locate(start)
+                error = {'type': 'ERROR', 'value': match.group(group), 'line': line, 'column': column}
+                if message is not None:
+                    error['message'] = message
+                errors.append(error)
+
+        self.position = len(text)
+        self.line = self.line_index.line(self.position)
+        self.line_start = self.line_index.line_start(self.line)
+        return self.tokens, errors
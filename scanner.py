@@ -0,0 +1,228 @@
+from array import array
+
+from literals import UNTERMINATED_STRING, find_string_end
+from positions import LineIndex
+from tokens import key_words, operators, signs, TokenBuffer, TYPE_IDS, IDENTIFIER_ID, KEYWORD_ID, STRING_ID
+
+# Character classes shared by every state of the DFA
+OTHER = 0
+SPACE = 1
+NEWLINE = 2
+LETTER = 3       # ASCII/unicode letters and '_'
+DIGIT = 4
+QUOTE = 5
+ALNUM_OTHER = 6  # Alphanumeric but neither letter nor digit (e.g. '½'), only valid inside identifiers
+FIRST_PUNCT_CLASS = 7
+
+# Fixed states, operator/sign states are appended when the table is built
+DEAD = 0
+START = 1
+IDENT = 2
+NUMBER = 3
+STRING = 4
+ERROR = 5
+WHITESPACE = 6
+
+
+def classify_char(char):
+    """Character class of a non-ASCII character, following the str predicates used by Lexer."""
+    if char.isspace():
+        return SPACE
+    if char.isalpha():
+        return LETTER
+    if char.isdigit():
+        return DIGIT
+    if char.isalnum():
+        return ALNUM_OTHER
+    return OTHER
+
+
+class CharClassMap(dict):
+    """str.translate table turning every character into its class, non-ASCII classes are cached on first use."""
+
+    def __init__(self, char_class):
+        super().__init__((code, chr(cls)) for code, cls in enumerate(char_class))
+
+    def __missing__(self, code):
+        result = self[code] = chr(classify_char(chr(code)))
+        return result
+
+
+class ScannerTables:
+    def __init__(self, operators, signs):
+        punctuation = []
+        for symbol in operators + signs:
+            for char in symbol:
+                if char not in punctuation and char != '"':
+                    punctuation.append(char)
+
+        self.class_count = FIRST_PUNCT_CLASS + len(punctuation)
+
+        # ASCII character -> class
+        self.char_class = bytearray(128)
+        for code in range(128):
+            self.char_class[code] = classify_char(chr(code))
+        self.char_class[ord('\n')] = NEWLINE
+        self.char_class[ord('_')] = LETTER
+        self.char_class[ord('"')] = QUOTE
+        for index, char in enumerate(punctuation):
+            self.char_class[ord(char)] = FIRST_PUNCT_CLASS + index
+
+        self.accept = [None, None, 'IDENTIFIER', 'NUMBER', 'STRING', 'ERROR', None]
+        self.transitions = array('B', bytes(len(self.accept) * self.class_count))
+
+        for cls in range(self.class_count):
+            self.set(START, cls, ERROR)
+        self.set(START, SPACE, WHITESPACE)
+        self.set(START, NEWLINE, WHITESPACE)
+        self.set(WHITESPACE, SPACE, WHITESPACE)
+        self.set(WHITESPACE, NEWLINE, WHITESPACE)
+        self.set(START, LETTER, IDENT)
+        for cls in (LETTER, DIGIT, ALNUM_OTHER):
+            self.set(IDENT, cls, IDENT)
+        self.set(START, DIGIT, NUMBER)
+        self.set(NUMBER, DIGIT, NUMBER)
+        self.set(START, QUOTE, STRING)
+
+        # Operators become a trie of states so the longest operator always wins
+        for operator in operators:
+            state = START
+            for char in operator:
+                cls = self.char_class[ord(char)]
+                target = self.transitions[state * self.class_count + cls]
+                if target in (DEAD, ERROR):
+                    target = self.add_state(None)
+                    self.set(state, cls, target)
+                state = target
+            self.accept[state] = 'OPERATOR'
+
+        for sign in signs:
+            if sign == '"':
+                continue  # Quotes open string literals
+            cls = self.char_class[ord(sign)]
+            if self.transitions[START * self.class_count + cls] == ERROR:
+                self.set(START, cls, self.add_state('SIGN'))
+
+        # Per-state rows of the dense table for the scanning loop
+        self.rows = [bytes(self.transitions[state * self.class_count:(state + 1) * self.class_count])
+                     for state in range(len(self.accept))]
+        self.translation = CharClassMap(self.char_class)
+        self.accept_ids = [TYPE_IDS.get(token_type, -1) for token_type in self.accept]
+
+    def add_state(self, token_type):
+        self.accept.append(token_type)
+        self.transitions.extend(bytes(self.class_count))
+        if len(self.accept) > 255:
+            raise ValueError("Too many scanner states for a byte transition table")
+        return len(self.accept) - 1
+
+    def set(self, state, cls, target):
+        self.transitions[state * self.class_count + cls] = target
+
+
+TABLES = ScannerTables(operators, signs)
+
+
+class Scanner:
+    """Table-driven scanner producing the same tokens as Lexer.tokenize_in_order_charwise,
+    stored in a columnar TokenBuffer.
+
+    The loop only records offsets; lines and columns are looked up in `line_index` afterwards.
+    """
+
+    def __init__(self, text, tables=TABLES):
+        self.text = text
+        self.tables = tables
+        self.tokens = TokenBuffer(text)
+        self.errors = []
+        self.position = 0
+        self.line = 1
+        self.line_start = 0  # Offset of the first character of the current line
+        self.line_index = None  # LineIndex of the text from `line` and `line_start`, built on the first scan
+        self.classes = None  # Class byte of every character, computed on the first scan
+
+    def scan(self, final=True, end=None):
+        """Scan the text, when `final` is False a token touching the end of the text is left unscanned
+        so more input can complete it, `self.position` then points at its first character.
+
+        With `end` only the text before it is scanned (as if not final), a later call continues from
+        `self.position`; this lets callers scan a long text in steps.
+        """
+        text = self.text
+        if self.classes is None:
+            # One bulk pass maps every character to its class byte
+            self.classes = text.translate(self.tables.translation).encode('latin-1')
+            self.line_index = self.tokens.source_lines = LineIndex(text, self.line, self.line_start)
+        classes = self.classes
+        length = len(classes)
+        if end is not None and end < length:
+            length = end
+            final = False
+        rows = self.tables.rows
+        start_row = rows[START]
+        accept_ids = self.tables.accept_ids
+        error_id = TYPE_IDS['ERROR']
+        kinds = self.tokens.kinds.append
+        starts = self.tokens.starts.append
+        lengths = self.tokens.lengths.append
+        errors = self.errors
+        locate = self.line_index.position
+        keywords = frozenset(key_words)
+        position = self.position
+
+        while position < length:
+            start = position
+            state = start_row[classes[position]]
+            position += 1
+
+            if state == STRING:
+                end = find_string_end(text, position, length)
+                if end == -1:
+                    if not final:
+                        position = start
+                        break
+                    # Report where the literal opened and go on lexing after the quote
+                    line, column = locate(start)
+                    errors.append({'type': 'ERROR', 'value': '"', 'line': line, 'column': column,
+                                   'message': UNTERMINATED_STRING})
+                    continue
+                kinds(STRING_ID)
+                starts(start)
+                lengths(end + 1 - start)
+                position = end + 1
+                continue
+
+            # Follow the table until no transition is left
+            row = rows[state]
+            while position < length:
+                target = row[classes[position]]
+                if not target:
+                    break
+                if target != state:
+                    state = target
+                    row = rows[state]
+                position += 1
+
+            if position == length and not final:
+                position = start
+                break
+
+            if state == WHITESPACE:
+                continue
+
+            type_id = accept_ids[state]
+            if type_id == error_id:
+                line, column = locate(start)
+                errors.append({'type': 'ERROR', 'value': text[start], 'line': line, 'column': column})
+                continue
+
+            if type_id == IDENTIFIER_ID and text[start:position].lower() in keywords:
+                type_id = KEYWORD_ID
+            kinds(type_id)
+            starts(start)
+            lengths(position - start)
+
+        self.position = position
+        self.line = self.line_index.line(position)
+        self.line_start = self.line_index.line_start(self.line)
+        return self.tokens, errors
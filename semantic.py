@@ -0,0 +1,166 @@
+from nodes import NodeVisitor, build_program
+
+NUMERIC_TYPES = ('entero', 'decimal')
+ORDERED_TYPES = ('entero', 'decimal', 'cadena')  # Types '<', '<=', '>=' and '>' compare
+
+
+class Symbol:
+    __slots__ = ('name', 'type_name', 'kind')
+
+    def __init__(self, name, type_name, kind):
+        self.name = name
+        self.type_name = type_name  # Declared type, the return type of a function
+        self.kind = kind            # 'variable', 'parameter', 'function' or 'undeclared'
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.type_name!r}, {self.kind!r})"
+
+
+class SymbolTable:
+    """Symbols of one scope in a dict, chained to the enclosing scope."""
+
+    def __init__(self, parent=None):
+        self.symbols = {}
+        self.parent = parent
+
+    def define(self, symbol):
+        """Add `symbol`, replacing a symbol of the same name in this scope like a redeclaration at runtime."""
+        self.symbols[symbol.name] = symbol
+
+    def lookup(self, name):
+        table = self
+        while table is not None:
+            symbol = table.symbols.get(name)
+            if symbol is not None:
+                return symbol
+            table = table.parent
+        return None
+
+
+def assignable(target, value):
+    """Whether a value of type `value` may be stored in a variable of type `target`."""
+    return target == value or (target in NUMERIC_TYPES and value in NUMERIC_TYPES)
+
+
+class SemanticAnalyzer(NodeVisitor):
+    """Checks declarations and types of a program of node classes in one pass.
+
+    Scoping follows Interpreter: blocks share the program's variables, so a variable declared in a
+    block is known after it, and a declaration, in a block or not, replaces the variable's type from
+    there on. Functions have names of their own. Function bodies, which never run, are checked in a
+    scope of their own with their parameters and the variables declared before them. Diagnostics
+    have the layout of Parser's, with 'type' SEMANTIC_ERROR and the position of the statement.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.globals = SymbolTable()
+        self.scope = self.globals
+        self.functions = {}
+        self.position = (None, None)  # (line, column) of the statement being checked
+        self.diagnostics = []
+
+    def analyze(self, program):
+        self.block(program)
+        return self.diagnostics
+
+    def report(self, message, value):
+        line, column = self.position
+        self.diagnostics.append({'type': 'SEMANTIC_ERROR', 'message': message, 'value': value,
+                                 'line': line, 'column': column})
+
+    def define(self, name, type_name, kind):
+        self.scope.define(Symbol(name, type_name, kind))
+
+    def block(self, statements):
+        for statement in statements:
+            self.position = (statement.line, statement.column)
+            self.visit(statement)
+
+    def variable_type(self, name):
+        """Type of a variable read or assigned, None (after reporting) if it is not declared."""
+        symbol = self.scope.lookup(name)
+        if symbol is None:
+            self.report(f"Variable '{name}' is not declared.", name)
+            # Reported once per scope, later uses find this placeholder
+            self.scope.define(Symbol(name, None, 'undeclared'))
+            return None
+        return symbol.type_name
+
+    def check_store(self, name, target, value):
+        if target is not None and value is not None and not assignable(target, value):
+            self.report(f"Cannot store {value} in {target} variable '{name}'.", name)
+
+    # Statements
+
+    def visit_VariableDeclaration(self, node):
+        value = self.visit(node.value)
+        self.check_store(node.identifier, node.type_name, value)
+        self.define(node.identifier, node.type_name, 'variable')
+
+    def visit_Assignment(self, node):
+        value = self.visit(node.expression)
+        self.check_store(node.identifier, self.variable_type(node.identifier), value)
+
+    def visit_If(self, node):
+        self.visit(node.condition)
+        self.block(node.body)
+        self.block(node.orelse)
+
+    def visit_While(self, node):
+        self.visit(node.condition)
+        self.block(node.body)
+
+    def visit_FunctionDeclaration(self, node):
+        self.functions[node.name] = Symbol(node.name, node.return_type, 'function')
+        self.scope = SymbolTable(self.scope)
+        try:
+            for parameter in node.parameters:
+                self.define(parameter.name, parameter.type_name, 'parameter')
+            self.block(node.body)
+        finally:
+            self.scope = self.scope.parent
+
+    # Expressions return their type, None when an error already made it unknown
+
+    def visit_BinaryOp(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if left is None or right is None:
+            return None
+        if left in NUMERIC_TYPES and right in NUMERIC_TYPES:
+            return 'entero' if left == right == 'entero' and node.operator != '/' else 'decimal'
+        if node.operator == '+' and left == right == 'cadena':
+            return 'cadena'
+        self.report(f"Operator '{node.operator}' does not apply to {left} and {right}.", node.operator)
+        return None
+
+    def visit_Comparison(self, node):
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if left is None or right is None:
+            return 'booleano'
+        if node.operator == '==':
+            compatible = assignable(left, right)
+        else:
+            compatible = left in ORDERED_TYPES and right in ORDERED_TYPES and assignable(left, right)
+        if not compatible:
+            self.report(f"Cannot compare {left} and {right} with '{node.operator}'.", node.operator)
+        return 'booleano'
+
+    def visit_Name(self, node):
+        return self.variable_type(node.identifier)
+
+    def visit_Number(self, node):
+        return 'entero' if isinstance(node.value, int) else 'decimal'
+
+    def visit_String(self, node):
+        return 'cadena'
+
+    def visit_Boolean(self, node):
+        return 'booleano'
+
+
+def check(ast):
+    """Semantic diagnostics of the dict AST returned by Parser.parse / parse_with_recovery."""
+    return SemanticAnalyzer().analyze(build_program(ast))
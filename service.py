@@ -0,0 +1,286 @@
+"""Analysis service: JSON lines over TCP or a Unix socket, lexing and parsing in a process pool.
+
+    python service.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--workers N]
+
+A request is one line {"id": ..., "text": ..., "tokens": true, "ast": true, "check": false} and gets
+one line back with the same id: {"id", "tokens", "errors", "ast", "diagnostics"}, or {"id", "error"}
+when the request cannot be analyzed. Responses to pipelined requests may come back in any order.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import analyze
+from semantic import check as check_semantics
+
+DEFAULT_PORT = 8765
+QUEUE_SIZE = 64             # Batches waiting for a worker before clients stop being read
+BATCH_SIZE = 16             # Small requests of one client sent to a worker together
+BATCH_DELAY = 0.002         # Seconds a small request may wait for others to join its batch
+SMALL_REQUEST = 16 * 1024   # Requests up to this many bytes are batched, bigger ones go alone
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+def encode(response):
+    return json.dumps(response, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def analyze_request(request):
+    analysis = analyze(request['text'])
+    response = {'id': request.get('id')}
+    if request.get('tokens', True):
+        response['tokens'] = analysis.tokens.to_dicts()
+    response['errors'] = analysis.lex_errors
+    if request.get('ast', True):
+        response['ast'] = analysis.ast
+    diagnostics = analysis.diagnostics
+    if request.get('check'):
+        diagnostics = diagnostics + check_semantics(analysis.ast)
+    response['diagnostics'] = diagnostics
+    return response
+
+
+def analyze_batch(requests):
+    """Response lines of a batch of requests, run in a worker process.
+
+    The responses are encoded here, so the server process only copies bytes to the sockets.
+    """
+    lines = []
+    for request in requests:
+        try:
+            lines.append(encode(analyze_request(request)))
+        except Exception as error:  # e.g. RecursionError on absurdly nested input, the rest of the batch goes on
+            lines.append(encode({'id': request.get('id'), 'error': f"{type(error).__name__}: {error}"}))
+    return lines
+
+
+class Connection:
+    """One client: writes its response lines and counts the requests it still waits for."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.waiting = 0
+        self.done = asyncio.Event()
+        self.done.set()
+
+    def expect(self, count):
+        self.waiting += count
+        self.done.clear()
+
+    async def send(self, lines):
+        self.writer.writelines(lines)
+        self.waiting -= len(lines)
+        if not self.waiting:
+            self.done.set()
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass  # The client left, its responses are dropped
+
+
+class AnalysisServer:
+    """Reads requests from every client into one bounded queue of batches served by a process pool.
+
+    There is one dispatcher per worker process, so at most `workers` batches are being analyzed and
+    `queue_size` more wait. When the queue is full, clients are no longer read until it drains,
+    which pushes back on them through the socket. While every worker is busy, small requests that a
+    client sends close together are grouped into one batch, which saves a round trip to a worker
+    per request.
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, batch_delay=BATCH_DELAY,
+                 small_request=SMALL_REQUEST):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.small_request = small_request
+        self.pool = None
+        self.queue = None
+        self.dispatchers = []
+        self.idle = 0  # Dispatchers waiting for a batch
+        self.requests = 0
+        self.batches = 0
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        """Start the pool and listen, on the Unix socket `path` when given. Returns the asyncio server."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.queue = asyncio.Queue(self.queue_size)
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path, limit=LINE_LIMIT)
+        return await asyncio.start_server(self.handle_client, host, port, limit=LINE_LIMIT)
+
+    async def stop(self):
+        await self.queue.join()
+        for dispatcher in self.dispatchers:
+            dispatcher.cancel()
+        self.pool.shutdown()
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self.idle += 1
+            try:
+                requests, connection = await self.queue.get()
+            finally:
+                self.idle -= 1
+            try:
+                lines = await loop.run_in_executor(self.pool, analyze_batch, requests)
+            except Exception as error:  # The worker died, e.g. BrokenProcessPool
+                lines = [encode({'id': request.get('id'), 'error': f"{type(error).__name__}: {error}"})
+                         for request in requests]
+            await connection.send(lines)
+            self.queue.task_done()
+
+    async def submit(self, requests, connection):
+        if not requests:
+            return
+        connection.expect(len(requests))
+        self.requests += len(requests)
+        self.batches += 1
+        await self.queue.put((requests, connection))  # Waits while the queue is full
+
+    async def handle_client(self, reader, writer):
+        connection = Connection(writer)
+        batch = []
+        deadline = None  # When the oldest request of `batch` must be sent
+        try:
+            while True:
+                try:
+                    if batch:
+                        line = await asyncio.wait_for(reader.readline(), max(0.0, deadline - time.monotonic()))
+                    else:
+                        line = await reader.readline()
+                except asyncio.TimeoutError:
+                    await self.submit(batch, connection)
+                    batch = []
+                    continue
+                if not line:
+                    break
+                request = self.decode(line)
+                if request is None:
+                    connection.expect(1)
+                    await connection.send([encode({'id': None, 'error': "Expected a JSON object with a 'text' string"})])
+                    continue
+                if len(line) > self.small_request:
+                    await self.submit([request], connection)
+                    continue
+                if not batch:
+                    deadline = time.monotonic() + self.batch_delay
+                batch.append(request)
+                # Batching only pays while the workers are busy, an idle one takes the request now
+                if len(batch) >= self.batch_size or (self.idle and self.queue.empty()):
+                    await self.submit(batch, connection)
+                    batch = []
+        except (ValueError, ConnectionError):
+            pass  # A line over LINE_LIMIT or a reset connection ends the session
+        await self.submit(batch, connection)
+        await connection.done.wait()
+        writer.close()
+
+    def decode(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(request, dict) or not isinstance(request.get('text'), str):
+            return None
+        return request
+
+
+class ServiceClient:
+    """asyncio client of the service; requests can be pipelined, each awaits its own response."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}  # Request id -> future of its response
+        self.receiver = asyncio.create_task(self.receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.waiting.pop(response.get('id'), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("The service closed the connection"))
+        self.waiting.clear()
+
+    async def analyze(self, text, **options):
+        """Response of the service for `text`; options are the request flags 'tokens', 'ast' and 'check'."""
+        self.next_id += 1
+        request_id = self.next_id
+        future = self.waiting[request_id] = asyncio.get_running_loop().create_future()
+        self.writer.write(encode({'id': request_id, 'text': text, **options}))
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await self.receiver
+
+
+async def serve(arguments):
+    server = AnalysisServer(arguments.workers, arguments.queue_size, arguments.batch_size,
+                            arguments.batch_delay / 1000, arguments.small_request)
+    listener = await server.start(arguments.host, arguments.port, arguments.unix)
+    address = arguments.unix or '%s:%d' % listener.sockets[0].getsockname()[:2]
+    print(f"listening on {address}", flush=True)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C still interrupts asyncio.run
+    await stopping.wait()
+
+    listener.close()
+    await listener.wait_closed()
+    await server.stop()
+    print(f"{server.requests} requests in {server.batches} batches", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument('--host', default='127.0.0.1')
+    argument_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP port, 0 picks a free one")
+    argument_parser.add_argument('--unix', metavar='PATH', help="Listen on a Unix socket instead of TCP")
+    argument_parser.add_argument('-j', '--workers', type=int, default=None,
+                                 help="Worker processes (default: one per CPU)")
+    argument_parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                                 help="Batches waiting for a worker before clients stop being read")
+    argument_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                                 help="Most small requests of a client analyzed together")
+    argument_parser.add_argument('--batch-delay', type=float, default=BATCH_DELAY * 1000,
+                                 help="Milliseconds a small request waits for others to join its batch")
+    argument_parser.add_argument('--small-request', type=int, default=SMALL_REQUEST,
+                                 help="Requests up to this many bytes are batched")
+    arguments = argument_parser.parse_args(argv)
+    return asyncio.run(serve(arguments))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
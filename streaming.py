@@ -0,0 +1,90 @@
+from scanner import Scanner
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield text chunks from a file object (anything with `read`) or an iterable of strings."""
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+class StreamingLexer:
+    """Lexes chunked input lazily, yielding the same tokens as Lexer.tokenize_in_order.
+
+    Only the unfinished tail of the previous chunk is kept between reads, so memory stays
+    bounded by the chunk size plus the longest token. Lexical errors are collected in `errors`.
+    """
+
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.errors = []
+        self.line = 1
+        self.line_start = 0
+
+    def tokens(self):
+        pending = ''
+        for chunk in read_chunks(self.source, self.chunk_size):
+            if pending.startswith('"') and '"' not in chunk:
+                # Still inside the same string literal, no need to rescan it
+                pending += chunk
+                continue
+            pending += chunk
+            scanner = self.scan(pending, final=False)
+            yield from scanner.tokens.to_dicts()
+            pending = pending[scanner.position:]
+            # Line starts are relative to the buffer, shift them along with it
+            self.line_start -= scanner.position
+
+        scanner = self.scan(pending, final=True)
+        yield from scanner.tokens.to_dicts()
+
+    def scan(self, text, final):
+        scanner = Scanner(text)
+        scanner.line = self.line
+        scanner.line_start = self.line_start
+        scanner.scan(final)
+        self.errors.extend(scanner.errors)
+        self.line = scanner.line
+        self.line_start = scanner.line_start
+        return scanner
+
+    def __iter__(self):
+        return self.tokens()
+
+
+class TokenWindow:
+    """Index access over a token iterator for Parser, keeping only a small window of recent tokens."""
+
+    def __init__(self, tokens, keep=16):
+        self.iterator = iter(tokens)
+        self.buffer = []
+        self.base = 0  # Index of buffer[0] in the whole token stream
+        self.keep = keep
+        self.exhausted = False
+
+    def get(self, index):
+        if index < self.base:
+            raise IndexError(f"Token {index} was already released from the stream window")
+        while index >= self.base + len(self.buffer):
+            if self.exhausted:
+                return None
+            token = next(self.iterator, None)
+            if token is None:
+                self.exhausted = True
+                return None
+            self.buffer.append(token)
+        released = index - self.base - self.keep
+        if released > self.keep:
+            del self.buffer[:released]
+            self.base += released
+        return self.buffer[index - self.base]
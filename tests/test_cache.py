@@ -0,0 +1,50 @@
+import marshal
+import os
+
+import pytest
+
+from cache import MAGIC, AnalysisCache, analyze
+from benchmarks.programs import generate_program
+
+TEXT = generate_program(10, seed=4)
+
+
+def entry_path(cache):
+    return cache.path(cache.key(TEXT))
+
+
+def test_hit_returns_the_stored_analysis(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    stored = analyze(TEXT, cache)
+    loaded = analyze(TEXT, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert loaded.tokens.to_dicts() == stored.tokens.to_dicts()
+    assert (loaded.lex_errors, loaded.ast, loaded.diagnostics) == (stored.lex_errors, stored.ast, stored.diagnostics)
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda blob: blob[:len(blob) // 2],
+    lambda blob: blob[:3],
+    lambda blob: b'XXXX' + blob[4:],
+    lambda blob: MAGIC + b'\xff' * 20,
+    lambda blob: MAGIC + marshal.dumps(42),
+    lambda blob: MAGIC + marshal.dumps((1, 2)),
+    lambda blob: MAGIC + marshal.dumps(([b'\x00'], [], [], [])),
+    lambda blob: MAGIC + marshal.dumps(([b'\x00', b'', b''], [], [], [])),
+], ids=['truncated', 'no magic', 'bad magic', 'garbage', 'not a tuple', 'short tuple', 'missing columns',
+        'uneven columns'])
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path, corrupt):
+    cache = AnalysisCache(str(tmp_path))
+    expected = analyze(TEXT, cache)
+    path = entry_path(cache)
+    with open(path, 'rb') as file:
+        blob = file.read()
+    with open(path, 'wb') as file:
+        file.write(corrupt(blob))
+
+    assert cache.get(TEXT) is None
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert not os.path.exists(path)
+    # The next analysis stores a good entry again
+    assert analyze(TEXT, cache).ast == expected.ast
+    assert cache.get(TEXT) is not None
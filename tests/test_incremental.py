@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from incremental import IncrementalDocument
+from lexer import Lexer
+from parse import Parser
+from benchmarks.programs import generate_program
+
+# Edits favour quotes and backslashes, which change how the rest of the document pairs up
+SNIPPETS = ['a = 1;', 'entero x = 2;', 'si ( a == 1 ) entonces {', '}', ' sino { ', ';', '{', '@', '\n', ' ',
+            'mientras ( b < 3 ) hacer { b = b + 1; }', 'cadena s = "hola";', 'entero f(entero q) { q = 1; }',
+            'entero = 5;', 'x = ;', '"', '\\', '\\"', '"\\\\"', 'x']
+
+
+def check_document(document, text):
+    fresh = IncrementalDocument(text)
+    assert document.text == text
+    assert document.tokens() == Lexer(text).tokenize_in_order()
+    assert document.errors() == fresh.errors()
+    assert document.ast == fresh.ast
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_random_edits_match_full_analysis(seed):
+    generator = random.Random(seed)
+    text = generate_program(generator.randint(0, 8), seed=seed)
+    document = IncrementalDocument(text)
+    for _ in range(40):
+        offset = generator.randint(0, len(text))
+        removed = generator.randint(0, min(10, len(text) - offset))
+        inserted = generator.choice(SNIPPETS) if generator.random() < 0.7 else ''
+        text = text[:offset] + inserted + text[offset + removed:]
+        document.edit(offset, removed, inserted)
+        check_document(document, text)
+
+
+@pytest.mark.parametrize('text, offset, removed, inserted', [
+    # A space between '\' and '"' frees the quote to close the string of the first line
+    ('cadena a = "x;\nentero b = 1;\nc = 2; \\"', 37, 0, ' '),
+    # Deleting the '\' does the same
+    ('cadena a = "x;\nentero b = 1;\nc = 2; \\"', 36, 1, ''),
+    # The escaped quote of the second line also opens an unterminated string, the first one still pairs
+    ('cadena a = "x;\nb = \\";\nc = 2; ', 30, 0, '"'),
+    # Deleting a closing quote leaves the string open into the following statements
+    ('cadena a = "x";\nentero b = 1;\n', 13, 1, ''),
+])
+def test_edits_that_pair_quotes_differently(text, offset, removed, inserted):
+    document = IncrementalDocument(text)
+    document.edit(offset, removed, inserted)
+    check_document(document, text[:offset] + inserted + text[offset + removed:])
+
+
+def test_statements_after_an_error_stay_separate():
+    document = IncrementalDocument('entero = 5;\nx = ;\nentero y = 1;\n')
+    assert [segment.error is not None for segment in document.segments] == [True, True, False]
+    assert len(document.ast) == 1
+    assert [error['line'] for error in document.errors()] == [1, 2]
+
+
+def test_ast_has_document_positions():
+    text = generate_program(6, seed=3)
+    document = IncrementalDocument(text)
+    assert document.ast == Parser(Lexer(text).tokenize_compact()).parse()
+    offset = text.index('\n', len(text) // 2) + 1
+    document.edit(offset, 0, 'a = 1;\n')
+    text = text[:offset] + 'a = 1;\n' + text[offset:]
+    assert document.ast == Parser(Lexer(text).tokenize_compact()).parse()
@@ -0,0 +1,72 @@
+import random
+import re
+
+import pytest
+
+import interpreter
+import vm
+from interpreter import EvaluationError
+
+BIG = '1' + '0' * 400
+
+
+@pytest.mark.parametrize('text, message', [
+    (f'entero x = {BIG}; x = x / 3;', "Result of '/' is too large."),
+    (f'entero x = {BIG}; decimal d = 1; d = d + x;', "Result of '+' is too large."),
+    ('decimal c = 10;' + ' c = c * c;' * 9 + ' entero x = c;', "Cannot store inf in entero variable 'x'."),
+])
+@pytest.mark.parametrize('module', [interpreter, vm])
+def test_overflow_is_an_evaluation_error(module, text, message):
+    with pytest.raises(EvaluationError, match=re.escape(message)):
+        module.execute(text)
+
+
+def random_program(generator):
+    """Program over four declared variables, mixing types so that evaluation errors come up too."""
+    names = ['a', 'b', 'c', 'd']
+    lines = []
+    for name in names:
+        type_name = generator.choice(['entero', 'entero', 'decimal', 'booleano', 'cadena'])
+        value = {'booleano': generator.choice(['verdadero', 'falso']), 'cadena': '"t"'}.get(
+            type_name, str(generator.randrange(10)))
+        lines.append(f'{type_name} {name} = {value};')
+
+    def operand():
+        return generator.choice(names + [str(generator.randrange(5))])
+
+    def statement(depth):
+        kind = generator.randrange(5 if depth < 2 else 2)
+        if kind <= 1:
+            parts = [operand()]
+            for _ in range(generator.randrange(4)):
+                operator = generator.choice('+-*/%')
+                # Multiplying by variables in loops would grow numbers without bound
+                parts += [operator, str(generator.randrange(5)) if operator == '*' else operand()]
+            return f"{generator.choice(names)} = {' '.join(parts)};"
+        condition = f"{generator.choice(names)} {generator.choice(['==', '<=', '>=', '<', '>'])} {operand()}"
+        body = ' '.join(statement(depth + 1) for _ in range(generator.randint(1, 3)))
+        if kind == 2:
+            return f"si ( {condition} ) entonces {{ {body} }} sino {{ {statement(depth + 1)} }}"
+        if kind == 3:
+            return f"mientras ( {condition} ) hacer {{ {body} }}"
+        return f"{generator.choice(['entero', 'decimal'])} {generator.choice(names)} = {generator.randrange(9)};"
+
+    lines.extend(statement(0) for _ in range(generator.randint(1, 8)))
+    return '\n'.join(lines)
+
+
+def outcome(module, text, optimize):
+    try:
+        return module.execute(text, step_limit=50, optimize=optimize)
+    except EvaluationError as error:
+        return str(error)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_interpreter_vm_and_optimizer_agree(seed):
+    generator = random.Random(seed)
+    for _ in range(25):
+        text = random_program(generator)
+        expected = outcome(interpreter, text, optimize=False)
+        for module, optimize in [(interpreter, True), (vm, False), (vm, True)]:
+            assert outcome(module, text, optimize) == expected, (module.__name__, optimize, text)
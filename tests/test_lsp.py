@@ -0,0 +1,100 @@
+import io
+import threading
+
+import pytest
+
+from lsp import (INVALID_REQUEST, PARSE_ERROR, LanguageClient, LanguageServer, OpenDocument, read_message,
+                 write_message)
+
+
+def frame(message):
+    stream = io.BytesIO()
+    write_message(stream, message)
+    return stream.getvalue()
+
+
+def serve(*messages):
+    """Exit code and messages sent by a server reading `messages` (dicts or raw bytes), then shutdown and exit."""
+    raw = b''.join(message if isinstance(message, bytes) else frame(message) for message in messages)
+    raw += frame({'jsonrpc': '2.0', 'id': 'last', 'method': 'shutdown'}) + frame({'jsonrpc': '2.0', 'method': 'exit'})
+    output = io.BytesIO()
+    server = LanguageServer(io.BytesIO(raw), output, delay=0)
+    result = []
+    thread = threading.Thread(target=lambda: result.append(server.run()))
+    thread.start()
+    thread.join(10)
+    assert result, "the server stopped answering"
+    stream = io.BytesIO(output.getvalue())
+    sent = []
+    while (message := read_message(stream)) is not None:
+        sent.append(message)
+    return result[0], sent
+
+
+def error_codes(sent):
+    return [(message['id'], message['error']['code']) for message in sent if 'error' in message]
+
+
+@pytest.mark.parametrize('raw', [
+    b'Content-Length: 5\r\n\r\n{bad}',
+    b'Content-Length: x\r\n\r\n',
+    b'Content-Length: 3\r\n\r\n\xff\xfe{',
+    b'Content-Length: -1\r\n\r\n',
+    b'Content-L\xe9ngth: 2\r\n\r\n',
+])
+def test_malformed_input_gets_a_parse_error(raw):
+    exit_code, sent = serve(raw)
+    assert exit_code == 0
+    assert error_codes(sent) == [(None, PARSE_ERROR)]
+    assert sent[-1] == {'jsonrpc': '2.0', 'id': 'last', 'result': None}
+
+
+def test_truncated_message_ends_the_input():
+    assert read_message(io.BytesIO(b'Content-Length: 10\r\n\r\n{}')) is None
+
+
+@pytest.mark.parametrize('message, request_id', [
+    ([1], None),
+    ({'jsonrpc': '2.0', 'id': [1], 'method': 'shutdown'}, None),
+    ({'jsonrpc': '2.0', 'id': {}, 'method': 'shutdown'}, None),
+    ({'jsonrpc': '2.0', 'id': 1, 'method': ['shutdown']}, 1),
+    ({'jsonrpc': '2.0', 'id': 1, 'method': 7}, 1),
+    ({'jsonrpc': '2.0', 'id': 1, 'method': 'textDocument/documentSymbol', 'params': 'x'}, 1),
+    ({'jsonrpc': '2.0', 'method': '$/cancelRequest', 'params': 5}, None),
+    ({'jsonrpc': '2.0', 'method': 'textDocument/didOpen', 'params': None}, None),
+])
+def test_invalid_requests_are_answered(message, request_id):
+    exit_code, sent = serve(message)
+    assert exit_code == 0
+    assert error_codes(sent) == [(request_id, INVALID_REQUEST)]
+
+
+def test_cancelling_with_an_unusable_id_cancels_nothing():
+    exit_code, sent = serve({'jsonrpc': '2.0', 'method': '$/cancelRequest', 'params': {'id': [1]}},
+                            {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {}})
+    assert exit_code == 0
+    assert 'result' in sent[0] and sent[0]['id'] == 1
+
+
+def test_failing_notification_is_logged():
+    exit_code, sent = serve({'jsonrpc': '2.0', 'method': 'textDocument/didOpen', 'params': [1]})
+    assert exit_code == 0
+    assert sent[0]['method'] == 'window/logMessage'
+
+
+def test_every_broken_statement_gets_a_diagnostic():
+    text = 'entero = 5;\nx = ;\nentero y = 1;\nsi ( y == ) entonces {\n    y = 2;\n}\nentero z = 3;\n'
+    document = OpenDocument('file:///a', text, 1)
+    assert [diagnostic['range']['start']['line'] for diagnostic in document.diagnostics()] == [0, 1, 3]
+    assert [symbol['name'] for symbol in document.symbols()] == ['y', 'z']
+
+
+def test_client_keeps_working_after_an_error_without_id():
+    client = LanguageClient()
+    try:
+        client.process.stdin.write(b'Content-Length: 5\r\n\r\n{bad}')
+        client.request('initialize')
+        assert client.request('textDocument/documentSymbol', {'textDocument': {'uri': 'missing'}}) == []
+        assert [message['error']['code'] for message in client.unmatched] == [PARSE_ERROR]
+    finally:
+        assert client.close() == 0
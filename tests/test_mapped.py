@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from lexer import Lexer
+from mapped import MappedLexer, analyze_mapped
+from parse import Parser
+from benchmarks.programs import generate_program
+
+# Quotes and backslashes make string literals run over block ends, the others test positions
+PIECES = ['\\', '"', 'a', 'İ', '1', '²', ' ', '\n', 'é', '😀', ';', '=', '@', 'x = "a\\"b";', 'entero y = 2;']
+
+
+def assert_same_tokens(text, block_size):
+    lexer = Lexer(text)
+    expected = lexer.tokenize_in_order()
+    mapped = MappedLexer(text.encode('utf-8'), block_size)
+    tokens = mapped.tokenize_compact()
+    assert [tokens[index] for index in range(len(tokens))] == expected
+    assert tokens.to_dicts() == expected
+    assert mapped.errors == lexer.errors
+    assert tokens.counts() == lexer.token_counts
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_texts_match_lexer(seed):
+    generator = random.Random(seed)
+    for _ in range(50):
+        text = ''.join(generator.choices(PIECES, k=generator.randint(0, 30)))
+        for block_size in (1, 2, 3, 5, 8, 1000):
+            assert_same_tokens(text, block_size)
+
+
+@pytest.mark.parametrize('text', [
+    'cadena s = "' + 'a\\\\' * 50 + '\\";\nentero x = 1;',  # Escapes running over many blocks
+    'cadena s = "abc\nx = 1; \\" y = 2;\n',                   # Unterminated, lexed again after the quote
+    '"\\"\\"\\"',                                             # Every quote after the first escaped
+])
+def test_literals_over_block_ends(text):
+    for block_size in (1, 2, 4, 7, 64):
+        assert_same_tokens(text, block_size)
+
+
+def test_analyze_mapped_matches_parser(tmp_path):
+    text = generate_program(300)
+    path = tmp_path / 'program.txt'
+    path.write_text(text, encoding='utf-8')
+    tokens, errors, ast, diagnostics = analyze_mapped(str(path))
+    assert (ast, diagnostics) == Parser(Lexer(text).tokenize_compact()).parse_with_recovery()
+    assert tokens.to_dicts() == Lexer(text).tokenize_in_order()
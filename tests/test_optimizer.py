@@ -0,0 +1,27 @@
+import pytest
+
+import interpreter
+import vm
+from interpreter import EvaluationError
+from lexer import Lexer
+from nodes import BinaryOp, build_program
+from optimizer import Optimizer
+from parse import Parser
+
+BIG = '1' + '0' * 400
+
+
+def program(text):
+    return build_program(Parser(Lexer(text).tokenize_compact()).parse())
+
+
+@pytest.mark.parametrize('text', [
+    f'entero x = {BIG}; x = x / 3;',
+    f'entero x = {BIG}; decimal d = 1; d = d + x;',
+], ids=['divide', 'add'])
+def test_overflowing_operation_is_left_for_run_time(text):
+    optimized = Optimizer().optimize(program(text))
+    assert isinstance(optimized[-1].expression, BinaryOp)
+    for module in (interpreter, vm):
+        with pytest.raises(EvaluationError, match='is too large'):
+            module.execute(text, optimize=True)
@@ -0,0 +1,89 @@
+import io
+import random
+
+import pytest
+
+from lexer import Lexer
+from packrat import PackratParser
+from parse import IterativeParser, Parser
+from streaming import StreamingLexer
+from benchmarks.programs import MISTAKES, ProgramGenerator, generate_nested_program, generate_program
+
+# Pieces of random texts, mostly statement fragments so that some statements parse
+WORDS = ['entero', 'decimal', 'booleano', 'cadena', 'si', 'sino', 'mientras', 'entonces', 'hacer', 'verdadero',
+         'x', 'y', 'f', '1', '"s"', '=', '==', '<', '+', '*', '(', ')', '{', '}', ';', ',', '@'] + MISTAKES
+
+
+def random_texts(count, seed):
+    generator = random.Random(seed)
+    for _ in range(count):
+        yield ' '.join(generator.choices(WORDS, k=generator.randint(0, 25)))
+
+
+def texts(seed):
+    yield generate_program(20, seed=seed)
+    yield ProgramGenerator('mixed', seed=seed, error_rate=0.2).generate(30)
+    yield from random_texts(100, seed)
+
+
+def parsers(text):
+    """Every parser of `text`, over every kind of token source Parser takes."""
+    yield Parser(Lexer(text).tokenize_compact())
+    yield Parser(Lexer(text).tokenize_in_order())
+    yield Parser(StreamingLexer(io.StringIO(text), chunk_size=5))
+    yield IterativeParser(Lexer(text).tokenize_compact())
+    yield PackratParser(Lexer(text).tokenize_compact())
+
+
+def parse(parser):
+    try:
+        return parser.parse()
+    except SyntaxError as error:
+        return str(error)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_parsers_agree(seed):
+    for text in texts(seed):
+        first, *others = parsers(text)
+        expected = parse(first)
+        for parser in others:
+            assert parse(parser) == expected, (type(parser).__name__, text)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_parsers_recover_alike(seed):
+    for text in texts(seed):
+        first, *others = parsers(text)
+        expected = first.parse_with_recovery()
+        for parser in others:
+            assert parser.parse_with_recovery() == expected, (type(parser).__name__, text)
+
+
+def test_recovery_keeps_the_statements_around_errors():
+    text = 'entero a = 1;\nentero = 5;\nsi ( a == ) entonces { a = 2; }\na = a + 1;\nmientras ( a < 3 ) { a = 1; }\n'
+    ast, diagnostics = Parser(Lexer(text).tokenize_compact()).parse_with_recovery()
+    assert [(node['type'], node['line']) for node in ast] == [('variable_declaration', 1), ('assignment', 4)]
+    assert [(diagnostic['line'], diagnostic['value']) for diagnostic in diagnostics] == [(2, '='), (3, ')'), (5, '{')]
+
+
+def test_recovery_inside_blocks():
+    text = 'si ( a == 1 ) entonces {\n    b = ;\n    c = 2;\n} sino {\n    entero = 1;\n}\n'
+    ast, diagnostics = Parser(Lexer(text).tokenize_compact()).parse_with_recovery()
+    assert [statement['identifier'] for statement in ast[0]['if_block']['statements']] == ['c']
+    assert ast[0]['else_block']['statements'] == []
+    assert [diagnostic['line'] for diagnostic in diagnostics] == [2, 5]
+
+
+def test_iterative_parser_has_no_nesting_limit():
+    text = generate_nested_program(5000)
+    with pytest.raises(RecursionError):
+        Parser(Lexer(text).tokenize_compact()).parse()
+    ast = IterativeParser(Lexer(text).tokenize_compact()).parse()
+    depth = 0
+    node = ast[-1]
+    while node['type'] in ('if_statement', 'while_loop'):
+        depth += 1
+        statements = node['if_block']['statements'] if node['type'] == 'if_statement' else node['statements']
+        node = statements[0]
+    assert depth == 5000
@@ -0,0 +1,119 @@
+import random
+import re
+import sys
+import unicodedata
+
+import pytest
+
+from lexer import Lexer
+from benchmarks.programs import ProgramGenerator, generate_program
+
+# Pieces of the random texts: tokens, quotes and escapes, and non-ASCII characters of every class
+# the scanners tell apart (letters whose lowercase is longer, digits int() rejects, numerics that
+# are not digits, other spaces and line breaks, marks, astral characters and lone surrogates)
+PIECES = (['entero', 'SI', 'mientras', 'x1', '_a', '42', '==', '<=', '>', '=', '+', '%', '(', ')', '{', '}',
+           ';', ',', '"', '\\', '\\"', '"a\\"b"', '\\n', ' ', '\n', '\t', '\r', '@', '#', '.', '!']
+          + ['é', 'İ', 'ß', 'ǅ', 'Ω', '二', '²', '٣', '①', '½', 'Ⅻ', '\u00a0', '\u2028', '\x1c', '\u3000',
+             '\u0301', '\u200b', '😀', '𝟙', '\ud800', '\x00', '\x7f'])
+
+# Contexts every swept character is scanned in
+CONTEXTS = ('{} ', 'a{}1 ', '1{}a ', '"{}" ', '"\\{}" ')
+
+# Categories whose code points all behave alike: unassigned, private use and surrogates
+UNASSIGNED = ('Cn', 'Co', 'Cs')
+
+
+def compare(text):
+    """Description of how tokenize_regex and tokenize_compact differ on `text`, None when they agree."""
+    regex_lexer = Lexer(text)
+    regex_tokens = regex_lexer.tokenize_regex()
+    compact_lexer = Lexer(text)
+    compact_tokens = compact_lexer.tokenize_compact()
+    if regex_tokens.fields() != compact_tokens.fields():
+        return f"tokens differ: {regex_tokens.to_dicts()} != {compact_tokens.to_dicts()}"
+    if regex_lexer.errors != compact_lexer.errors:
+        return f"errors differ: {regex_lexer.errors} != {compact_lexer.errors}"
+    return None
+
+
+def shortest_failure(text):
+    # Drop halves, then single characters, while the backends still differ
+    size = len(text) // 2
+    while size:
+        start = 0
+        while start < len(text):
+            candidate = text[:start] + text[start + size:]
+            if compare(candidate) is not None:
+                text = candidate
+            else:
+                start += size
+        size //= 2
+    return text
+
+
+def check(text):
+    if compare(text) is not None:
+        text = shortest_failure(text)
+        pytest.fail(f"scanner backends differ on {text!r}: {compare(text)}")
+
+
+def random_texts(count, seed):
+    generator = random.Random(seed)
+    for _ in range(count):
+        pieces = generator.choices(PIECES, k=generator.randint(0, 30))
+        if generator.random() < 0.3:
+            pieces.append(generator.choice(['"', '"abc', '"a\\', '"a\\"', '"\\\\']))  # Unterminated at the end
+        yield ''.join(pieces)
+
+
+@pytest.fixture(scope='module')
+def representatives():
+    """Every ASCII character, and the first and last code point of each class of characters the
+    scanners could tell apart, from the str predicates and re classes they use."""
+    chars = ''.join(map(chr, range(sys.maxunicode + 1)))
+    result = set(chars[:128])
+    assigned = []
+    unassigned = {}  # Category -> its code points
+    for char, category in zip(chars, map(unicodedata.category, chars)):
+        if category in UNASSIGNED:
+            unassigned.setdefault(category, []).append(char)
+        else:
+            assigned.append(char)
+    for found in unassigned.values():
+        result.update((found[0], found[-1]))
+    assigned = ''.join(assigned)
+    matched = [set(re.findall(pattern, assigned)) for pattern in (r'\w', r'\d', r'\s')]
+    keys = list(zip(map(str.isspace, assigned), map(str.isalpha, assigned), map(str.isdigit, assigned),
+                    map(str.isdecimal, assigned), map(str.isnumeric, assigned), map(str.isalnum, assigned),
+                    map(len, map(str.lower, assigned)), map(unicodedata.category, assigned),
+                    *[map(found.__contains__, assigned) for found in matched]))
+    result.update(dict(zip(keys, assigned)).values())
+    result.update(dict(zip(reversed(keys), reversed(assigned))).values())
+    return ''.join(sorted(result))
+
+
+def test_generated_program():
+    check(generate_program(50, seed=0))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_texts(seed):
+    for text in random_texts(200, seed):
+        check(text)
+
+
+@pytest.mark.parametrize('context', CONTEXTS)
+def test_character_classes(representatives, context):
+    check(''.join(context.format(char) for char in representatives))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_scanner_matches_charwise_lexer(seed):
+    texts = [generate_program(30, seed=seed), ProgramGenerator('mixed', seed=seed, error_rate=0.2).generate(30)]
+    for text in texts + list(random_texts(200, seed)):
+        charwise = Lexer(text)
+        expected = charwise.tokenize_in_order_charwise()
+        lexer = Lexer(text)
+        assert lexer.tokenize_in_order() == expected, text
+        assert lexer.errors == charwise.errors, text
+        assert lexer.token_counts == charwise.token_counts, text
@@ -0,0 +1,35 @@
+import pytest
+
+import interpreter
+from interpreter import EvaluationError
+from lexer import Lexer
+from parse import Parser
+from semantic import check
+
+
+def diagnostics(text):
+    return [(diagnostic['message'], diagnostic['line'], diagnostic['column'])
+            for diagnostic in check(Parser(Lexer(text).tokenize_compact()).parse())]
+
+
+def test_variable_declared_in_a_block_is_known_after_it():
+    text = 'entero a = 1;\nsi ( a == 1 ) entonces { entero x = 1; }\nx = 2;\n'
+    assert diagnostics(text) == []
+    interpreter.execute(text)
+
+
+def test_redeclaration_in_a_block_changes_the_type():
+    text = 'entero x = 1;\nsi ( x == 1 ) entonces {\n    cadena x = "a";\n}\nx = x + 1;\n'
+    assert diagnostics(text) == [("Operator '+' does not apply to cadena and entero.", 5, 1)]
+    with pytest.raises(EvaluationError):
+        interpreter.execute(text)
+
+
+def test_diagnostics_have_the_position_of_their_statement():
+    text = 'entero v = 1;\nmientras ( v < 3 ) hacer {\n    v = var31 + 1;\n}\n'
+    assert diagnostics(text) == [("Variable 'var31' is not declared.", 3, 5)]
+
+
+def test_function_bodies_have_a_scope_of_their_own():
+    text = 'entero f(entero q) { q = 1; entero r = 2; }\nr = 1;\nentero f = 2;\nf = f + 1;\n'
+    assert diagnostics(text) == [("Variable 'r' is not declared.", 2, 1)]
@@ -0,0 +1,44 @@
+import io
+
+import pytest
+
+from lexer import Lexer
+from scanner import Scanner
+from streaming import StreamingLexer
+from test_scanners import random_texts
+from benchmarks.programs import ProgramGenerator, generate_program
+
+TEXTS = ([generate_program(30, seed=1), ProgramGenerator('strings', seed=2, string_length=40).generate(20),
+          'cadena s = "a\\"b\\\\";\ncadena t = "sin cerrar\n', 'x\n' * 50 + '"abierta']
+         + list(random_texts(300, seed=5)))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 4096])
+def test_streaming_lexer_matches_lexer(chunk_size):
+    for text in TEXTS:
+        lexer = Lexer(text)
+        streaming = StreamingLexer(io.StringIO(text), chunk_size=chunk_size)
+        assert list(streaming) == lexer.tokenize_in_order(), text
+        assert streaming.errors == lexer.errors, text
+
+
+def test_streaming_lexer_reads_iterables_of_chunks():
+    text = TEXTS[0]
+    chunks = [text[start:start + 10] for start in range(0, len(text), 10)]
+    assert list(StreamingLexer(iter(chunks))) == Lexer(text).tokenize_in_order()
+
+
+@pytest.mark.parametrize('step', [1, 5, 33])
+def test_scanning_in_steps_matches_one_pass(step):
+    for text in TEXTS:
+        whole = Scanner(text)
+        whole.scan()
+        scanner = Scanner(text)
+        end = 0
+        while end < len(text):
+            end += step
+            scanner.scan(final=end >= len(text), end=end)
+        if not text:
+            scanner.scan()
+        assert scanner.tokens.fields() == whole.tokens.fields(), text
+        assert scanner.errors == whole.errors, text
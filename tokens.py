@@ -0,0 +1,184 @@
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from operator import itemgetter
+
+from literals import unescape
+from positions import LineIndex
+
+key_words = ['entero', 'decimal', 'booleano', 'cadena', 'sino', 'si', 'mientras',
+             'hacer', 'verdadero', 'falso', 'entonces']
+operators = ['+', '-', '*', '/', '%', '==', '<=', '>=', '<', '>', '=']
+signs = ['(', ')', '{', '}', '"', ';', ',']
+
+# Interned token kinds, the index is the type id stored in TokenBuffer.kinds
+TOKEN_TYPES = ['IDENTIFIER', 'KEYWORD', 'NUMBER', 'STRING', 'OPERATOR', 'SIGN', 'ERROR']
+TYPE_IDS = {token_type: type_id for type_id, token_type in enumerate(TOKEN_TYPES)}
+
+IDENTIFIER_ID = TYPE_IDS['IDENTIFIER']
+KEYWORD_ID = TYPE_IDS['KEYWORD']
+STRING_ID = TYPE_IDS['STRING']
+
+
+class TokenBuffer(Sequence):
+    """Columnar token store: one array per field, values are sliced from the source on access.
+
+    Indexing it like a list builds the usual token dict. Scanners only store offsets: lines and
+    columns are looked up in a LineIndex of the text when a token is built, and `lines` and
+    `columns` fill whole arrays of them the first time they are read.
+
+    Parser reads tokens through `get`, which leaves the position out and keeps the last few since
+    the parser looks at the same two or three tokens; it asks `position` for the tokens it reports.
+    """
+
+    def __init__(self, text, line_index=None):
+        self.text = text
+        self.kinds = array('b')
+        self.starts = array('q')   # Offset of the first character, the opening quote for strings
+        self.lengths = array('i')  # Length in the source, quotes included
+        self.source_lines = line_index  # LineIndex of `text`, built on first use
+        self.positions = None      # (lines, columns) arrays, for the tokens they cover so far
+        self.cache = [(-1, None)] * 4  # (index, token) slots, by index modulo 4
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def value(self, index):
+        start = self.starts[index]
+        end = start + self.lengths[index]
+        kind = self.kinds[index]
+        if kind == STRING_ID:
+            return unescape(self.text[start + 1:end - 1])
+        if kind == IDENTIFIER_ID or kind == KEYWORD_ID:
+            return self.text[start:end].lower()
+        return self.text[start:end]
+
+    def type(self, index):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    @property
+    def line_index(self):
+        if self.source_lines is None:
+            self.source_lines = LineIndex(self.text)
+        return self.source_lines
+
+    def position(self, index):
+        """(line, column) of token `index`."""
+        positions = self.positions
+        if positions is not None and index < len(positions[0]):
+            return positions[0][index], positions[1][index]
+        line_index = self.line_index
+        line, column = line_index.position(self.starts[index])
+        if not line_index.ascii:
+            column += self.identifier_shift(index)
+        return line, column
+
+    def identifier_shift(self, index):
+        # Identifier columns count the lowercased name back from its end, as Lexer reports them,
+        # which only moves them when lowering changes the length (e.g. 'İ')
+        kind = self.kinds[index]
+        if kind != IDENTIFIER_ID and kind != KEYWORD_ID:
+            return 0
+        start = self.starts[index]
+        length = self.lengths[index]
+        return length - len(self.text[start:start + length].lower())
+
+    def line_columns(self):
+        """(lines, columns) arrays of every token, extended for tokens added since the last call."""
+        if self.positions is None:
+            self.positions = (array('i'), array('i'))
+        lines, columns = self.positions
+        done = len(lines)
+        if done < len(self.kinds):
+            new_lines, new_columns = self.line_index.positions(self.starts[done:])
+            if not self.line_index.ascii:
+                for offset in range(len(new_columns)):
+                    new_columns[offset] += self.identifier_shift(done + offset)
+            lines.extend(new_lines)
+            columns.extend(new_columns)
+        return self.positions
+
+    @property
+    def lines(self):
+        return self.line_columns()[0]
+
+    @property
+    def columns(self):
+        return self.line_columns()[1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self.kinds):
+            raise IndexError("token index out of range")
+        line, column = self.position(index)
+        return {'type': TOKEN_TYPES[self.kinds[index]], 'value': self.value(index), 'line': line, 'column': column}
+
+    def get(self, index):
+        """Token at `index` without 'line' and 'column', or None past the end (the lookup Parser uses)."""
+        cached = self.cache[index & 3]
+        if cached[0] == index:
+            return cached[1]
+        if index >= len(self.kinds):
+            return None
+        token = {'type': TOKEN_TYPES[self.kinds[index]], 'value': self.value(index)}
+        self.cache[index & 3] = (index, token)
+        return token
+
+    def to_dicts(self):
+        return [{'type': TOKEN_TYPES[kind], 'value': value, 'line': line, 'column': column}
+                for kind, value, line, column in zip(self.kinds, self.values(), self.lines, self.columns)]
+
+    def values(self):
+        text = self.text
+        result = []
+        append = result.append
+        for kind, start, length in zip(self.kinds, self.starts, self.lengths):
+            if kind == STRING_ID:
+                append(unescape(text[start + 1:start + length - 1]))
+            elif kind == IDENTIFIER_ID or kind == KEYWORD_ID:
+                append(text[start:start + length].lower())
+            else:
+                append(text[start:start + length])
+        return result
+
+    def counts(self):
+        """Value -> {'type', 'count', 'line', 'column'}, in order of first occurrence and with its position."""
+        values = self.values()
+        occurrences = Counter(values)
+        # Built backwards so every value ends up mapped to its first index
+        first = dict(zip(reversed(values), range(len(values) - 1, -1, -1)))
+        counts = {}
+        for value, index in sorted(first.items(), key=itemgetter(1)):
+            line, column = self.position(index)
+            counts[value] = {'type': TOKEN_TYPES[self.kinds[index]], 'count': occurrences[value],
+                             'line': line, 'column': column}
+        return counts
+
+    def fields(self):
+        """The stored columns; lines and columns are derived from the offsets and not part of them."""
+        return [self.kinds, self.starts, self.lengths]
+
+    def dump_columns(self):
+        """Raw bytes of every column, see load_columns."""
+        return [column.tobytes() for column in self.fields()]
+
+    @classmethod
+    def load_columns(cls, text, blobs):
+        """TokenBuffer of `text` from dump_columns bytes, ValueError when they do not make one."""
+        buffer = cls(text)
+        columns = buffer.fields()
+        if len(blobs) != len(columns):
+            raise ValueError(f"Expected {len(columns)} columns, got {len(blobs)}")
+        for column, blob in zip(columns, blobs):
+            column.frombytes(blob)
+        if len({len(column) for column in columns}) > 1:
+            raise ValueError("Columns of different lengths")
+        return buffer
+
+    def nbytes(self):
+        """Memory used by the columns (not counting the source text, which is shared)."""
+        columns = self.fields() + list(self.positions or ())
+        return sum(column.itemsize * column.buffer_info()[1] for column in columns)
@@ -0,0 +1,145 @@
+import sys
+
+from bytecode import BINARY_OPCODES, OPERATOR_SYMBOLS, STORE_TYPED, STORE_TYPES, compile_program
+from interpreter import EvaluationError
+from lexer import Lexer
+from operations import CONVERSIONS
+from parse import Parser
+
+UNSET = object()  # Slot of a variable whose declaration has not run yet
+
+
+class VM:
+    """Runs a CodeObject with the semantics of Interpreter.
+
+    `step_limit` bounds the number of loop iterations like Interpreter's. After `run`, `variables`
+    maps the name of every declared variable to its value.
+    """
+
+    def __init__(self, code_object, step_limit=None):
+        self.code_object = code_object
+        self.step_limit = step_limit
+        self.registers = code_object.registers()
+        for slot in range(len(code_object.names)):
+            self.registers[slot] = UNSET
+        self.types = {}  # Slot -> current type of a variable declared with several types
+        self.steps = 0
+
+    @property
+    def variables(self):
+        return {name: value for name, value in zip(self.code_object.names, self.registers) if value is not UNSET}
+
+    def run(self):
+        self.execute()
+        return self.variables
+
+    def execute(self):
+        # The dispatch loop. Opcodes are literals, a global lookup per test costs as much as the
+        # operation, and are tested roughly by how often loop bodies run them.
+        instructions = self.code_object.instructions()
+        registers = self.registers
+        steps = self.steps
+        limit = self.step_limit if self.step_limit is not None else sys.maxsize
+        pc = 0
+        try:
+            while True:
+                opcode, a, b, c = instructions[pc]
+                pc += 1
+                if opcode == 8:  # ADD
+                    registers[a] = registers[b] + registers[c]
+                elif opcode == 9:  # SUB
+                    registers[a] = registers[b] - registers[c]
+                elif opcode == 10:  # MUL
+                    registers[a] = registers[b] * registers[c]
+                elif opcode == 12:  # MOD
+                    registers[a] = registers[b] % registers[c]
+                elif opcode == 11:  # DIV
+                    registers[a] = registers[b] / registers[c]
+                elif opcode == 1:  # STORE_INT
+                    registers[a] = int(registers[b])
+                elif opcode == 21:  # LOOP_IF_LT
+                    if registers[a] < registers[b]:
+                        steps += 1
+                        if steps > limit:
+                            raise self.step_limit_error()
+                        pc = c
+                elif opcode == 0:  # MOVE
+                    registers[a] = registers[b]
+                elif opcode == 17:  # JUMP_IF_NOT_GT
+                    if not registers[a] > registers[b]:
+                        pc = c
+                elif opcode == 16:  # JUMP_IF_NOT_LT
+                    if not registers[a] < registers[b]:
+                        pc = c
+                elif opcode == 24:  # JUMP
+                    pc = c
+                elif opcode == 13:  # JUMP_IF_NOT_EQ
+                    if not registers[a] == registers[b]:
+                        pc = c
+                elif opcode == 14:  # JUMP_IF_NOT_LE
+                    if not registers[a] <= registers[b]:
+                        pc = c
+                elif opcode == 15:  # JUMP_IF_NOT_GE
+                    if not registers[a] >= registers[b]:
+                        pc = c
+                elif 18 <= opcode <= 22:  # LOOP_IF_EQ, LOOP_IF_LE, LOOP_IF_GE, LOOP_IF_GT
+                    left = registers[a]
+                    right = registers[b]
+                    if (left == right if opcode == 18 else left <= right if opcode == 19
+                            else left >= right if opcode == 20 else left > right):
+                        steps += 1
+                        if steps > limit:
+                            raise self.step_limit_error()
+                        pc = c
+                elif opcode == 23:  # STEP
+                    steps += 1
+                    if steps > limit:
+                        raise self.step_limit_error()
+                elif opcode == 2:  # STORE_FLOAT
+                    registers[a] = float(registers[b])
+                elif opcode == 3:  # STORE_BOOL
+                    registers[a] = bool(registers[b])
+                elif opcode == 4:  # STORE_STR
+                    registers[a] = str(registers[b])
+                elif opcode == 7:  # CHECK
+                    if registers[a] is UNSET:
+                        raise EvaluationError(f"Variable '{self.code_object.names[a]}' is not declared.")
+                elif opcode == 5:  # STORE_TYPED
+                    registers[a] = CONVERSIONS[self.types[a]](registers[b])
+                elif opcode == 6:  # DECLARE
+                    self.types[a] = registers[b]
+                elif opcode == 25:  # HALT
+                    return
+                else:
+                    raise EvaluationError(f"Unknown opcode {opcode}.")
+        except ZeroDivisionError:
+            raise EvaluationError("Division by zero.") from None
+        except (TypeError, ValueError, OverflowError) as error:
+            # The failed instruction is still in opcode, a, b and c
+            raise self.operation_error(opcode, a, b, c, error) from None
+        finally:
+            self.steps = steps
+
+    def operation_error(self, opcode, a, b, c, error):
+        """The error Interpreter reports for an operation or store that failed on these values."""
+        registers = self.registers
+        if opcode in STORE_TYPES or opcode == STORE_TYPED:
+            type_name = self.types[a] if opcode == STORE_TYPED else STORE_TYPES[opcode]
+            name = self.code_object.names[a]
+            return EvaluationError(f"Cannot store {registers[b]!r} in {type_name} variable '{name}'.")
+        if isinstance(error, OverflowError):
+            return EvaluationError(f"Result of '{OPERATOR_SYMBOLS[opcode]}' is too large.")
+        if opcode in BINARY_OPCODES.values():
+            left, right = registers[b], registers[c]
+        else:
+            left, right = registers[a], registers[b]
+        return EvaluationError(f"Unsupported operands for '{OPERATOR_SYMBOLS[opcode]}': {left!r}, {right!r}.")
+
+    def step_limit_error(self):
+        return EvaluationError(f"Step limit of {self.step_limit} loop iterations exceeded.")
+
+
+def execute(text, step_limit=None, optimize=False):
+    """Lex, parse, compile and run `text`, returns the final variables like interpreter.execute."""
+    ast = Parser(Lexer(text).tokenize_compact()).parse()
+    return VM(compile_program(ast, optimize), step_limit).run()